@@ -1,10 +1,44 @@
+import functools
+import html
+import importlib.util
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
 import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-from io import BytesIO
-import base64
+
+from ahp_engine import (
+    SUBCRITERIA, SUBCRITERIA_PT, DEFAULT_WEIGHTS, COMPARISON_MATRIX,
+    ALL_SUBCRITERIA, ALL_SUBCRITERIA_PT,
+    check_consistency, weight_model, calculate_scores, score_layout,
+)
+from ahp_stream import score_csv_stream
+from sensitivity import MAX_PRODUCERS, weight_sensitivity
+from group_ahp import group_consensus, read_expert_matrix
+from translations import LANG
+from exports import export_bytes
+from history import HistoryStore, HISTORY_PATH
+from diagnostics import Recorder, PANEL_DEFAULT, METRICS_PORT, start_metrics_server
+from results import CompactResults, REGISTRY, IDLE_SECONDS
+from upload_cache import UPLOAD_CACHE, upload_digest, parsed_upload, cached_ranking, cached_stream
+from ingest import IngestError, read_producers, detect_format, xlrd_available
+import charts
+
+# CSV uploads above this size are scored in chunks, keeping only the best producers
+STREAM_UPLOAD_BYTES = 50 * 2**20
+# Legacy .xls workbooks are only offered when xlrd is installed
+UPLOAD_TYPES = ['csv', 'xlsx'] + (['xls'] if xlrd_available() else [])
+STREAM_TOP_K = 50
+# Manual entry: per-producer sliders stay usable up to a handful of producers,
+# the editable grid scales to a few hundred
+MANUAL_SLIDER_MAX = 20
+MANUAL_GRID_MAX = 1000
+# Sensitivity runs share one small process pool, so concurrent sessions cannot
+# fork a CPU-count pool each
+SENSITIVITY_WORKERS = int(os.environ.get('DAIRY_SENSITIVITY_WORKERS', min(4, os.cpu_count() or 1)))
 
 # ─── PAGE CONFIG ──────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -123,430 +157,180 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# ─── LANGUAGE ─────────────────────────────────────────────────────────────────
-LANG = {
-    'EN': {
-        'title': 'Dairy Producer Selection Tool',
-        'subtitle': 'AHP-based ranking system for milk producer evaluation',
-        'language': 'Language / Idioma',
-        'settings': '⚙️ Settings',
-        'weights_title': '📊 Criterion Weights',
-        'weights_info': 'Adjust the weights for each criterion. Values will be normalized to sum to 1.',
-        'reset_weights': '↺ Reset to Default',
-        'input_method': '📥 Data Input Method',
-        'upload_csv': '📂 Upload CSV',
-        'manual_entry': '✏️ Manual Entry',
-        'num_producers': 'Number of Producers',
-        'producer_name': 'Producer Name',
-        'calc_button': '🚀 Calculate Ranking',
-        'results_title': '🏆 Ranking Results',
-        'ranking_tab': '🏅 Ranking',
-        'charts_tab': '📊 Charts',
-        'details_tab': '🔍 Details',
-        'consistency_tab': '✅ Consistency',
-        'export_tab': '📤 Export',
-        'total_score': 'Total Score',
-        'economic': 'Economic',
-        'social': 'Social',
-        'production': 'Production',
-        'consistency_title': 'AHP Consistency Analysis',
-        'cr_ok': '✅ Consistency Ratio is acceptable (CR < 0.1)',
-        'cr_fail': '⚠️ Consistency Ratio is not acceptable (CR ≥ 0.1)',
-        'download_excel': '📥 Download Excel Report',
-        'download_csv': '📥 Download CSV',
-        'upload_hint': 'Upload a CSV with columns: Producer, Economic, Social, Production',
-        'download_example': '⬇️ Download Example CSV',
-        'no_data': 'No data to display. Run a calculation first.',
-        'producers': 'producers',
-        'top_producer': 'Top Producer',
-        'avg_score': 'Average Score',
-        'score_range': 'Score Range',
-        'economic_criteria': 'Economic Criteria',
-        'social_criteria': 'Social Criteria',
-        'production_criteria': 'Production Criteria',
-        'subcriteria_scores': 'Sub-criteria Scores',
-        'download_pdf': '📄 Download PDF Report',
-        'tutorial_title': 'How to use this tool',
-        'tutorial_skip': 'Start now →',
-        'tut_step1_title': '1. Set Weights',
-        'tut_step1_desc': 'In the sidebar, adjust the importance of each criterion using sliders. Values are automatically normalized.',
-        'tut_step2_title': '2. Enter Producers',
-        'tut_step2_desc': 'Upload a CSV or enter data manually. Rate each producer 0–10 per sub-criterion.',
-        'tut_step3_title': '3. Calculate & Analyze',
-        'tut_step3_desc': 'Click "Calculate Ranking" to see AHP results with charts and consistency analysis.',
-        'tut_step4_title': '4. Export',
-        'tut_step4_desc': 'Download the ranking as Excel, CSV or PDF for sharing and documentation.',
-        'what_is_ahp': 'What is AHP?',
-        'ahp_explanation': 'The Analytic Hierarchy Process (AHP) is a structured decision-making technique that uses pairwise comparisons to rank alternatives based on multiple weighted criteria.',
-    },
-    'PT': {
-        'title': 'Ferramenta de Seleção de Produtores',
-        'subtitle': 'Sistema de ranking baseado em AHP para avaliação de produtores de leite',
-        'language': 'Language / Idioma',
-        'settings': '⚙️ Configurações',
-        'weights_title': '📊 Pesos dos Critérios',
-        'weights_info': 'Ajuste os pesos de cada critério. Os valores serão normalizados para somar 1.',
-        'reset_weights': '↺ Restaurar Padrão',
-        'input_method': '📥 Método de Entrada de Dados',
-        'upload_csv': '📂 Enviar CSV',
-        'manual_entry': '✏️ Entrada Manual',
-        'num_producers': 'Número de Produtores',
-        'producer_name': 'Nome do Produtor',
-        'calc_button': '🚀 Calcular Ranking',
-        'results_title': '🏆 Resultados do Ranking',
-        'ranking_tab': '🏅 Ranking',
-        'charts_tab': '📊 Gráficos',
-        'details_tab': '🔍 Detalhes',
-        'consistency_tab': '✅ Consistência',
-        'export_tab': '📤 Exportar',
-        'total_score': 'Pontuação Total',
-        'economic': 'Econômico',
-        'social': 'Social',
-        'production': 'Produção',
-        'consistency_title': 'Análise de Consistência AHP',
-        'cr_ok': '✅ Razão de Consistência aceitável (RC < 0,1)',
-        'cr_fail': '⚠️ Razão de Consistência não aceitável (RC ≥ 0,1)',
-        'download_excel': '📥 Baixar Relatório Excel',
-        'download_csv': '📥 Baixar CSV',
-        'upload_hint': 'Envie um CSV com as colunas: Producer, Economic, Social, Production',
-        'download_example': '⬇️ Baixar CSV de Exemplo',
-        'no_data': 'Sem dados para exibir. Execute um cálculo primeiro.',
-        'producers': 'produtores',
-        'top_producer': 'Melhor Produtor',
-        'avg_score': 'Pontuação Média',
-        'score_range': 'Amplitude',
-        'economic_criteria': 'Critérios Econômicos',
-        'social_criteria': 'Critérios Sociais',
-        'production_criteria': 'Critérios de Produção',
-        'subcriteria_scores': 'Pontuações por Subcritério',
-        'download_pdf': '📄 Baixar Relatório PDF',
-        'tutorial_title': 'Como usar esta ferramenta',
-        'tutorial_skip': 'Começar agora →',
-        'tut_step1_title': '1. Defina os Pesos',
-        'tut_step1_desc': 'Na barra lateral, ajuste a importância de cada critério com os sliders. Os valores são normalizados automaticamente.',
-        'tut_step2_title': '2. Insira os Produtores',
-        'tut_step2_desc': 'Escolha entre enviar um CSV ou inserir manualmente. Avalie cada produtor de 0 a 10 por subcritério.',
-        'tut_step3_title': '3. Calcule e Analise',
-        'tut_step3_desc': 'Clique em "Calcular Ranking" para ver os resultados AHP com gráficos e análise de consistência.',
-        'tut_step4_title': '4. Exporte',
-        'tut_step4_desc': 'Baixe o ranking em Excel, CSV ou PDF para documentação e compartilhamento.',
-        'what_is_ahp': 'O que é AHP?',
-        'ahp_explanation': 'O Processo de Análise Hierárquica (AHP) é uma técnica estruturada de tomada de decisão que usa comparações par-a-par para classificar alternativas com base em múltiplos critérios ponderados.',
-    }
-}
-
-# ─── SUBCRITERIA & DEFAULT WEIGHTS ────────────────────────────────────────────
-SUBCRITERIA = {
-    'Economic': [
-        'Accessibility of financial resources',
-        'Type and frequency of financial incentives',
-        'Duration of stable pricing periods',
-        'Competitiveness of exclusive price',
-        'Ratio of price adjustments to quality',
-        'Transparency of council-defined pricing',
-        'Impact of international price fluctuations',
-        'Benefit of exclusivity for long-term partnerships'
-    ],
-    'Social': [
-        'Frequency and quality of technical visits',
-        'Length and flexibility of contract terms',
-        'Penalties or rewards for delivery schedules'
-    ],
-    'Production': [
-        'Consistency in daily milk production',
-        'Adherence to quality standards',
-        'Economic viability of collection for different volumes'
-    ]
-}
-
-SUBCRITERIA_PT = {
-    'Economic': [
-        'Acesso a recursos financeiros',
-        'Tipo e frequência de incentivos financeiros',
-        'Duração dos períodos de preço estável',
-        'Competitividade do preço exclusivo',
-        'Relação de ajustes de preço à qualidade',
-        'Transparência na precificação do conselho',
-        'Impacto das flutuações internacionais de preço',
-        'Benefício de exclusividade para parcerias de longo prazo'
-    ],
-    'Social': [
-        'Frequência e qualidade das visitas técnicas',
-        'Duração e flexibilidade dos termos do contrato',
-        'Penalidades ou recompensas por cronogramas de entrega'
-    ],
-    'Production': [
-        'Consistência na produção diária de leite',
-        'Aderência aos padrões de qualidade',
-        'Viabilidade econômica da coleta para diferentes volumes'
-    ]
-}
-
-DEFAULT_WEIGHTS = {
-    'Accessibility of financial resources': 0.0606,
-    'Type and frequency of financial incentives': 0.0641,
-    'Duration of stable pricing periods': 0.0691,
-    'Competitiveness of exclusive price': 0.0583,
-    'Ratio of price adjustments to quality': 0.0794,
-    'Transparency of council-defined pricing': 0.1058,
-    'Impact of international price fluctuations': 0.0726,
-    'Benefit of exclusivity for long-term partnerships': 0.0742,
-    'Frequency and quality of technical visits': 0.0897,
-    'Length and flexibility of contract terms': 0.0558,
-    'Penalties or rewards for delivery schedules': 0.0766,
-    'Consistency in daily milk production': 0.0651,
-    'Adherence to quality standards': 0.0578,
-    'Economic viability of collection for different volumes': 0.0710
-}
-
-COMPARISON_MATRIX = np.array([
-    [1.0,0.94539782,0.87698987,1.03945111,0.76322418,0.57277883,0.83471074,0.81671159,0.67558528,1.08602151,0.79112272,0.93087558,1.04844291,0.85352113],
-    [1.05775578,1.0,0.9276411,1.09948542,0.80730479,0.60586011,0.88292011,0.8638814,0.71460424,1.14874552,0.83681462,0.98463902,1.10899654,0.9028169],
-    [1.14026403,1.07800312,1.0,1.18524871,0.87027708,0.65311909,0.95179063,0.93126685,0.7703456,1.23835125,0.90208877,1.06144393,1.19550173,0.97323944],
-    [0.9620462,0.90951638,0.84370478,1.0,0.73425693,0.5510397,0.8030303,0.78571429,0.64994426,1.04480287,0.76109661,0.89554531,1.00865052,0.82112676],
-    [1.31023102,1.23868955,1.14905933,1.3619211,1.0,0.75047259,1.09366391,1.07008086,0.8851728,1.42293907,1.03655352,1.21966206,1.37370242,1.11830986],
-    [1.74587459,1.65054602,1.53111433,1.81475129,1.3324937,1.0,1.45730028,1.42587601,1.17948718,1.89605735,1.38120104,1.62519201,1.83044983,1.49014085],
-    [1.1980198,1.1326053,1.05065123,1.24528302,0.91435768,0.68620038,1.0,0.97843666,0.80936455,1.30107527,0.94778068,1.11520737,1.25605536,1.02253521],
-    [1.22442244,1.1575663,1.07380608,1.27272727,0.93450882,0.70132325,1.02203857,1.0,0.82720178,1.3297491,0.96866841,1.13978495,1.28373702,1.04507042],
-    [1.48019802,1.39937598,1.29811867,1.53859348,1.12972292,0.84782609,1.23553719,1.20889488,1.0,1.60752688,1.17101828,1.37788018,1.55190311,1.26338028],
-    [0.92079208,0.87051482,0.80752533,0.95711835,0.70277078,0.52741021,0.76859504,0.75202156,0.62207358,1.0,0.72845953,0.85714286,0.96539792,0.78591549],
-    [1.2640264,1.1950078,1.10853835,1.31389365,0.96473552,0.72400756,1.05509642,1.03234501,0.85395764,1.37275986,1.0,1.17665131,1.32525952,1.07887324],
-    [1.07425743,1.01560062,0.94211288,1.11663808,0.81989924,0.61531191,0.89669421,0.87735849,0.72575251,1.16666667,0.84986945,1.0,1.12629758,0.91690141],
-    [0.95379538,0.90171607,0.83646889,0.99142367,0.7279597,0.5463138,0.79614325,0.77897574,0.64437012,1.03584229,0.75456919,0.88786482,1.0,0.81408451],
-    [1.17161716,1.10764431,1.02749638,1.21783877,0.89420655,0.6710775,0.97796143,0.95687332,0.79152731,1.27240143,0.92689295,1.0906298,1.2283737,1.0]
-])
-
 # ─── HELPER FUNCTIONS ─────────────────────────────────────────────────────────
 def get_t(key):
     return LANG[st.session_state.get('lang', 'PT')][key]
 
-def check_consistency(matrix):
-    eigenvalues, _ = np.linalg.eig(matrix)
-    lambda_max = float(np.real(max(eigenvalues)))
-    n = matrix.shape[0]
-    CI = (lambda_max - n) / (n - 1)
-    RI_values = {1:0.0,2:0.0,3:0.58,4:0.90,5:1.12,6:1.24,7:1.32,8:1.41,9:1.45,10:1.49,11:1.51,12:1.54,13:1.56,14:1.59}
-    RI = RI_values[n]
-    CR = CI / RI
-    return {'lambda_max': lambda_max, 'CI': CI, 'CR': CR, 'RI': RI, 'n': n}
-
-def normalize_weights(weights_dict):
-    total = sum(weights_dict.values())
-    return {k: v / total for k, v in weights_dict.items()}
-
-def calculate_scores(df, weights):
-    nw = normalize_weights(weights)
-    eco_w  = sum(nw[s] for s in SUBCRITERIA['Economic'])
-    soc_w  = sum(nw[s] for s in SUBCRITERIA['Social'])
-    prod_w = sum(nw[s] for s in SUBCRITERIA['Production'])
-
-    df = df.copy()
-    df['Economic Score']   = df['Economic']   * eco_w
-    df['Social Score']     = df['Social']     * soc_w
-    df['Production Score'] = df['Production'] * prod_w
-    df['Total Score']      = df['Economic Score'] + df['Social Score'] + df['Production Score']
-    df = df.sort_values('Total Score', ascending=False).reset_index(drop=True)
-    df['Ranking'] = range(1, len(df) + 1)
-    return df
-
-def to_excel(df):
-    buf = BytesIO()
-    with pd.ExcelWriter(buf, engine='openpyxl') as writer:
-        # Main results
-        df.to_excel(writer, sheet_name='Ranking', index=False)
-        # Weights sheet
-        weights_df = pd.DataFrame([
-            {'Criterion': k, 'Category': cat, 'Weight': v}
-            for cat, subs in SUBCRITERIA.items()
-            for k in subs
-            for v in [st.session_state.weights.get(k, DEFAULT_WEIGHTS[k])]
-        ])
-        weights_df.to_excel(writer, sheet_name='Weights', index=False)
-    buf.seek(0)
-    return buf.getvalue()
-
-def to_pdf(df, info):
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import cm
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-    buf = BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4,
-                            leftMargin=2*cm, rightMargin=2*cm,
-                            topMargin=2*cm, bottomMargin=2*cm)
-    story = []
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle('Title', parent=styles['Title'],
-        fontSize=22, textColor=colors.HexColor('#1a5276'),
-        spaceAfter=4, alignment=TA_CENTER, fontName='Helvetica-Bold')
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'],
-        fontSize=11, textColor=colors.HexColor('#2980b9'),
-        spaceAfter=16, alignment=TA_CENTER)
-    section_style = ParagraphStyle('Section', parent=styles['Heading2'],
-        fontSize=13, textColor=colors.HexColor('#1a5276'),
-        spaceBefore=16, spaceAfter=8, fontName='Helvetica-Bold',
-        borderPad=4)
-    normal_style = ParagraphStyle('Normal2', parent=styles['Normal'],
-        fontSize=10, textColor=colors.HexColor('#333333'), spaceAfter=4)
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'],
-        fontSize=8, textColor=colors.HexColor('#999999'), alignment=TA_CENTER)
-
-    lang = st.session_state.get('lang', 'PT')
-
-    # ── Header ────────────────────────────────────────────────────────────────
-    story.append(Paragraph("🥛 " + get_t('title'), title_style))
-    story.append(Paragraph(get_t('subtitle'), subtitle_style))
-    story.append(HRFlowable(width="100%", thickness=2,
-                            color=colors.HexColor('#2980b9'), spaceAfter=12))
-
-    # ── Info block ────────────────────────────────────────────────────────────
-    from datetime import datetime
-    date_str = datetime.now().strftime('%d/%m/%Y %H:%M')
-    info_data = [
-        ['📅 Data / Date', date_str],
-        ['👥 Produtores / Producers', str(len(df))],
-        ['🥇 Melhor / Top', df.iloc[0]['Producer']],
-        ['📊 Método / Method', 'AHP — Analytic Hierarchy Process'],
-    ]
-    info_table = Table(info_data, colWidths=[5*cm, 11*cm])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (0,-1), colors.HexColor('#dbeafe')),
-        ('BACKGROUND', (1,0), (1,-1), colors.HexColor('#f8fafc')),
-        ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor('#1a5276')),
-        ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('ROWBACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#f0f7ff'), colors.white]),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#d0e4f7')),
-        ('ROUNDEDCORNERS', [6]),
-        ('TOPPADDING', (0,0), (-1,-1), 7),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 7),
-        ('LEFTPADDING', (0,0), (-1,-1), 10),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 16))
-
-    # ── Ranking section ───────────────────────────────────────────────────────
-    story.append(Paragraph(get_t('results_title'), section_style))
-
-    rank_header = ['#', 'Produtor / Producer',
-                   get_t('economic'), get_t('social'),
-                   get_t('production'), get_t('total_score')]
-    rank_data = [rank_header]
-    medal = {1: '🥇', 2: '🥈', 3: '🥉'}
-    prod_style = ParagraphStyle('ProdCell', parent=styles['Normal'],
-        fontSize=9, textColor=colors.HexColor('#1a5276'),
-        fontName='Helvetica-Bold', leading=11, wordWrap='LTR')
-    for _, row in df.iterrows():
-        r = int(row['Ranking'])
-        icon = medal.get(r, str(r))
-        rank_data.append([
-            icon,
-            Paragraph(str(row['Producer']), prod_style),
-            f"{row['Economic Score']:.4f}",
-            f"{row['Social Score']:.4f}",
-            f"{row['Production Score']:.4f}",
-            f"{row['Total Score']:.4f}",
-        ])
-
-    col_widths = [1.2*cm, 5.5*cm, 2.8*cm, 2.5*cm, 2.8*cm, 3*cm]
-    rank_table = Table(rank_data, colWidths=col_widths, repeatRows=1)
-
-    row_colors = [
-        colors.HexColor('#1a5276'),   # header
-        colors.HexColor('#fff7e6'),   # 1st
-        colors.HexColor('#f0fdf4'),   # 2nd
-        colors.HexColor('#f0fdf4'),   # 3rd
-    ]
-    ts = TableStyle([
-        # Header
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1a5276')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('TOPPADDING', (0,0), (-1,-1), 7),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 7),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#d0e4f7')),
-        ('ROWBACKGROUNDS', (0,1), (-1,-1),
-         [colors.HexColor('#fffbeb'), colors.HexColor('#f0fdf4'), colors.white]),
-        ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
-        ('FONTSIZE', (0,1), (-1,-1), 9),
-        ('FONTNAME', (-1,1), (-1,1), 'Helvetica-Bold'),
-        ('TEXTCOLOR', (-1,1), (-1,1), colors.HexColor('#1a5276')),
-    ])
-    rank_table.setStyle(ts)
-    story.append(rank_table)
-    story.append(Spacer(1, 16))
-
-    # ── Weights section ───────────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=1,
-                            color=colors.HexColor('#d0e4f7'), spaceAfter=8))
-    w_title = '📊 Pesos dos Critérios / Criterion Weights' if lang == 'PT' else '📊 Criterion Weights'
-    story.append(Paragraph(w_title, section_style))
-
-    nw = normalize_weights(st.session_state.weights)
-    cat_labels_map = {'Economic': get_t('economic'), 'Social': get_t('social'), 'Production': get_t('production')}
-    subs_map = {'Economic': SUBCRITERIA_PT['Economic'] if lang == 'PT' else SUBCRITERIA['Economic'],
-                'Social':   SUBCRITERIA_PT['Social']   if lang == 'PT' else SUBCRITERIA['Social'],
-                'Production': SUBCRITERIA_PT['Production'] if lang == 'PT' else SUBCRITERIA['Production']}
-
-    w_header = ['Categoria / Category', 'Subcritério / Sub-criterion', 'Peso / Weight', '%']
-    w_data = [w_header]
-    cat_bg = {'Economic': colors.HexColor('#dbeafe'),
-              'Social': colors.HexColor('#dcfce7'),
-              'Production': colors.HexColor('#fef9c3')}
-
-    sub_style = ParagraphStyle('SubCell', parent=styles['Normal'],
-        fontSize=8.5, textColor=colors.HexColor('#333333'),
-        leading=11, wordWrap='LTR')
-    cat_style = ParagraphStyle('CatCell', parent=styles['Normal'],
-        fontSize=8.5, textColor=colors.HexColor('#1a5276'),
-        fontName='Helvetica-Bold', leading=11)
-
-    for cat, subs_en in SUBCRITERIA.items():
-        for sub_en, sub_label in zip(subs_en, subs_map[cat]):
-            w_data.append([
-                Paragraph(cat_labels_map[cat], cat_style),
-                Paragraph(sub_label, sub_style),
-                f"{nw[sub_en]:.4f}",
-                f"{nw[sub_en]:.1%}"
-            ])
-
-    # Total page width usable = A4(595) - margins(4cm) = ~481pt
-    # Distribute: Cat=3.5cm, Sub=9.5cm, Peso=2.5cm, %=2cm
-    w_table = Table(w_data, colWidths=[3.5*cm, 9.5*cm, 2.5*cm, 2*cm], repeatRows=1)
-    w_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#2980b9')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('ALIGN', (2,0), (-1,-1), 'CENTER'),
-        ('TOPPADDING', (0,0), (-1,-1), 5),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 5),
-        ('LEFTPADDING', (0,0), (-1,-1), 8),
-        ('GRID', (0,0), (-1,-1), 0.3, colors.HexColor('#e0e8f0')),
-        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.HexColor('#f8fafc'), colors.white]),
-    ]))
-    story.append(w_table)
-    story.append(Spacer(1, 20))
-
-    # ── Footer ────────────────────────────────────────────────────────────────
-    story.append(HRFlowable(width="100%", thickness=1,
-                            color=colors.HexColor('#d0e4f7'), spaceAfter=6))
-    story.append(Paragraph(
-        f"Dairy Selection Tool | AHP | {date_str}",
-        footer_style
-    ))
-
-    doc.build(story)
-    buf.seek(0)
-    return buf.getvalue()
+RANK_PAGE_SIZES = [10, 25, 50, 100]
+RANK_MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+RANK_STYLES = {
+    1: "background: linear-gradient(135deg,#f6d365,#fda085); color:white",
+    2: "background: linear-gradient(135deg,#a8edea,#fed6e3); color:#333",
+    3: "background: linear-gradient(135deg,#d4fc79,#96e6a1); color:#333",
+}
+RANK_DEFAULT_STYLE = "background: #f8fafc; color:#333; border: 1px solid #e8edf2"
+
+def ranking_cards_html(page_df, max_score):
+    """One HTML string with a ranking card per row, built column-wise."""
+    if page_df.empty:
+        return ""
+    rank = page_df['Ranking'].astype(int)
+    icon = rank.map(RANK_MEDALS).fillna('#' + rank.astype(str))
+    style = rank.map(RANK_STYLES).fillna(RANK_DEFAULT_STYLE)
+    name = page_df['Producer'].astype(str).map(html.escape)
+    fmt = lambda col, spec: pd.Series(np.char.mod(spec, page_df[col].to_numpy(dtype=float)), index=page_df.index)
+    bar_w = pd.Series(np.char.mod('%.1f', page_df['Total Score'].to_numpy(dtype=float) / max_score * 100),
+                      index=page_df.index)
+    cards = (
+        '<div class="ranking-card" style="' + style + '">'
+        '<div class="rank-badge">' + icon + '</div>'
+        '<div style="flex:1">'
+        '<div class="rank-name">' + name + '</div>'
+        '<div style="font-size:0.8rem; opacity:0.8; margin-top:2px">'
+        '💰 ' + fmt('Economic Score', '%.3f') + ' &nbsp;|&nbsp; '
+        '🤝 ' + fmt('Social Score', '%.3f') + ' &nbsp;|&nbsp; '
+        '🐄 ' + fmt('Production Score', '%.3f') + '</div>'
+        '<div style="margin-top:6px; background:rgba(255,255,255,0.3); border-radius:99px; height:6px; overflow:hidden">'
+        '<div style="width:' + bar_w + '%; height:100%; background:rgba(255,255,255,0.7); border-radius:99px"></div>'
+        '</div></div>'
+        '<div class="rank-score">' + fmt('Total Score', '%.4f') + '</div>'
+        '</div>'
+    )
+    return '\n'.join(cards)
+
+@st.cache_resource
+def metrics_server():
+    """Prometheus endpoint shared by all sessions, started when DAIRY_METRICS_PORT is set."""
+    return start_metrics_server() if METRICS_PORT else None
+
+@st.cache_resource
+def results_sweeper():
+    """Background thread spilling rankings left idle by any session to disk; they reload on next use."""
+    return REGISTRY.start_sweeper()
+
+def recorder():
+    return st.session_state.diagnostics
+
+def fragment_rerun():
+    """Whether this script run reruns fragments only, rather than the whole page."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+def traced_fragment(key):
+    """``st.fragment(key=key)`` whose reruns are recorded as a diagnostics run of their own."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            # A full run that ended in st.rerun() leaves its run open; do not extend it
+            with recorder().fragment(key, alone=fragment_rerun()):
+                return fn(*args, **kwargs)
+        return st.fragment(key=key)(run)
+    return decorate
+
+def timed_chart(name, figure, *args, target=None):
+    """Build and draw a figure, recorded as the ``chart_<name>`` stage.
+
+    The JSON payload size is only measured while the diagnostics panel is on.
+    """
+    start = time.perf_counter()
+    fig = figure(*args)
+    (target or st).plotly_chart(fig, use_container_width=True)
+    seconds = time.perf_counter() - start
+    nbytes = len(fig.to_json()) if st.session_state.show_diagnostics else None
+    recorder().record(f'chart_{name}', seconds, nbytes)
+
+def timed_export(rec, fmt, results, weights, lang):
+    """``export_bytes`` of the stored ranking for a download button, recorded as the ``export_<fmt>`` stage."""
+    with rec.stage(f'export_{fmt}') as stage:
+        data = export_bytes(fmt, results.to_frame(widen=True), weights, lang)
+        stage.nbytes = len(data)
+    return data
+
+@st.cache_resource
+def history_store():
+    """Run history shared by all sessions, or None when DAIRY_HISTORY_DB is empty."""
+    return HistoryStore() if HISTORY_PATH else None
+
+def set_results(df, weights=None, record=True):
+    """Store a new ranking, in compact form, and the weights it was scored with.
+
+    ``df`` is a ranking frame or an already compact ``CompactResults``.
+    ``weights`` is None for a partial (top-k) ranking, which cannot be
+    rescored when the weights change. Full rankings are also saved to the
+    history store unless ``record`` is False.
+    """
+    if isinstance(df, CompactResults):
+        st.session_state.results = df
+    else:
+        with recorder().stage('compact_results'):
+            st.session_state.results = CompactResults.from_frame(df)
+    st.session_state.scored_weights = None if weights is None else dict(weights)
+    st.session_state.sensitivity = None
+    if weights is not None and record:
+        try:
+            store = history_store()
+            if store is not None:
+                with recorder().stage('history_save'):
+                    run_id = store.save_run(df.to_frame(widen=True) if isinstance(df, CompactResults) else df,
+                                            weights)
+                st.toast(get_t('history_saved').format(id=run_id))
+        except (OSError, sqlite3.Error):
+            st.warning(get_t('history_error'))
+
+def update_weights(weights):
+    """Store new weights and move the stored ranking to them incrementally."""
+    st.session_state.weights = dict(weights)
+    if st.session_state.scored_weights is not None:
+        with recorder().stage('rescore'):
+            results = st.session_state.results.rescore(weights)
+        set_results(results, weights, record=False)
+
+def refresh_weights():
+    """Rerun only the weights panel and the results, not the whole page."""
+    st.rerun(['weights_panel', 'results'] + (['diagnostics'] if st.session_state.show_diagnostics else []))
+
+def apply_weights(weights):
+    """Button callback: replace the weights, including the sidebar slider state."""
+    update_weights(weights)
+    for sub, val in weights.items():
+        st.session_state[f"w_{sub}"] = float(min(max(val, 0.01), 0.30))
+    refresh_weights()
+
+def weights_changed():
+    """Weight slider callback."""
+    update_weights({sub: st.session_state[f"w_{sub}"] for sub in ALL_SUBCRITERIA})
+    refresh_weights()
+
+def manual_grid(num, lang):
+    """Manual-entry table (0-10 scale) with ``num`` rows, keeping the rows last submitted."""
+    grid = st.session_state.manual_grid
+    if grid is not None and len(grid) >= num:
+        return grid.iloc[:num]
+    start = 0 if grid is None else len(grid)
+    prefix = "Produtor" if lang == 'PT' else "Producer"
+    extra = pd.DataFrame({'Producer': [f"{prefix} {i+1}" for i in range(start, num)],
+                          **{sub: 5 for sub in ALL_SUBCRITERIA}})
+    return extra if grid is None else pd.concat([grid, extra], ignore_index=True)
+
+def ingest_report(upload):
+    """Warn about the rows left out of an upload and list their problems."""
+    if upload['scale'] == 10:
+        st.info(get_t('ingest_scale'))
+    if not upload['invalid_rows']:
+        return
+    st.warning(get_t('ingest_invalid').format(bad=upload['invalid_rows'], rows=upload['rows']))
+    with st.expander(get_t('ingest_report')):
+        errors = upload['errors'].assign(problem=upload['errors']['problem'].map(
+            {p: get_t(f'ingest_{p}') for p in upload['counts']}))
+        shown = len(errors)
+        total = sum(upload['counts'].values())
+        if shown < total:
+            st.caption(get_t('ingest_truncated').format(shown=shown, total=total))
+        st.dataframe(errors, use_container_width=True, hide_index=True)
+        st.download_button(get_t('ingest_download'), errors.to_csv(index=False).encode('utf-8'),
+                           'upload_errors.csv', 'text/csv', use_container_width=True)
 
 # ─── SESSION STATE ─────────────────────────────────────────────────────────────
 if 'lang' not in st.session_state:
@@ -555,26 +339,36 @@ if 'weights' not in st.session_state:
     st.session_state.weights = dict(DEFAULT_WEIGHTS)
 if 'results' not in st.session_state:
     st.session_state.results = None
+if 'scored_weights' not in st.session_state:
+    st.session_state.scored_weights = None
+if 'sensitivity' not in st.session_state:
+    st.session_state.sensitivity = None
 if 'show_tutorial' not in st.session_state:
     st.session_state.show_tutorial = True
+if 'manual_grid' not in st.session_state:
+    st.session_state.manual_grid = None
+if 'diagnostics' not in st.session_state:
+    st.session_state.diagnostics = Recorder()
+if 'show_diagnostics' not in st.session_state:
+    st.session_state.show_diagnostics = PANEL_DEFAULT
+
+metrics_server()
+results_sweeper()
+recorder().begin('app')
 
 # ─── SIDEBAR ──────────────────────────────────────────────────────────────────
-with st.sidebar:
-    st.markdown(f"### {get_t('language')}")
-    lang_choice = st.radio("", ['PT 🇧🇷', 'EN 🇬🇧'], horizontal=True,
-                           index=0 if st.session_state.lang == 'PT' else 1, label_visibility="collapsed")
-    st.session_state.lang = 'PT' if lang_choice.startswith('PT') else 'EN'
+cat_colors = {'Economic': '#dbeafe', 'Social': '#dcfce7', 'Production': '#fef9c3'}
+cat_labels_pt = {'Economic': 'Econômico', 'Social': 'Social', 'Production': 'Produção'}
 
+# Slider moves rerun this panel and the results fragment only (see weights_changed)
+@traced_fragment('weights_panel')
+def weights_panel():
     st.markdown("---")
     st.markdown(f"### {get_t('weights_title')}")
     st.caption(get_t('weights_info'))
 
-    if st.button(get_t('reset_weights'), use_container_width=True):
-        st.session_state.weights = dict(DEFAULT_WEIGHTS)
-        st.rerun()
-
-    cat_colors = {'Economic': '#dbeafe', 'Social': '#dcfce7', 'Production': '#fef9c3'}
-    cat_labels_pt = {'Economic': 'Econômico', 'Social': 'Social', 'Production': 'Produção'}
+    st.button(get_t('reset_weights'), use_container_width=True,
+              on_click=apply_weights, args=(DEFAULT_WEIGHTS,))
 
     new_weights = {}
     for cat, subs in SUBCRITERIA.items():
@@ -589,17 +383,16 @@ with st.sidebar:
                     value=float(default_val),
                     step=0.005,
                     format="%.3f",
-                    key=f"w_{sub_en}"
+                    key=f"w_{sub_en}",
+                    on_change=weights_changed,
                 )
                 new_weights[sub_en] = val
 
     st.session_state.weights = new_weights
 
     # Show normalized weights summary
-    nw = normalize_weights(st.session_state.weights)
-    eco_total  = sum(nw[s] for s in SUBCRITERIA['Economic'])
-    soc_total  = sum(nw[s] for s in SUBCRITERIA['Social'])
-    prod_total = sum(nw[s] for s in SUBCRITERIA['Production'])
+    wm = weight_model(st.session_state.weights)
+    eco_total, soc_total, prod_total = wm.category
 
     st.markdown("---")
     st.markdown("**Pesos Normalizados / Normalized Weights**")
@@ -608,6 +401,51 @@ with st.sidebar:
     col2.metric("🤝 Social", f"{soc_total:.1%}")
     col3.metric("🐄 Prod.", f"{prod_total:.1%}")
 
+with st.sidebar:
+    st.markdown(f"### {get_t('language')}")
+    lang_choice = st.radio("", ['PT 🇧🇷', 'EN 🇬🇧'], horizontal=True,
+                           index=0 if st.session_state.lang == 'PT' else 1, label_visibility="collapsed")
+    st.session_state.lang = 'PT' if lang_choice.startswith('PT') else 'EN'
+
+    weights_panel()
+
+    # Group AHP: consensus weights from several evaluators' matrices
+    with st.expander(f"👥 {get_t('group_title')}"):
+        st.caption(get_t('group_info'))
+        expert_files = st.file_uploader(get_t('group_upload'), type='csv', accept_multiple_files=True)
+        if expert_files:
+            try:
+                expert_mats = np.stack([read_expert_matrix(f) for f in expert_files])
+                if expert_mats.shape[1] != len(ALL_SUBCRITERIA):
+                    raise ValueError
+                group = group_consensus(expert_mats)
+            except ValueError:
+                st.error(get_t('group_size_error').format(n=len(ALL_SUBCRITERIA)))
+            else:
+                st.dataframe(pd.DataFrame({
+                    'Expert': [f.name for f in expert_files],
+                    'CR': group['CR'],
+                    'Dist.': group['distance'],
+                    '⚠️': ['outlier' if o else 'CR' if i else ''
+                           for o, i in zip(group['outlier'], group['inconsistent'])],
+                }), column_config={'CR': st.column_config.NumberColumn(format='%.3f'),
+                                   'Dist.': st.column_config.NumberColumn(format='%.3f')},
+                    hide_index=True, use_container_width=True)
+                outliers = group['outlier']
+                if st.checkbox(get_t('group_exclude'), value=True) and 0 < outliers.sum() < len(expert_files):
+                    group = group_consensus(expert_mats[~outliers])
+                st.caption(get_t('group_summary').format(
+                    k=group['n_experts'], cr=group['consistency']['CR'],
+                    out=int(outliers.sum()), inc=int(group['inconsistent'].sum())))
+                agg = st.radio(get_t('group_method'), ['AIJ', 'AIP'], horizontal=True,
+                               help='AIJ: geometric mean of judgments · AIP: geometric mean of priorities')
+                consensus = group['weights_aij'] if agg == 'AIJ' else group['weights_aip']
+                st.button(get_t('group_apply'), use_container_width=True, on_click=apply_weights,
+                          args=(dict(zip(ALL_SUBCRITERIA, consensus.tolist())),))
+
+    st.markdown("---")
+    st.toggle(f"🩺 {get_t('diag_toggle')}", key='show_diagnostics', help=get_t('diag_help'))
+
 # ─── MAIN CONTENT ─────────────────────────────────────────────────────────────
 st.markdown(f"""
 <div class="hero-header">
@@ -678,7 +516,7 @@ df_result = None
 if method == get_t('upload_csv'):
     col1, col2 = st.columns([2, 1])
     with col1:
-        uploaded = st.file_uploader(get_t('upload_hint'), type='csv', label_visibility="collapsed")
+        uploaded = st.file_uploader(get_t('upload_hint'), type=UPLOAD_TYPES, label_visibility="collapsed")
     with col2:
         example = pd.DataFrame({
             'Producer': ['Produtor A', 'Produtor B', 'Produtor C'],
@@ -691,74 +529,146 @@ if method == get_t('upload_csv'):
                           'exemplo_produtores.csv', 'text/csv',
                           use_container_width=True)
 
-    if uploaded:
-        df_in = pd.read_csv(uploaded)
-        required = ['Producer', 'Economic', 'Social', 'Production']
-        if not all(c in df_in.columns for c in required):
-            st.error(f"CSV deve conter: {required}")
+    upload_format = detect_format(uploaded) if uploaded else None
+    if uploaded and upload_format == 'csv' and uploaded.size > STREAM_UPLOAD_BYTES:
+        st.info(get_t('large_upload').format(k=STREAM_TOP_K))
+        if st.button(get_t('calc_button'), type='primary', use_container_width=True):
+            weights = st.session_state.weights
+            try:
+                with recorder().stage('score_stream', uploaded.size):
+                    stream = cached_stream(upload_digest(uploaded), weights, STREAM_TOP_K,
+                                           lambda: score_csv_stream(uploaded, weights, top_k=STREAM_TOP_K))
+            except IngestError:
+                st.error(get_t('ingest_columns'))
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError):
+                st.error(get_t('ingest_parse'))
+            else:
+                ingest_report(stream)
+                if stream['invalid_rows'] == stream['rows']:
+                    st.error(get_t('ingest_empty'))
+                else:
+                    set_results(stream['top'])
+                    st.success(get_t('stream_stats').format(
+                        rows=stream['rows'], seconds=stream['seconds'], rate=stream['rows_per_s'],
+                        mem=stream['peak_memory_bytes'] / 2**20))
+
+    elif uploaded:
+        # Identical uploads (same bytes) are parsed and scored once per process
+        digest = upload_digest(uploaded)
+        try:
+            with recorder().stage('csv_parse' if upload_format == 'csv' else 'excel_parse', uploaded.size):
+                upload = parsed_upload(digest, lambda: read_producers(uploaded))
+        except IngestError:
+            st.error(get_t('ingest_columns'))
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError):
+            st.error(get_t('ingest_parse'))
         else:
-            st.dataframe(df_in, use_container_width=True)
-            if st.button(get_t('calc_button'), type='primary', use_container_width=True):
-                df_result = calculate_scores(df_in, st.session_state.weights)
-                st.session_state.results = df_result
+            df_in = upload['frame']
+            if upload['sheet'] is not None:
+                st.caption(get_t('ingest_sheet').format(sheet=upload['sheet']))
+            ingest_report(upload)
+            if df_in.empty:
+                st.error(get_t('ingest_empty'))
+            else:
+                st.dataframe(df_in, use_container_width=True)
+                if st.button(get_t('calc_button'), type='primary', use_container_width=True):
+                    weights = st.session_state.weights
+                    with recorder().stage('calculate_scores'):
+                        results = cached_ranking(digest, weights, lambda: calculate_scores(df_in, weights))
+                    set_results(results, weights)
 
 # ── Manual Entry ───────────────────────────────────────────────────────────────
 else:
-    num = st.number_input(get_t('num_producers'), min_value=1, max_value=20, value=3, step=1)
-
-    all_subs_en = [s for subs in SUBCRITERIA.values() for s in subs]
-    all_subs_pt = [s for subs in SUBCRITERIA_PT.values() for s in subs]
-    n_eco  = len(SUBCRITERIA['Economic'])
-    n_soc  = len(SUBCRITERIA['Social'])
-
-    producer_data = []
-    for i in range(int(num)):
-        with st.expander(f"🐄 Produtor {i+1}" if st.session_state.lang == 'PT' else f"🐄 Producer {i+1}", expanded=(i == 0)):
-            pname = st.text_input(
-                get_t('producer_name'),
-                value=f"Produtor {i+1}" if st.session_state.lang == 'PT' else f"Producer {i+1}",
-                key=f"pname_{i}"
-            )
+    grid_mode = st.toggle(get_t('grid_entry'), value=True, help=get_t('grid_help'))
+    num = st.number_input(get_t('num_producers'), min_value=1,
+                          max_value=MANUAL_GRID_MAX if grid_mode else MANUAL_SLIDER_MAX,
+                          value=3, step=1)
+
+    if grid_mode:
+        # One editable table inside a form: edits stay in the browser until
+        # the submit button is pressed, so nothing reruns while typing
+        grid = manual_grid(int(num), st.session_state.lang)
+        sub_labels = ALL_SUBCRITERIA_PT if st.session_state.lang == 'PT' else ALL_SUBCRITERIA
+        column_config = {'Producer': st.column_config.TextColumn(get_t('producer_name'), required=True)}
+        for sub, label in zip(ALL_SUBCRITERIA, sub_labels):
+            column_config[sub] = st.column_config.NumberColumn(
+                label, min_value=0, max_value=10, step=1, default=5, required=True)
+        with st.form('manual_grid_form', border=False):
+            edited = st.data_editor(grid, column_config=column_config, hide_index=True,
+                                    num_rows='fixed', use_container_width=True)
+            submitted = st.form_submit_button(get_t('calc_button'), type='primary',
+                                              use_container_width=True)
+        if submitted:
+            if edited[ALL_SUBCRITERIA].isna().any().any():
+                st.error(get_t('grid_missing'))
+            else:
+                st.session_state.manual_grid = edited
+                df_in = pd.DataFrame(edited[ALL_SUBCRITERIA].to_numpy(dtype=float) / 10, columns=ALL_SUBCRITERIA)
+                df_in.insert(0, 'Producer', edited['Producer'].to_numpy())
+                with recorder().stage('calculate_scores'):
+                    df_result = calculate_scores(df_in, st.session_state.weights)
+                set_results(df_result, st.session_state.weights)
+
+    else:
+        n_eco  = len(SUBCRITERIA['Economic'])
+        n_soc  = len(SUBCRITERIA['Social'])
+
+        producer_data = []
+        for i in range(int(num)):
+            with st.expander(f"🐄 Produtor {i+1}" if st.session_state.lang == 'PT' else f"🐄 Producer {i+1}", expanded=(i == 0)):
+                pname = st.text_input(
+                    get_t('producer_name'),
+                    value=f"Produtor {i+1}" if st.session_state.lang == 'PT' else f"Producer {i+1}",
+                    key=f"pname_{i}"
+                )
 
-            sub_labels = all_subs_pt if st.session_state.lang == 'PT' else all_subs_en
-
-            # Economic
-            st.markdown(f'<span class="badge-economic">💰 {get_t("economic_criteria")}</span>', unsafe_allow_html=True)
-            eco_scores = []
-            cols = st.columns(2)
-            for j, label in enumerate(sub_labels[:n_eco]):
-                with cols[j % 2]:
-                    val = st.slider(label, 0, 10, 5, key=f"p{i}_eco_{j}")
-                    eco_scores.append(val / 10)
-
-            # Social
-            st.markdown(f'<span class="badge-social">🤝 {get_t("social_criteria")}</span>', unsafe_allow_html=True)
-            soc_scores = []
-            cols = st.columns(2)
-            for j, label in enumerate(sub_labels[n_eco:n_eco + n_soc]):
-                with cols[j % 2]:
-                    val = st.slider(label, 0, 10, 5, key=f"p{i}_soc_{j}")
-                    soc_scores.append(val / 10)
-
-            # Production
-            st.markdown(f'<span class="badge-production">🐄 {get_t("production_criteria")}</span>', unsafe_allow_html=True)
-            prod_scores = []
-            cols = st.columns(2)
-            for j, label in enumerate(sub_labels[n_eco + n_soc:]):
-                with cols[j % 2]:
-                    val = st.slider(label, 0, 10, 5, key=f"p{i}_prod_{j}")
-                    prod_scores.append(val / 10)
-
-            producer_data.append([pname, np.mean(eco_scores), np.mean(soc_scores), np.mean(prod_scores)])
-
-    if st.button(get_t('calc_button'), type='primary', use_container_width=True):
-        df_in = pd.DataFrame(producer_data, columns=['Producer', 'Economic', 'Social', 'Production'])
-        df_result = calculate_scores(df_in, st.session_state.weights)
-        st.session_state.results = df_result
+                sub_labels = ALL_SUBCRITERIA_PT if st.session_state.lang == 'PT' else ALL_SUBCRITERIA
+
+                # Economic
+                st.markdown(f'<span class="badge-economic">💰 {get_t("economic_criteria")}</span>', unsafe_allow_html=True)
+                eco_scores = []
+                cols = st.columns(2)
+                for j, label in enumerate(sub_labels[:n_eco]):
+                    with cols[j % 2]:
+                        val = st.slider(label, 0, 10, 5, key=f"p{i}_eco_{j}")
+                        eco_scores.append(val / 10)
+
+                # Social
+                st.markdown(f'<span class="badge-social">🤝 {get_t("social_criteria")}</span>', unsafe_allow_html=True)
+                soc_scores = []
+                cols = st.columns(2)
+                for j, label in enumerate(sub_labels[n_eco:n_eco + n_soc]):
+                    with cols[j % 2]:
+                        val = st.slider(label, 0, 10, 5, key=f"p{i}_soc_{j}")
+                        soc_scores.append(val / 10)
+
+                # Production
+                st.markdown(f'<span class="badge-production">🐄 {get_t("production_criteria")}</span>', unsafe_allow_html=True)
+                prod_scores = []
+                cols = st.columns(2)
+                for j, label in enumerate(sub_labels[n_eco + n_soc:]):
+                    with cols[j % 2]:
+                        val = st.slider(label, 0, 10, 5, key=f"p{i}_prod_{j}")
+                        prod_scores.append(val / 10)
+
+                producer_data.append([pname] + eco_scores + soc_scores + prod_scores)
+
+        if st.button(get_t('calc_button'), type='primary', use_container_width=True):
+            df_in = pd.DataFrame(producer_data, columns=['Producer'] + ALL_SUBCRITERIA)
+            with recorder().stage('calculate_scores'):
+                df_result = calculate_scores(df_in, st.session_state.weights)
+            set_results(df_result, st.session_state.weights)
 
 # ─── RESULTS ──────────────────────────────────────────────────────────────────
-if st.session_state.results is not None:
-    df = st.session_state.results
+# A fragment, so widgets in the tabs and weight changes redraw only this part
+@traced_fragment('results')
+def results_area():
+    results = st.session_state.results
+    if results is None:
+        return
+    with recorder().stage('results_frame'):
+        df = results.to_frame()
+    wm = weight_model(st.session_state.weights)
     st.markdown("---")
     st.markdown(f"## {get_t('results_title')}")
 
@@ -783,254 +693,285 @@ if st.session_state.results is not None:
     st.markdown("<br>", unsafe_allow_html=True)
 
     # ── Tabs ─────────────────────────────────────────────────────────────────
+    # Only the open tab is rendered; switching tabs reruns this fragment
     t1, t2, t3, t4, t5 = st.tabs([
         get_t('ranking_tab'), get_t('charts_tab'),
         get_t('details_tab'), get_t('consistency_tab'), get_t('export_tab')
-    ])
+    ], key='results_tab', on_change='rerun')
 
     # ── Tab 1: Ranking ────────────────────────────────────────────────────────
-    with t1:
-        medal = {1: "🥇", 2: "🥈", 3: "🥉"}
-        rank_colors = {
-            1: "background: linear-gradient(135deg,#f6d365,#fda085); color:white",
-            2: "background: linear-gradient(135deg,#a8edea,#fed6e3); color:#333",
-            3: "background: linear-gradient(135deg,#d4fc79,#96e6a1); color:#333",
-        }
-        default_color = "background: #f8fafc; color:#333; border: 1px solid #e8edf2"
-
-        for _, row in df.iterrows():
-            rank = int(row['Ranking'])
-            style = rank_colors.get(rank, default_color)
-            icon = medal.get(rank, f"#{rank}")
-            bar_w = (row['Total Score'] / df['Total Score'].max()) * 100
-
-            st.markdown(f"""
-            <div class="ranking-card" style="{style}">
-                <div class="rank-badge">{icon}</div>
-                <div style="flex:1">
-                    <div class="rank-name">{row['Producer']}</div>
-                    <div style="font-size:0.8rem; opacity:0.8; margin-top:2px">
-                        💰 {row['Economic Score']:.3f} &nbsp;|&nbsp;
-                        🤝 {row['Social Score']:.3f} &nbsp;|&nbsp;
-                        🐄 {row['Production Score']:.3f}
-                    </div>
-                    <div style="margin-top:6px; background:rgba(255,255,255,0.3); border-radius:99px; height:6px; overflow:hidden">
-                        <div style="width:{bar_w:.1f}%; height:100%; background:rgba(255,255,255,0.7); border-radius:99px"></div>
-                    </div>
-                </div>
-                <div class="rank-score">{row['Total Score']:.4f}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    if t1.open:
+        with t1:
+            rc1, rc2, rc3 = st.columns([2, 1, 1])
+            query = rc1.text_input(get_t('search_producer'), key='rank_search',
+                                  on_change=lambda: st.session_state.update(rank_page=1))
+            page_size = rc2.selectbox(get_t('page_size'), RANK_PAGE_SIZES, index=1, key='rank_page_size')
+
+            view = df
+            if query:
+                view = df[df['Producer'].astype(str).str.contains(query, case=False, regex=False)]
+            n_pages = max(1, -(-len(view) // page_size))
+            if st.session_state.get('rank_page', 1) > n_pages:
+                st.session_state.rank_page = 1
+            page = rc3.number_input(get_t('page'), min_value=1, max_value=n_pages, step=1, key='rank_page')
+
+            start = (int(page) - 1) * page_size
+            page_df = view.iloc[start:start + page_size]
+            with recorder().stage('ranking_html') as stage:
+                cards = ranking_cards_html(page_df, df['Total Score'].max())
+                stage.nbytes = len(cards)
+            st.markdown(cards, unsafe_allow_html=True)
+            st.caption(get_t('page_info').format(
+                start=start + 1 if len(page_df) else 0, end=start + len(page_df), total=len(view)))
 
     # ── Tab 2: Charts ─────────────────────────────────────────────────────────
-    with t2:
-        # Bar chart - total scores (full width)
-        fig_bar = px.bar(
-            df.sort_values('Total Score'),
-            x='Total Score', y='Producer', orientation='h',
-            color='Total Score',
-            color_continuous_scale='Blues',
-            title=get_t('total_score'),
-            text='Total Score'
-        )
-        fig_bar.update_traces(texttemplate='%{text:.4f}', textposition='outside')
-        fig_bar.update_layout(
-            plot_bgcolor='white', paper_bgcolor='white',
-            coloraxis_showscale=False,
-            height=max(320, len(df) * 55 + 80),
-            margin=dict(l=10, r=80, t=50, b=20),
-            font=dict(family='Inter'),
-            title=dict(font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
-            yaxis=dict(tickfont=dict(size=11)),
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-        # Stacked bar (full width)
-        fig_stack = go.Figure()
-        chart_colors = ['#2980b9', '#27ae60', '#f39c12']
-        cats = [
-            (get_t('economic'), 'Economic Score'),
-            (get_t('social'), 'Social Score'),
-            (get_t('production'), 'Production Score'),
-        ]
-        for (cat_label, col_name), color in zip(cats, chart_colors):
-            fig_stack.add_trace(go.Bar(
-                name=cat_label, x=df['Producer'],
-                y=df[col_name], marker_color=color,
-                hovertemplate='<b>%{x}</b><br>' + cat_label + ': %{y:.4f}<extra></extra>'
-            ))
-        fig_stack.update_layout(
-            barmode='stack',
-            title=dict(text='Score Breakdown por Categoria / by Category',
-                       font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
-            plot_bgcolor='white', paper_bgcolor='white',
-            height=max(320, len(df) * 55 + 100),
-            margin=dict(l=10, r=10, t=50, b=60),
-            font=dict(family='Inter'),
-            legend=dict(orientation='h', yanchor='top', y=-0.15,
-                       xanchor='center', x=0.5, font=dict(size=11)),
-            xaxis=dict(tickfont=dict(size=11)),
-        )
-        st.plotly_chart(fig_stack, use_container_width=True)
-
-        # Radar chart — fixed labels, only show when ≥2 producers
-        if len(df) >= 1:
-            categories = [get_t('economic'), get_t('social'), get_t('production')]
-            max_val = df[['Economic Score','Social Score','Production Score']].max().max()
-
-            fig_radar = go.Figure()
-            palette = ['#2980b9', '#27ae60', '#f39c12', '#e74c3c',
-                       '#9b59b6', '#1abc9c', '#e67e22', '#34495e']
-            for idx, (_, row) in enumerate(df.iterrows()):
-                vals = [row['Economic Score'], row['Social Score'], row['Production Score']]
-                fig_radar.add_trace(go.Scatterpolar(
-                    r=vals + [vals[0]],
-                    theta=categories + [categories[0]],
-                    fill='toself',
-                    name=row['Producer'],
-                    line=dict(color=palette[idx % len(palette)], width=2),
-                    fillcolor=palette[idx % len(palette)],
-                    opacity=0.25,
-                    hovertemplate='<b>%{fullData.name}</b><br>%{theta}: %{r:.4f}<extra></extra>'
-                ))
-
-            fig_radar.update_layout(
-                polar=dict(
-                    bgcolor='rgba(240,247,255,0.5)',
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, max_val * 1.15],
-                        tickformat='.3f',
-                        tickfont=dict(size=9, color='#666'),
-                        gridcolor='#d0e4f7',
-                        linecolor='#d0e4f7',
-                        nticks=5,
-                    ),
-                    angularaxis=dict(
-                        tickfont=dict(size=13, color='#1a5276', family='Inter'),
-                        linecolor='#d0e4f7',
-                        gridcolor='#d0e4f7',
-                    )
-                ),
-                title=dict(
-                    text='Radar — Score por Categoria / Category Score Radar',
-                    font=dict(size=14, color='#1a5276'),
-                    x=0, xanchor='left'
-                ),
-                paper_bgcolor='white',
-                height=420,
-                font=dict(family='Inter'),
-                legend=dict(
-                    orientation='h',
-                    yanchor='bottom', y=-0.15,
-                    xanchor='center', x=0.5,
-                    font=dict(size=10)
-                ),
-                margin=dict(t=60, b=60, l=60, r=60)
-            )
-            st.plotly_chart(fig_radar, use_container_width=True)
-
-        # Weights donut
-        nw = normalize_weights(st.session_state.weights)
-        cats_w = {
-            get_t('economic'): sum(nw[s] for s in SUBCRITERIA['Economic']),
-            get_t('social'): sum(nw[s] for s in SUBCRITERIA['Social']),
-            get_t('production'): sum(nw[s] for s in SUBCRITERIA['Production']),
-        }
-        fig_donut = go.Figure(go.Pie(
-            labels=list(cats_w.keys()),
-            values=list(cats_w.values()),
-            hole=0.55,
-            marker_colors=['#2980b9', '#27ae60', '#f39c12'],
-        ))
-        fig_donut.update_layout(
-            title='Peso por Categoria / Category Weights',
-            paper_bgcolor='white',
-            height=320,
-            font=dict(family='Inter'),
-            showlegend=True
-        )
-        st.plotly_chart(fig_donut, use_container_width=True)
+    if t2.open:
+        with t2:
+            lang = st.session_state.lang
+            large = len(df) > charts.CHART_FULL_MAX
+            top_n = charts.CHART_TOP_N if large else None
+            if large:
+                st.info(get_t('charts_large').format(n=charts.CHART_TOP_N))
+
+            timed_chart('bar', charts.bar_figure, df, lang, top_n)
+            timed_chart('stacked', charts.stacked_figure, df, lang, top_n)
+
+            if large:
+                h1, h2 = st.columns(2)
+                timed_chart('histogram', charts.histogram_figure, df, lang, target=h1)
+                timed_chart('scatter', charts.scatter_figure, df, lang, target=h2)
+
+            # Radar chart — every producer for small sets, a chosen few otherwise
+            radar_df = df
+            if large:
+                choices = df['Producer'].head(charts.RADAR_CHOICES).tolist()
+                picked = st.multiselect(get_t('radar_select'), choices, default=choices[:5],
+                                        max_selections=charts.RADAR_MAX_PRODUCERS)
+                radar_df = df[df['Producer'].isin(picked)]
+            if len(radar_df) >= 1:
+                timed_chart('radar', charts.radar_figure, radar_df, lang)
+
+            # Weights donut
+            timed_chart('donut', charts.donut_figure, wm, lang)
 
     # ── Tab 3: Details ────────────────────────────────────────────────────────
-    with t3:
-        st.dataframe(
-            df[['Ranking', 'Producer', 'Economic Score', 'Social Score', 'Production Score', 'Total Score']]
-            .style.background_gradient(subset=['Total Score'], cmap='Blues')
-            .format({'Economic Score': '{:.4f}', 'Social Score': '{:.4f}',
-                     'Production Score': '{:.4f}', 'Total Score': '{:.4f}'}),
-            use_container_width=True, hide_index=True
-        )
-
-        # Weights breakdown table
-        st.markdown(f"#### {get_t('subcriteria_scores')}")
-        nw = normalize_weights(st.session_state.weights)
-        weight_rows = []
-        for cat, subs in SUBCRITERIA.items():
-            subs_pt = SUBCRITERIA_PT[cat]
-            cat_label = cat_labels_pt[cat] if st.session_state.lang == 'PT' else cat
-            for sub_en, sub_pt in zip(subs, subs_pt):
-                sub_label = sub_pt if st.session_state.lang == 'PT' else sub_en
+    if t3.open:
+        with t3:
+            # Column formats are applied in the browser; a pandas Styler would
+            # render every cell server-side on each weight change
+            score_fmt = st.column_config.NumberColumn(format='%.4f')
+            st.dataframe(
+                df[['Ranking', 'Producer', 'Economic Score', 'Social Score', 'Production Score', 'Total Score']],
+                column_config={
+                    'Economic Score': score_fmt, 'Social Score': score_fmt, 'Production Score': score_fmt,
+                    'Total Score': st.column_config.ProgressColumn(
+                        format='%.4f', min_value=0.0, max_value=float(df['Total Score'].max())),
+                },
+                use_container_width=True, hide_index=True
+            )
+
+            # Weights breakdown table
+            st.markdown(f"#### {get_t('subcriteria_scores')}")
+            weight_rows = []
+            for cat_label, sub_label, w in wm.rows(st.session_state.lang):
                 weight_rows.append({
                     'Categoria' if st.session_state.lang == 'PT' else 'Category': cat_label,
                     'Subcritério' if st.session_state.lang == 'PT' else 'Sub-criterion': sub_label,
-                    'Peso / Weight': f"{nw[sub_en]:.4f} ({nw[sub_en]:.1%})"
+                    'Peso / Weight': f"{w:.4f} ({w:.1%})"
                 })
-        st.dataframe(pd.DataFrame(weight_rows), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(weight_rows), use_container_width=True, hide_index=True)
+
+            # Monte Carlo weight sensitivity
+            st.markdown(f"#### {get_t('sensitivity_title')}")
+            st.caption(get_t('sensitivity_info'))
+            layout = score_layout(df.columns)
+            if layout is None:
+                st.info(get_t('sensitivity_unavailable'))
+            elif len(df) > MAX_PRODUCERS:
+                st.info(get_t('sensitivity_too_many').format(max=MAX_PRODUCERS, n=len(df)))
+            else:
+                sc1, sc2, sc3 = st.columns([1, 1, 1])
+                draws = sc1.select_slider(get_t('sensitivity_draws'), [1_000, 10_000, 50_000, 100_000], value=10_000)
+                spread = sc2.select_slider(get_t('sensitivity_spread'), ['low', 'medium', 'high'], value='medium')
+                if sc3.button(get_t('sensitivity_run'), use_container_width=True):
+                    score_cols = ALL_SUBCRITERIA if layout == 'subcriteria' else ['Economic', 'Social', 'Production']
+                    sens = weight_sensitivity(
+                        df[score_cols].to_numpy(dtype=float), wm,
+                        draws=draws, concentration={'low': 800.0, 'medium': 200.0, 'high': 50.0}[spread],
+                        workers=SENSITIVITY_WORKERS,
+                    )
+                    st.session_state.sensitivity = pd.DataFrame({
+                        'Producer': df['Producer'],
+                        'Ranking': sens['base_rank'],
+                        'Mean Rank': sens['mean_rank'],
+                        'Rank 5%': sens['rank_low'],
+                        'Rank 95%': sens['rank_high'],
+                        'P(Top 3)': sens['p_top'],
+                    }).sort_values('Ranking')
+                if st.session_state.sensitivity is not None:
+                    st.dataframe(
+                        st.session_state.sensitivity,
+                        column_config={'Mean Rank': st.column_config.NumberColumn(format='%.2f'),
+                                       'P(Top 3)': st.column_config.NumberColumn(format='percent')},
+                        use_container_width=True, hide_index=True
+                    )
 
-    # ── Tab 4: Consistency ────────────────────────────────────────────────────
-    with t4:
-        st.markdown(f"#### {get_t('consistency_title')}")
-        cons = check_consistency(COMPARISON_MATRIX)
-
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("n (critérios)", cons['n'])
-        c2.metric("λ_max", f"{cons['lambda_max']:.4f}")
-        c3.metric("CI", f"{cons['CI']:.4f}")
-        c4.metric("CR", f"{cons['CR']:.4f}")
-
-        if cons['CR'] < 0.1:
-            st.success(get_t('cr_ok'))
-        else:
-            st.error(get_t('cr_fail'))
+            # Rank history of one producer across saved runs
+            store = history_store() if HISTORY_PATH else None
+            if store is not None:
+                st.markdown(f"#### {get_t('history_title')}")
+                st.caption(get_t('history_info'))
+                hc1, hc2 = st.columns([3, 1])
+                producer = hc1.selectbox(get_t('history_producer'), df['Producer'].head(charts.RADAR_CHOICES))
+                months = hc2.number_input(get_t('history_months'), min_value=1, max_value=120, value=24)
+                since = datetime.now(timezone.utc) - timedelta(days=30.44 * months)
+                hist = store.producer_history(producer, since=since)
+                if hist.empty:
+                    st.info(get_t('history_empty'))
+                else:
+                    hist['created_at'] = pd.to_datetime(hist['created_at'])
+                    st.line_chart(hist, x='created_at', y='Ranking', height=220)
+                    st.dataframe(hist.drop(columns=['Producer', 'weights_hash']),
+                                 use_container_width=True, hide_index=True)
 
-        with st.expander("📐 Matriz de Comparação / Comparison Matrix"):
-            all_subs = [s for subs in SUBCRITERIA.values() for s in subs]
-            df_mat = pd.DataFrame(COMPARISON_MATRIX, index=all_subs, columns=all_subs)
-            st.dataframe(df_mat.style.format("{:.4f}").background_gradient(cmap='Blues'),
-                        use_container_width=True)
+    # ── Tab 4: Consistency ────────────────────────────────────────────────────
+    if t4.open:
+        with t4:
+            st.markdown(f"#### {get_t('consistency_title')}")
+            cons = check_consistency(COMPARISON_MATRIX)
+
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("n (critérios)", cons['n'])
+            c2.metric("λ_max", f"{cons['lambda_max']:.4f}")
+            c3.metric("CI", f"{cons['CI']:.4f}")
+            c4.metric("CR", f"{cons['CR']:.4f}")
+
+            if cons['CR'] < 0.1:
+                st.success(get_t('cr_ok'))
+            else:
+                st.error(get_t('cr_fail'))
+
+            with st.expander("📐 Matriz de Comparação / Comparison Matrix"):
+                df_mat = pd.DataFrame(COMPARISON_MATRIX, index=ALL_SUBCRITERIA, columns=ALL_SUBCRITERIA)
+                # NumPy-computed shading instead of background_gradient, which imports matplotlib
+                st.dataframe(df_mat.style.format("{:.4f}").apply(charts.gradient_styles, axis=None),
+                            use_container_width=True)
+                df_prio = pd.DataFrame({'Prioridade / Priority': cons['weights']}, index=ALL_SUBCRITERIA)
+                st.dataframe(df_prio, column_config={
+                    'Prioridade / Priority': st.column_config.NumberColumn(format='%.4f')},
+                    use_container_width=True)
 
     # ── Tab 5: Export ─────────────────────────────────────────────────────────
-    with t5:
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            excel_data = to_excel(df)
-            st.download_button(
-                get_t('download_excel'),
-                data=excel_data,
-                file_name='dairy_ranking_report.xlsx',
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                use_container_width=True
-            )
-        with col2:
-            csv_data = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                get_t('download_csv'),
-                data=csv_data,
-                file_name='dairy_ranking.csv',
-                mime='text/csv',
-                use_container_width=True
-            )
-        with col3:
-            try:
-                pdf_data = to_pdf(df, {})
+    if t5.open:
+        with t5:
+            # Files are only built when a download is clicked, and memoized by content
+            lang = st.session_state.lang
+            weights = wm
+            rec = recorder()  # the download callbacks run outside the script
+            col1, col2, col3 = st.columns(3)
+            with col1:
                 st.download_button(
-                    get_t('download_pdf'),
-                    data=pdf_data,
-                    file_name='dairy_ranking_report.pdf',
-                    mime='application/pdf',
+                    get_t('download_excel'),
+                    data=lambda: timed_export(rec, 'xlsx', results, weights, lang),
+                    file_name='dairy_ranking_report.xlsx',
+                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                     use_container_width=True
                 )
-            except Exception as e:
-                st.warning(f"PDF: instale reportlab. `pip install reportlab`")
-        st.dataframe(df, use_container_width=True, hide_index=True)
+            with col2:
+                st.download_button(
+                    get_t('download_csv'),
+                    data=lambda: timed_export(rec, 'csv', results, weights, lang),
+                    file_name='dairy_ranking.csv',
+                    mime='text/csv',
+                    use_container_width=True
+                )
+            with col3:
+                if importlib.util.find_spec('reportlab') is not None:
+                    st.download_button(
+                        get_t('download_pdf'),
+                        data=lambda: timed_export(rec, 'pdf', results, weights, lang),
+                        file_name='dairy_ranking_report.pdf',
+                        mime='application/pdf',
+                        use_container_width=True
+                    )
+                else:
+                    st.warning(f"PDF: instale reportlab. `pip install reportlab`")
+
+            # Compressed and columnar formats for large rankings / BI pipelines
+            col4, col5, col6 = st.columns(3)
+            with col4:
+                st.download_button(
+                    get_t('download_csv_gz'),
+                    data=lambda: timed_export(rec, 'csv.gz', results, weights, lang),
+                    file_name='dairy_ranking.csv.gz',
+                    mime='application/gzip',
+                    use_container_width=True
+                )
+            if importlib.util.find_spec('pyarrow') is not None:
+                with col5:
+                    st.download_button(
+                        get_t('download_parquet'),
+                        data=lambda: timed_export(rec, 'parquet', results, weights, lang),
+                        file_name='dairy_ranking.parquet',
+                        mime='application/vnd.apache.parquet',
+                        use_container_width=True
+                    )
+                with col6:
+                    st.download_button(
+                        get_t('download_arrow'),
+                        data=lambda: timed_export(rec, 'arrow', results, weights, lang),
+                        file_name='dairy_ranking.arrow',
+                        mime='application/vnd.apache.arrow.file',
+                        use_container_width=True
+                    )
+            st.dataframe(df, use_container_width=True, hide_index=True)
+
+results_area()
+
+# ─── DIAGNOSTICS ──────────────────────────────────────────────────────────────
+# Opt-in (sidebar toggle or DAIRY_DIAGNOSTICS=1): stage timings of this
+# session's recent reruns, newest first
+@st.fragment(key='diagnostics')
+def diagnostics_panel():
+    if not st.session_state.show_diagnostics:
+        return
+    st.markdown("---")
+    st.markdown(f"### 🩺 {get_t('diag_title')}")
+    st.caption(get_t('diag_info'))
+    results = st.session_state.results
+    if results is not None:
+        mem, total = results.memory(), REGISTRY.stats()
+        size = lambda n: f"{n / 2**20:.2f} MiB" if n >= 2**20 else f"{n / 1024:.1f} KiB"
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric(get_t('diag_mem_session'), size(mem['session_bytes']))
+        m2.metric(get_t('diag_mem_shared'), size(mem['shared_bytes']))
+        m3.metric(get_t('diag_mem_frame'), size(mem['frame_bytes'] or 0))
+        m4.metric(get_t('diag_mem_all'), size(total['session_bytes'] + total['shared_bytes']))
+        st.caption(get_t('diag_mem_info').format(results=total['results'], evicted=total['evicted'],
+                                                 minutes=IDLE_SECONDS / 60))
+    cache = UPLOAD_CACHE.stats()
+    st.caption(get_t('diag_cache_info').format(mib=cache['bytes'] / 2**20, rate=cache['hit_rate'], **cache))
+    rows = pd.DataFrame(recorder().rows(), columns=['run', 'scope', 'stage', 'seconds', 'bytes'])
+    if rows.empty:
+        st.info(get_t('diag_empty'))
+        return
+    last = rows[rows['run'] == rows['run'].iloc[0]]
+    d1, d2, d3 = st.columns(3)
+    d1.metric(get_t('diag_last_run'), f"#{last['run'].iloc[0]} · {last['scope'].iloc[0]}")
+    d2.metric(get_t('diag_total'), f"{last['seconds'].sum() * 1000:.1f} ms")
+    d3.metric(get_t('diag_payload'), f"{last['bytes'].sum() / 1024:.1f} KiB")
+    rows['ms'] = rows['seconds'] * 1000
+    rows['KiB'] = rows['bytes'] / 1024
+    st.dataframe(
+        rows[['run', 'scope', 'stage', 'ms', 'KiB']],
+        column_config={'ms': st.column_config.NumberColumn(format='%.2f'),
+                       'KiB': st.column_config.NumberColumn(format='%.1f')},
+        use_container_width=True, hide_index=True,
+    )
+    b1, b2 = st.columns(2)
+    b1.button(get_t('diag_refresh'), use_container_width=True)
+    b2.download_button(get_t('diag_download'), recorder().to_jsonl(), 'dairy_diagnostics.jsonl',
+                       'application/jsonl', use_container_width=True)
+
+diagnostics_panel()
+recorder().end('app')
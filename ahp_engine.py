@@ -0,0 +1,359 @@
+"""Headless AHP scoring engine for the Dairy Selection Tool.
+
+Everything here works on plain dicts and NumPy arrays so it can be imported by
+batch jobs and worker processes without starting Streamlit. Do not import
+streamlit, plotly or reportlab from this module.
+"""
+import functools
+import hashlib
+
+import numpy as np
+
+from random_index import random_index
+
+# ─── SUBCRITERIA & DEFAULT WEIGHTS ────────────────────────────────────────────
+SUBCRITERIA = {
+    'Economic': [
+        'Accessibility of financial resources',
+        'Type and frequency of financial incentives',
+        'Duration of stable pricing periods',
+        'Competitiveness of exclusive price',
+        'Ratio of price adjustments to quality',
+        'Transparency of council-defined pricing',
+        'Impact of international price fluctuations',
+        'Benefit of exclusivity for long-term partnerships'
+    ],
+    'Social': [
+        'Frequency and quality of technical visits',
+        'Length and flexibility of contract terms',
+        'Penalties or rewards for delivery schedules'
+    ],
+    'Production': [
+        'Consistency in daily milk production',
+        'Adherence to quality standards',
+        'Economic viability of collection for different volumes'
+    ]
+}
+
+SUBCRITERIA_PT = {
+    'Economic': [
+        'Acesso a recursos financeiros',
+        'Tipo e frequência de incentivos financeiros',
+        'Duração dos períodos de preço estável',
+        'Competitividade do preço exclusivo',
+        'Relação de ajustes de preço à qualidade',
+        'Transparência na precificação do conselho',
+        'Impacto das flutuações internacionais de preço',
+        'Benefício de exclusividade para parcerias de longo prazo'
+    ],
+    'Social': [
+        'Frequência e qualidade das visitas técnicas',
+        'Duração e flexibilidade dos termos do contrato',
+        'Penalidades ou recompensas por cronogramas de entrega'
+    ],
+    'Production': [
+        'Consistência na produção diária de leite',
+        'Aderência aos padrões de qualidade',
+        'Viabilidade econômica da coleta para diferentes volumes'
+    ]
+}
+
+COMPARISON_MATRIX = np.array([
+    [1.0,0.94539782,0.87698987,1.03945111,0.76322418,0.57277883,0.83471074,0.81671159,0.67558528,1.08602151,0.79112272,0.93087558,1.04844291,0.85352113],
+    [1.05775578,1.0,0.9276411,1.09948542,0.80730479,0.60586011,0.88292011,0.8638814,0.71460424,1.14874552,0.83681462,0.98463902,1.10899654,0.9028169],
+    [1.14026403,1.07800312,1.0,1.18524871,0.87027708,0.65311909,0.95179063,0.93126685,0.7703456,1.23835125,0.90208877,1.06144393,1.19550173,0.97323944],
+    [0.9620462,0.90951638,0.84370478,1.0,0.73425693,0.5510397,0.8030303,0.78571429,0.64994426,1.04480287,0.76109661,0.89554531,1.00865052,0.82112676],
+    [1.31023102,1.23868955,1.14905933,1.3619211,1.0,0.75047259,1.09366391,1.07008086,0.8851728,1.42293907,1.03655352,1.21966206,1.37370242,1.11830986],
+    [1.74587459,1.65054602,1.53111433,1.81475129,1.3324937,1.0,1.45730028,1.42587601,1.17948718,1.89605735,1.38120104,1.62519201,1.83044983,1.49014085],
+    [1.1980198,1.1326053,1.05065123,1.24528302,0.91435768,0.68620038,1.0,0.97843666,0.80936455,1.30107527,0.94778068,1.11520737,1.25605536,1.02253521],
+    [1.22442244,1.1575663,1.07380608,1.27272727,0.93450882,0.70132325,1.02203857,1.0,0.82720178,1.3297491,0.96866841,1.13978495,1.28373702,1.04507042],
+    [1.48019802,1.39937598,1.29811867,1.53859348,1.12972292,0.84782609,1.23553719,1.20889488,1.0,1.60752688,1.17101828,1.37788018,1.55190311,1.26338028],
+    [0.92079208,0.87051482,0.80752533,0.95711835,0.70277078,0.52741021,0.76859504,0.75202156,0.62207358,1.0,0.72845953,0.85714286,0.96539792,0.78591549],
+    [1.2640264,1.1950078,1.10853835,1.31389365,0.96473552,0.72400756,1.05509642,1.03234501,0.85395764,1.37275986,1.0,1.17665131,1.32525952,1.07887324],
+    [1.07425743,1.01560062,0.94211288,1.11663808,0.81989924,0.61531191,0.89669421,0.87735849,0.72575251,1.16666667,0.84986945,1.0,1.12629758,0.91690141],
+    [0.95379538,0.90171607,0.83646889,0.99142367,0.7279597,0.5463138,0.79614325,0.77897574,0.64437012,1.03584229,0.75456919,0.88786482,1.0,0.81408451],
+    [1.17161716,1.10764431,1.02749638,1.21783877,0.89420655,0.6710775,0.97796143,0.95687332,0.79152731,1.27240143,0.92689295,1.0906298,1.2283737,1.0]
+])
+
+CATEGORIES = list(SUBCRITERIA)
+ALL_SUBCRITERIA = [s for subs in SUBCRITERIA.values() for s in subs]
+ALL_SUBCRITERIA_PT = [s for subs in SUBCRITERIA_PT.values() for s in subs]
+CATEGORIES_PT = ['Econômico', 'Social', 'Produção']
+CATEGORY_INDEX = np.repeat(np.arange(len(CATEGORIES)), [len(SUBCRITERIA[c]) for c in CATEGORIES])
+
+# ─── WEIGHTS ──────────────────────────────────────────────────────────────────
+def normalize_weights(weights_dict):
+    total = sum(weights_dict.values())
+    return {k: v / total for k, v in weights_dict.items()}
+
+class WeightModel:
+    """One weight state, normalized once and shared by scoring, charts and exports.
+
+    ``raw`` holds the weights as given (sub-criteria missing from the input
+    fall back to ``DEFAULT_WEIGHTS``) and ``normalized`` the same dict scaled
+    to sum to 1. ``vector`` is the normalized weights aligned with
+    ``ALL_SUBCRITERIA``, ``category`` their per-category sums aligned with
+    ``CATEGORIES`` (``category_totals`` as a dict) and ``projection`` the
+    14 x 4 matrix of ``subcriteria_projection``. Arrays are read-only, since
+    models are cached and shared. ``digest`` is a short content hash for
+    cache keys.
+
+    Build models with ``weight_model`` rather than directly.
+    """
+
+    def __init__(self, raw):
+        values = np.array(raw, dtype=float)
+        self.raw = dict(zip(ALL_SUBCRITERIA, values.tolist()))
+        self.vector = values / values.sum()
+        self.normalized = dict(zip(ALL_SUBCRITERIA, self.vector.tolist()))
+        self.category = np.bincount(CATEGORY_INDEX, weights=self.vector, minlength=len(CATEGORIES))
+        self.category_totals = dict(zip(CATEGORIES, self.category.tolist()))
+        self.projection = np.zeros((len(ALL_SUBCRITERIA), len(CATEGORIES) + 1))
+        self.projection[np.arange(len(ALL_SUBCRITERIA)), CATEGORY_INDEX] = self.vector
+        self.projection[:, -1] = self.vector
+        for arr in (self.vector, self.category, self.projection):
+            arr.flags.writeable = False
+        self.digest = hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+    def __repr__(self):
+        return f"WeightModel({self.digest})"
+
+    def sub_labels(self, lang='PT'):
+        """Sub-criterion names in ``lang``, aligned with ``vector``."""
+        return ALL_SUBCRITERIA_PT if lang == 'PT' else ALL_SUBCRITERIA
+
+    def category_labels(self, lang='PT'):
+        """Category names in ``lang``, aligned with ``category``."""
+        return CATEGORIES_PT if lang == 'PT' else CATEGORIES
+
+    def rows(self, lang='PT'):
+        """``(category label, sub-criterion label, normalized weight)`` per sub-criterion."""
+        cats = self.category_labels(lang)
+        return [(cats[c], label, w) for c, label, w in
+                zip(CATEGORY_INDEX, self.sub_labels(lang), self.vector.tolist())]
+
+@functools.lru_cache(maxsize=64)
+def _weight_model(raw):
+    return WeightModel(raw)
+
+def weight_model(weights):
+    """The ``WeightModel`` of a ``{sub-criterion: weight}`` dict, built once per weight state."""
+    if isinstance(weights, WeightModel):
+        return weights
+    return _weight_model(tuple(float(weights.get(k, DEFAULT_WEIGHTS[k])) for k in ALL_SUBCRITERIA))
+
+def weights_vector(weights):
+    """Normalized weights as an array aligned with ``ALL_SUBCRITERIA``."""
+    return weight_model(weights).vector
+
+def category_weights(weights):
+    """Normalized weight of each category, aligned with ``CATEGORIES``."""
+    return weight_model(weights).category
+
+def subcriteria_projection(weights):
+    """14 x 4 matrix mapping sub-criterion scores to category subtotals and total.
+
+    Column ``j < 3`` holds the weights of category ``j`` (zero elsewhere) and
+    the last column holds every weight, so one product yields all four.
+    """
+    return weight_model(weights).projection
+
+# ─── CONSISTENCY ──────────────────────────────────────────────────────────────
+def principal_eigen(matrix, method='power', tol=1e-12, max_iter=1000):
+    """Principal eigenvalue and eigenvector of a pairwise comparison matrix.
+
+    The vector is normalized to sum to 1, i.e. it is the AHP priority vector.
+    ``method='power'`` uses power iteration, which converges in a handful of
+    steps for near-consistent positive matrices and falls back to
+    ``np.linalg.eig`` if it does not; ``method='eig'`` always uses the full
+    decomposition.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = matrix.shape[0]
+    if method == 'power' and (matrix > 0).all():
+        v = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            w = matrix @ v
+            lambda_max = w.sum()  # v sums to 1, so sum(Av) -> lambda_max
+            w /= lambda_max
+            if np.abs(w - v).max() < tol:
+                return float(lambda_max), w
+            v = w
+    elif method not in ('power', 'eig'):
+        raise ValueError(f"method must be 'power' or 'eig', got {method!r}")
+
+    eigenvalues, eigenvectors = np.linalg.eig(matrix)
+    i = np.argmax(eigenvalues.real)
+    v = np.abs(eigenvectors[:, i].real)
+    return float(eigenvalues[i].real), v / v.sum()
+
+@functools.lru_cache(maxsize=32)
+def _cached_analysis(data, n, method):
+    matrix = np.frombuffer(data, dtype=float).reshape(n, n)
+    lambda_max, weights = principal_eigen(matrix, method)
+    CI = (lambda_max - n) / (n - 1) if n > 1 else 0.0
+    RI = random_index(n)
+    CR = CI / RI if RI else 0.0
+    weights.flags.writeable = False
+    return {'lambda_max': lambda_max, 'CI': CI, 'CR': CR, 'RI': RI, 'n': n, 'weights': weights}
+
+def ahp_analysis(matrix, method='power'):
+    """Consistency figures and priority vector of a comparison matrix.
+
+    Memoized on the matrix contents, so repeated calls for the same matrix
+    (every Streamlit rerun, for instance) cost one hash of the bytes.
+    ``weights`` is a read-only array aligned with the matrix rows.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    return dict(_cached_analysis(matrix.tobytes(), matrix.shape[0], method))
+
+def check_consistency(matrix, method='power'):
+    return ahp_analysis(matrix, method)
+
+def priority_weights(matrix=None, criteria=None):
+    """Priority vector of ``matrix`` as a ``{criterion: weight}`` dict."""
+    matrix = COMPARISON_MATRIX if matrix is None else matrix
+    criteria = ALL_SUBCRITERIA if criteria is None else criteria
+    return dict(zip(criteria, ahp_analysis(matrix)['weights'].tolist()))
+
+# Default weights are the priority vector of COMPARISON_MATRIX rather than a
+# hand-copied table, so they always agree with the Consistency tab.
+DEFAULT_WEIGHTS = priority_weights()
+
+# ─── SCORING ──────────────────────────────────────────────────────────────────
+def score_layout(columns):
+    """Return ``'subcriteria'``, ``'categories'`` or ``None`` for a set of columns."""
+    columns = set(columns)
+    if columns.issuperset(ALL_SUBCRITERIA):
+        return 'subcriteria'
+    if columns.issuperset(CATEGORIES):
+        return 'categories'
+    return None
+
+def score_categories(values, weights):
+    """Weight a producers x 3 category matrix.
+
+    Returns ``(subtotals, totals)`` where ``subtotals`` holds the weighted
+    Economic/Social/Production scores and ``totals`` their row sums.
+    """
+    subtotals = np.asarray(values, dtype=float) * category_weights(weights)
+    return subtotals, subtotals.sum(axis=1)
+
+def score_subcriteria(values, weights):
+    """Weight a producers x 14 sub-criterion matrix (columns in ``ALL_SUBCRITERIA`` order).
+
+    Same return value as ``score_categories``, computed with a single
+    product against ``subcriteria_projection``.
+    """
+    out = np.asarray(values, dtype=float) @ subcriteria_projection(weights)
+    return out[:, :-1], out[:, -1]
+
+def score_projection(layout, weights):
+    """Matrix mapping a frame's score columns to category subtotals and total.
+
+    ``subcriteria_projection`` for the 14-column layout; for the 3-column
+    category layout a diagonal of the category weights plus their sum column.
+    """
+    if layout == 'subcriteria':
+        return subcriteria_projection(weights)
+    cw = category_weights(weights)
+    return np.column_stack([np.diag(cw), cw])
+
+def score_frame(df, weights):
+    """Score a producer frame in whichever layout it uses."""
+    layout = score_layout(df.columns)
+    if layout == 'subcriteria':
+        return score_subcriteria(df[ALL_SUBCRITERIA].to_numpy(dtype=float), weights)
+    if layout == 'categories':
+        return score_categories(df[CATEGORIES].to_numpy(dtype=float), weights)
+    raise KeyError(f"expected columns {CATEGORIES} or the {len(ALL_SUBCRITERIA)} sub-criteria")
+
+# ─── RANKING ──────────────────────────────────────────────────────────────────
+TIEBREAKS = CATEGORIES + ['Producer']
+
+def rank_order(totals, k=None, tiebreak=None):
+    """Row indices ordered best first.
+
+    Equal totals are ordered by ``tiebreak`` (one array or a list of arrays,
+    most significant first, lower values first) and finally by position.
+    With ``k`` only the best ``k`` rows are returned: ``argpartition`` picks
+    every row at least as good as the k-th total and only those candidates
+    are sorted, so the O(n log n) sort is only paid for a full ranking.
+    NaN totals (unscorable rows) rank last, like ``-inf``.
+    """
+    totals = np.asarray(totals, dtype=float)
+    nan = np.isnan(totals)
+    if nan.any():
+        totals = np.where(nan, -np.inf, totals)
+    if tiebreak is None:
+        keys = []
+    elif isinstance(tiebreak, (list, tuple)):
+        keys = [np.asarray(t) for t in tiebreak]
+    else:
+        keys = [np.asarray(tiebreak)]
+
+    if k is not None and k < len(totals):
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        kth = np.partition(totals, len(totals) - k)[len(totals) - k]
+        cand = np.flatnonzero(totals >= kth)
+    elif not keys:
+        return np.argsort(-totals, kind='stable')
+    else:
+        cand = np.arange(len(totals))
+
+    sort_keys = [cand] + [key[cand] for key in reversed(keys)] + [-totals[cand]]
+    return cand[np.lexsort(sort_keys)][:k]
+
+def tiebreak_key(tiebreak, names, subtotals):
+    """Sort key for ``rank_order`` from a ``TIEBREAKS`` name.
+
+    A category tie-break prefers the higher category subtotal, ``'Producer'``
+    orders by name.
+    """
+    if tiebreak is None:
+        return None
+    if tiebreak == 'Producer':
+        return np.asarray(names).astype(str)
+    if tiebreak not in CATEGORIES:
+        raise ValueError(f"tiebreak must be one of {TIEBREAKS}, got {tiebreak!r}")
+    return -subtotals[:, CATEGORIES.index(tiebreak)]
+
+def calculate_scores(df, weights, top_k=None, tiebreak=None):
+    """Score and rank a producer frame.
+
+    Returns the full ranking, or only the best ``top_k`` rows (with their
+    global ``Ranking``) when ``top_k`` is given. ``tiebreak`` is one of
+    ``TIEBREAKS``.
+    """
+    subtotals, totals = score_frame(df, weights)
+    names = df['Producer'].to_numpy() if tiebreak == 'Producer' else None
+    order = rank_order(totals, k=top_k, tiebreak=tiebreak_key(tiebreak, names, subtotals))
+
+    df = df.iloc[order].reset_index(drop=True)
+    for j, cat in enumerate(CATEGORIES):
+        df[f'{cat} Score'] = subtotals[order, j]
+    df['Total Score'] = totals[order]
+    df['Ranking'] = np.arange(1, len(df) + 1)
+    return df
+
+def resort_order(totals):
+    """Permutation restoring best-first order after the totals of a ranking changed.
+
+    ``totals`` is in the previous ranking order. Only the span between the
+    first and last adjacent pair that is now out of order is sorted, widened
+    by a binary search into the still-sorted head and tail for rows that
+    have to move past it. Equal totals keep their previous relative order,
+    so the result matches a stable full sort.
+    """
+    totals = np.asarray(totals, dtype=float)
+    order = np.arange(len(totals))
+    bad = np.flatnonzero(totals[1:] > totals[:-1])
+    if not len(bad):
+        return order
+    lo, hi = bad[0], bad[-1] + 2
+    top, bottom = totals[lo:hi].max(), totals[lo:hi].min()
+    lo = np.searchsorted(-totals[:lo], -top, side='right')
+    hi += np.searchsorted(-totals[hi:], -bottom, side='left')
+    order[lo:hi] = lo + np.argsort(-totals[lo:hi], kind='stable')
+    return order
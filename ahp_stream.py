@@ -0,0 +1,184 @@
+"""Chunked CSV scoring for producer files too large to load in one piece.
+
+``score_csv_stream`` reads the file ``chunksize`` rows at a time, scores each
+chunk with the engine and only keeps a running top-K in memory. A full
+ranking can optionally be spilled to disk as sorted runs and merged into one
+CSV at the end, so memory stays bounded by the chunk size either way.
+
+Every chunk goes through the same checks as an in-memory upload
+(``ingest.check_scores``): rows with malformed or missing scores, scores
+outside the file's scale or missing producer names are left out and
+reported, and 0-10 files are divided by 10. The scale is detected from the
+first chunk, and duplicate names are only detected within a chunk.
+"""
+import csv
+import heapq
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import CATEGORIES, score_categories, score_subcriteria, rank_order, tiebreak_key
+from ingest import ERROR_COLUMNS, MAX_REPORTED_ERRORS, PROBLEMS, check_scores, score_columns
+
+SCORE_COLUMNS = [f'{cat} Score' for cat in CATEGORIES] + ['Total Score']
+
+def _max_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if os.uname().sysname == 'Darwin' else rss * 1024
+
+def _rss_bytes():
+    """Current resident set size; falls back to the high-water mark off Linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return _max_rss_bytes()
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+def _write_run(path, order, row_ids, names, subtotals, totals):
+    run = pd.DataFrame({'row': row_ids[order], 'Producer': names[order]})
+    for j, col in enumerate(SCORE_COLUMNS[:-1]):
+        run[col] = subtotals[order, j]
+    run['Total Score'] = totals[order]
+    run.to_csv(path, index=False, header=False)
+
+def _run_key(tiebreak):
+    """Merge key over run rows ``[row, Producer, <category scores>, Total]``."""
+    if tiebreak is None:
+        return lambda r: (-float(r[-1]), int(r[0]))
+    if tiebreak == 'Producer':
+        return lambda r: (-float(r[-1]), r[1], int(r[0]))
+    col = 2 + CATEGORIES.index(tiebreak)
+    return lambda r: (-float(r[-1]), -float(r[col]), int(r[0]))
+
+def _merge_runs(run_paths, out_path, tiebreak=None):
+    """k-way merge of the sorted run files into one ranked CSV."""
+    files = [open(p, newline='', encoding='utf-8') for p in run_paths]
+    try:
+        readers = [csv.reader(f) for f in files]
+        merged = heapq.merge(*readers, key=_run_key(tiebreak))
+        with open(out_path, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(['Ranking', 'Producer'] + SCORE_COLUMNS)
+            for rank, row in enumerate(merged, start=1):
+                writer.writerow([rank] + row[1:])
+    finally:
+        for f in files:
+            f.close()
+
+def score_csv_stream(source, weights, top_k=50, chunksize=100_000, spill_path=None, tiebreak=None, scale=None):
+    """Score a producer CSV chunk by chunk.
+
+    ``source`` is a path or a seekable file object in either score layout,
+    UTF-8 or else Latin-1. Ties are ordered by ``tiebreak`` (see
+    ``ahp_engine.TIEBREAKS``) and then by position in the file; ``scale``
+    is 1 or 10, detected from the first chunk when not given.
+    Returns a dict with the ranked ``top`` frame, the number of ``rows``,
+    ``seconds``, ``rows_per_s``, ``peak_memory_bytes`` (largest resident
+    set size sampled after each chunk), ``max_rss_bytes`` (process
+    high-water mark), ``ranking_path`` when ``spill_path`` was given and
+    the ``ingest.validate`` report fields ``scale``, ``invalid_rows``,
+    ``counts`` and ``errors``. Raises ``ingest.IngestError`` when the
+    header has no Producer column and score layout.
+    """
+    try:
+        return _score_stream(source, weights, top_k, chunksize, spill_path, tiebreak, scale, 'utf-8')
+    except UnicodeDecodeError:
+        return _score_stream(source, weights, top_k, chunksize, spill_path, tiebreak, scale, 'latin-1')
+
+def _score_stream(source, weights, top_k, chunksize, spill_path, tiebreak, scale, encoding):
+    started = time.perf_counter()
+    peak = _rss_bytes()
+
+    _rewind(source)
+    layout, score_cols = score_columns(pd.read_csv(source, nrows=0, encoding=encoding).columns)
+    _rewind(source)
+    score = score_subcriteria if layout == 'subcriteria' else score_categories
+
+    run_dir = tempfile.mkdtemp(prefix='dairy_runs_') if spill_path else None
+    run_paths = []
+    best_ids = np.empty(0, dtype=np.int64)
+    best_names = np.empty(0, dtype=object)
+    best_sub = np.empty((0, len(CATEGORIES)))
+    best_tot = np.empty(0)
+    rows = invalid = reported = 0
+    counts = dict.fromkeys(PROBLEMS, 0)
+    errors = []
+    try:
+        # Score columns are inferred rather than typed, so malformed cells reach check_scores
+        reader = pd.read_csv(source, usecols=['Producer'] + score_cols, dtype={'Producer': str},
+                             chunksize=chunksize, encoding=encoding)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+            for chunk in reader:
+                values, bad, report = check_scores(chunk, score_cols, scale,
+                                                   np.arange(rows + 2, rows + 2 + len(chunk)))
+                scale = report['scale']
+                invalid += report['invalid_rows']
+                for problem, n in report['counts'].items():
+                    counts[problem] += n
+                if reported < MAX_REPORTED_ERRORS and len(report['errors']):
+                    errors.append(report['errors'].head(MAX_REPORTED_ERRORS - reported))
+                    reported += len(errors[-1])
+
+                valid = np.flatnonzero(~bad)
+                subtotals, totals = score(values[valid] / scale, weights)
+                names = chunk['Producer'].to_numpy(dtype=object)[valid]
+                row_ids = rows + valid.astype(np.int64)
+                rows += len(chunk)
+
+                if run_dir:
+                    run_paths.append(os.path.join(run_dir, f'run_{len(run_paths):05d}.csv'))
+                    order = rank_order(totals, tiebreak=tiebreak_key(tiebreak, names, subtotals))
+                    _write_run(run_paths[-1], order, row_ids, names, subtotals, totals)
+
+                keep = rank_order(totals, k=top_k, tiebreak=tiebreak_key(tiebreak, names, subtotals))
+                best_ids = np.concatenate([best_ids, row_ids[keep]])
+                best_names = np.concatenate([best_names, names[keep]])
+                best_sub = np.concatenate([best_sub, subtotals[keep]])
+                best_tot = np.concatenate([best_tot, totals[keep]])
+                key = tiebreak_key(tiebreak, best_names, best_sub)
+                keep = rank_order(best_tot, k=top_k, tiebreak=best_ids if key is None else [key, best_ids])
+                best_ids, best_names = best_ids[keep], best_names[keep]
+                best_sub, best_tot = best_sub[keep], best_tot[keep]
+                peak = max(peak, _rss_bytes())
+
+        if run_dir:
+            _merge_runs(run_paths, spill_path, tiebreak)
+    finally:
+        if run_dir:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    top = pd.DataFrame({'Producer': best_names})
+    for j, col in enumerate(SCORE_COLUMNS[:-1]):
+        top[col] = best_sub[:, j]
+    top['Total Score'] = best_tot
+    top['Ranking'] = np.arange(1, len(top) + 1)
+
+    seconds = time.perf_counter() - started
+    return {
+        'top': top,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_s': rows / seconds if seconds > 0 else float('inf'),
+        'peak_memory_bytes': peak,
+        'max_rss_bytes': _max_rss_bytes(),
+        'ranking_path': spill_path,
+        'scale': scale or 1,
+        'invalid_rows': invalid,
+        'counts': counts,
+        'errors': pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS),
+    }
@@ -0,0 +1,204 @@
+"""Command-line batch scorer for directories of regional producer files.
+
+Scores every CSV or Excel file matched by the given paths, directories or
+globs in a process pool, writes one ranking per region (the file stem) plus
+a merged global ranking, and prints a timing and throughput summary::
+
+    python batch.py data/regions/ -o out/ --formats csv,xlsx,pdf --workers 4
+
+Scoring goes through ``calculate_scores`` and the files through the report
+exporters, so the results match what the app produces for the same upload.
+This module must not import Streamlit.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import DEFAULT_WEIGHTS, ALL_SUBCRITERIA, calculate_scores, rank_order, priority_weights
+from exports import EXPORTERS
+from ingest import read_producers, xlrd_available
+
+EXTENSIONS = {'xlsx': 'xlsx', 'csv': 'csv', 'csv.gz': 'csv.gz', 'parquet': 'parquet', 'arrow': 'arrow', 'pdf': 'pdf'}
+GLOBAL_NAME = 'global'
+# Producer files picked up from input directories (.xls only when xlrd is installed)
+INPUT_PATTERNS = ('*.csv', '*.xlsx') + (('*.xls',) if xlrd_available() else ())
+
+def find_inputs(paths):
+    """Producer files named by ``paths`` (files, directories or glob patterns), sorted and deduplicated."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in INPUT_PATTERNS:
+                found.update(glob.glob(os.path.join(path, pattern)))
+        elif glob.has_magic(path):
+            found.update(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+        elif os.path.isfile(path):
+            found.add(path)
+        else:
+            raise FileNotFoundError(path)
+    return sorted(found)
+
+def region_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def check_region_names(inputs):
+    """Raise ``ValueError`` when two inputs share a region name or one takes the global ranking's name.
+
+    Names come from the file stem alone, so ``a/north.csv`` and ``b/north.csv`` (or ``north.csv`` and
+    ``north.xlsx``) would overwrite each other's exports. Compared case-insensitively, as on Windows/macOS.
+    """
+    seen = {}
+    for path in inputs:
+        name = region_name(path)
+        if name.casefold() == GLOBAL_NAME:
+            raise ValueError(f'{path}: region name {name!r} is reserved for the global ranking; rename the file')
+        if name.casefold() in seen:
+            raise ValueError(f'{seen[name.casefold()]} and {path} both give region {name!r}; rename one of them')
+        seen[name.casefold()] = path
+
+def write_exports(df, weights, out_dir, name, formats, lang='PT'):
+    """Write ``df`` as ``<out_dir>/<name>_ranking.<ext>`` for each format; returns the paths."""
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f'{name}_ranking.{EXTENSIONS[fmt]}')
+        with open(path, 'wb') as f:
+            f.write(EXPORTERS[fmt](df, weights, lang))
+        paths.append(path)
+    return paths
+
+def score_region(path, weights, out_dir, formats, lang='PT'):
+    """Score one regional CSV or workbook and write its exports. Runs in a worker process."""
+    name = region_name(path)
+    start = time.perf_counter()
+    try:
+        upload = read_producers(path)
+        df = upload['frame']
+        read_s = time.perf_counter() - start
+        ranked = calculate_scores(df, weights)
+        score_s = time.perf_counter() - start - read_s
+        files = write_exports(ranked, weights, out_dir, name, formats, lang)
+    except Exception as exc:  # reported per region; one bad file must not stop the batch
+        return {'region': name, 'path': path, 'error': f'{type(exc).__name__}: {exc}',
+                'seconds': time.perf_counter() - start}
+    return {
+        'region': name, 'path': path, 'rows': len(ranked), 'invalid_rows': upload['invalid_rows'],
+        'ranking': ranked, 'files': files,
+        'read_s': read_s, 'score_s': score_s, 'seconds': time.perf_counter() - start,
+    }
+
+def merge_rankings(results):
+    """One global ranking over every region, keeping each producer's regional rank."""
+    frames = [r['ranking'].assign(Region=r['region']) for r in results]
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.iloc[rank_order(merged['Total Score'].to_numpy(dtype=float))].reset_index(drop=True)
+    merged = merged.rename(columns={'Ranking': 'Region Ranking'})
+    merged['Ranking'] = np.arange(1, len(merged) + 1)
+    return merged[['Region'] + [c for c in merged.columns if c != 'Region']]
+
+def run_batch(paths, out_dir, weights=None, formats=('csv', 'xlsx'), workers=None, lang='PT'):
+    """Score every input region and the global ranking; returns the summary dict."""
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    inputs = find_inputs(paths)
+    check_region_names(inputs)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    args = [(p, weights, out_dir, formats, lang) for p in inputs]
+    if workers == 1 or len(inputs) <= 1:
+        results = [score_region(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(score_region, *zip(*args)))
+    regions_s = time.perf_counter() - start
+
+    ok = [r for r in results if 'error' not in r]
+    merged_rows = 0
+    if ok:
+        merged = merge_rankings(ok)
+        merged_rows = len(merged)
+        write_exports(merged, weights, out_dir, GLOBAL_NAME, [f for f in formats if f != 'pdf'], lang)
+    wall = time.perf_counter() - start
+
+    rows = sum(r['rows'] for r in ok)
+    return {
+        'inputs': len(inputs),
+        'workers': workers or os.cpu_count(),
+        'rows': rows,
+        'global_rows': merged_rows,
+        'regions_seconds': regions_s,
+        'wall_seconds': wall,
+        'rows_per_s': rows / wall if wall else 0.0,
+        'regions': [{k: v for k, v in r.items() if k != 'ranking'} for r in results],
+    }
+
+def format_summary(summary):
+    lines = [f"{'region':<24} {'rows':>10} {'read s':>8} {'score s':>8} {'total s':>8} {'rows/s':>11}"]
+    for r in summary['regions']:
+        if 'error' in r:
+            lines.append(f"{r['region']:<24} FAILED  {r['error']}")
+            continue
+        rate = r['rows'] / r['seconds'] if r['seconds'] else 0.0
+        lines.append(f"{r['region']:<24} {r['rows']:>10,} {r['read_s']:>8.3f} {r['score_s']:>8.3f} "
+                     f"{r['seconds']:>8.3f} {rate:>11,.0f}")
+        if r['invalid_rows']:
+            lines.append(f"{'':<24} {r['invalid_rows']:>10,} invalid rows left out")
+    lines.append(f"{summary['inputs']} files, {summary['rows']:,} producers in {summary['wall_seconds']:.2f} s "
+                 f"({summary['rows_per_s']:,.0f} producers/s, {summary['workers']} workers); "
+                 f"global ranking of {summary['global_rows']:,}")
+    return '\n'.join(lines)
+
+def load_weights(weights_path=None, matrix_path=None):
+    """Weights from a JSON ``{sub-criterion: weight}`` file or a 14 x 14 comparison matrix CSV."""
+    if weights_path and matrix_path:
+        raise ValueError('give either --weights or --matrix, not both')
+    if weights_path:
+        with open(weights_path, encoding='utf-8') as f:
+            weights = json.load(f)
+        unknown = set(weights) - set(ALL_SUBCRITERIA)
+        if unknown:
+            raise ValueError(f'unknown sub-criteria in {weights_path}: {sorted(unknown)}')
+        return {k: float(weights.get(k, DEFAULT_WEIGHTS[k])) for k in ALL_SUBCRITERIA}
+    if matrix_path:
+        from group_ahp import read_expert_matrix
+        return priority_weights(read_expert_matrix(matrix_path))
+    return dict(DEFAULT_WEIGHTS)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score regional producer CSV and Excel files with AHP in parallel.')
+    parser.add_argument('inputs', nargs='+', help='CSV or Excel files, directories or glob patterns')
+    parser.add_argument('-o', '--out', default='rankings', help='output directory (default: rankings)')
+    parser.add_argument('--formats', default='csv,xlsx',
+                        help=f"comma-separated export formats: {', '.join(EXTENSIONS)} (default: csv,xlsx)")
+    parser.add_argument('--weights', help='JSON file of {sub-criterion: weight}')
+    parser.add_argument('--matrix', help='14x14 comparison matrix CSV to derive the weights from')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--lang', choices=['PT', 'EN'], default='PT', help='language of the PDF reports')
+    parser.add_argument('--summary-json', help='also write the timing summary to this JSON file')
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in EXTENSIONS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+    try:
+        weights = load_weights(args.weights, args.matrix)
+        summary = run_batch(args.inputs, args.out, weights, formats, args.workers, args.lang)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    if not summary['inputs']:
+        parser.error('no CSV or Excel files matched')
+
+    print(format_summary(summary))
+    if args.summary_json:
+        with open(args.summary_json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=1)
+    return 1 if any('error' in r for r in summary['regions']) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""Performance benchmarks for the scoring engine, charts and exports.
+
+Run ``python -m benchmarks.bench`` from the repository root; see that module
+for the options.
+"""
@@ -0,0 +1,227 @@
+"""Benchmarks for scoring, consistency, charts and exports.
+
+Each case is timed on synthetic producer sets of 10, 1k, 100k and 1M rows
+(the Excel and PDF exports stop at the sizes the app can reasonably produce)
+and its peak traced memory is recorded. Results are compared against a
+stored baseline and any case slower or larger than the tolerance allows is
+flagged as a regression::
+
+    python -m benchmarks.bench                        # compare with benchmarks/baseline.json
+    python -m benchmarks.bench --sizes 10,1000 --only scores,charts
+    python -m benchmarks.bench --save-baseline        # record a new baseline
+
+Timings depend on the machine, so a baseline is only meaningful on the
+machine (or CI runner class) that recorded it. The exit status is 1 when a
+regression was found.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import (
+    COMPARISON_MATRIX, DEFAULT_WEIGHTS, _cached_analysis, calculate_scores, check_consistency,
+    normalize_weights, weight_model,
+)
+from benchmarks.generators import comparison_matrix, producers, ranked
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = (10, 1_000, 100_000, 1_000_000)
+TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# Differences below this are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 50e-6
+MIN_REGRESSION_BYTES = 64 * 2**10
+# A first call slower than this is timed once instead of repeated
+SLOW_CALL_SECONDS = 1.0
+
+def chart_figures(df, lang='PT'):
+    """Every figure the Charts tab builds for ``df``, in the same modes."""
+    import charts
+
+    large = len(df) > charts.CHART_FULL_MAX
+    top_n = charts.CHART_TOP_N if large else None
+    figures = [charts.bar_figure(df, lang, top_n), charts.stacked_figure(df, lang, top_n)]
+    radar_df = df
+    if large:
+        figures += [charts.histogram_figure(df, lang), charts.scatter_figure(df, lang)]
+        radar_df = df.head(5)
+    figures += [charts.radar_figure(radar_df, lang), charts.donut_figure(weight_model(DEFAULT_WEIGHTS), lang)]
+    return figures
+
+def _consistency(matrix):
+    _cached_analysis.cache_clear()  # time the analysis, not the memo lookup
+    return check_consistency(matrix)
+
+def _to_excel(df):
+    from exports import to_excel
+    return to_excel(df, DEFAULT_WEIGHTS)
+
+def _to_pdf(df):
+    from exports import to_pdf
+    return to_pdf(df, DEFAULT_WEIGHTS)
+
+# name -> (sizes, setup(size) -> args, function(*args)). Sizes of the
+# consistency case are matrix orders, of normalize_weights criteria counts.
+CASES = {
+    'scores': (SIZES, lambda n: (producers(n), DEFAULT_WEIGHTS), calculate_scores),
+    'scores_categories': (SIZES, lambda n: (producers(n, 'categories'), DEFAULT_WEIGHTS), calculate_scores),
+    'consistency': ((3, 14, 30), lambda n: (COMPARISON_MATRIX if n == 14 else comparison_matrix(n),), _consistency),
+    'normalize_weights': ((14,), lambda n: (dict(DEFAULT_WEIGHTS),), normalize_weights),
+    'charts': (SIZES, lambda n: (ranked(n),), chart_figures),
+    'to_excel': ((10, 1_000, 100_000), lambda n: (ranked(n),), _to_excel),
+    'to_pdf': ((10, 1_000), lambda n: (ranked(n),), _to_pdf),
+}
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Best and median seconds per call of ``fn``, and the calls per repeat.
+
+    Fast functions are looped until one repeat takes ``min_time``; a call
+    slower than ``SLOW_CALL_SECONDS`` is only timed once.
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    if first >= SLOW_CALL_SECONDS:
+        return first, first, 1
+    loops = max(1, int(min_time / max(first, 1e-7)))
+    times = [t / loops for t in timeit.repeat(fn, number=loops, repeat=repeat)]
+    return min(times), float(np.median(times)), loops
+
+def peak_memory(fn):
+    """Peak bytes allocated while ``fn`` runs, as seen by ``tracemalloc`` (NumPy buffers included)."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+def run(only=None, sizes=None, memory=True, repeat=5, log=print):
+    """Run the selected cases and return ``{'case[size]': result}``."""
+    results = {}
+    for name, (case_sizes, setup, fn) in CASES.items():
+        if only and name not in only:
+            continue
+        for n in case_sizes:
+            if sizes and name not in ('consistency', 'normalize_weights') and n not in sizes:
+                continue
+            args = setup(n)
+            best, median, loops = measure(lambda: fn(*args), repeat)
+            result = {'case': name, 'size': n, 'seconds': best, 'median_seconds': median, 'loops': loops}
+            if memory:
+                result['peak_bytes'] = peak_memory(lambda: fn(*args))
+            results[f'{name}[{n}]'] = result
+            log(format_row(f'{name}[{n}]', result))
+            del args
+    return results
+
+def environment():
+    import numpy
+    return {
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare(results, baseline, tolerance=TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Annotate ``results`` with their ratio to ``baseline``; returns the regressed keys."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        result['time_ratio'] = result['seconds'] / base['seconds'] if base['seconds'] else None
+        slower = (result['time_ratio'] is not None and result['time_ratio'] > 1 + tolerance
+                  and result['seconds'] - base['seconds'] > MIN_REGRESSION_SECONDS)
+        larger = False
+        if base.get('peak_bytes') and 'peak_bytes' in result:
+            result['memory_ratio'] = result['peak_bytes'] / base['peak_bytes']
+            larger = (result['memory_ratio'] > 1 + memory_tolerance
+                      and result['peak_bytes'] - base['peak_bytes'] > MIN_REGRESSION_BYTES)
+        result['regression'] = slower or larger
+        if result['regression']:
+            regressions.append(key)
+    return regressions
+
+def _duration(seconds):
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:8.1f} us'
+    if seconds < 1:
+        return f'{seconds * 1e3:8.2f} ms'
+    return f'{seconds:8.2f} s '
+
+def format_row(key, result):
+    row = f'{key:<28} {_duration(result["seconds"])}'
+    if 'peak_bytes' in result:
+        row += f' {result["peak_bytes"] / 2**20:10.2f} MiB'
+    if result.get('time_ratio') is not None:
+        row += f'   x{result["time_ratio"]:.2f} time'
+    if result.get('memory_ratio') is not None:
+        row += f'   x{result["memory_ratio"]:.2f} mem'
+    if result.get('regression'):
+        row += '   REGRESSION'
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark scoring, consistency, charts and exports.')
+    parser.add_argument('--only', help=f"comma-separated cases: {', '.join(CASES)}")
+    parser.add_argument('--sizes', help='comma-separated producer counts (default: 10,1000,100000,1000000)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed slowdown before a case is flagged (default: 0.25 = 25%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak-memory runs')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(',')) if args.only else None
+    if only and only - set(CASES):
+        parser.error(f"unknown case(s): {', '.join(sorted(only - set(CASES)))}")
+    sizes = {int(s) for s in args.sizes.split(',')} if args.sizes else None
+
+    results = run(only, sizes, memory=not args.no_memory, repeat=args.repeat)
+    report = {'environment': environment(), 'results': results}
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f'Baseline written to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance, args.memory_tolerance)
+        env = baseline.get('environment', {})
+        print(f"\nCompared with {args.baseline} (recorded {env.get('recorded_at', '?')}, "
+              f"Python {env.get('python', '?')}, {env.get('cpus', '?')} CPUs):")
+        for key in results:
+            if 'regression' in results[key]:
+                print(format_row(key, results[key]))
+        print(f"{len(regressions)} regression(s)" + (f": {', '.join(regressions)}" if regressions else ''))
+    else:
+        print(f'No baseline at {args.baseline}; run with --save-baseline to record one.')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
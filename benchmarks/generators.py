@@ -0,0 +1,34 @@
+"""Synthetic producer sets for the benchmarks.
+
+Scores are drawn on the app's 0-10 slider scale and divided by 10, so ties
+occur about as often as in real uploads.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import ALL_SUBCRITERIA, CATEGORIES, DEFAULT_WEIGHTS, calculate_scores
+
+def producers(n, layout='subcriteria', seed=0):
+    """``n`` producers in the 14 sub-criterion or the 3 category layout."""
+    cols = ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(0, 11, size=(n, len(cols))) / 10, columns=cols)
+    df.insert(0, 'Producer', [f'P{i:07d}' for i in range(n)])
+    return df
+
+@functools.lru_cache(maxsize=8)
+def _ranked(n, layout, seed):
+    return calculate_scores(producers(n, layout, seed), DEFAULT_WEIGHTS)
+
+def ranked(n, layout='subcriteria', seed=0):
+    """A ``calculate_scores`` result for ``n`` synthetic producers (a fresh copy each call)."""
+    return _ranked(n, layout, seed).copy()
+
+def comparison_matrix(n, seed=0, noise=0.2):
+    """Near-consistent n x n pairwise comparison matrix."""
+    rng = np.random.default_rng(seed)
+    w = rng.random(n) + 0.1
+    matrix = np.outer(w, 1 / w) * np.exp(rng.normal(0, noise, size=(n, n)))
+    return np.triu(matrix, 1) + np.tril(1 / matrix.T, -1) + np.eye(n)
@@ -0,0 +1,127 @@
+"""Cold-start timing report and import-time budget.
+
+Imports Streamlit and the app's own modules in a fresh interpreter with
+``-X importtime`` and reports what each one costs (shared dependencies are
+charged to whichever module imports them first). The total is checked
+against ``IMPORT_BUDGET_MS``, and the chart, styling and export libraries in
+``DEFERRED`` must not have been loaded: they are imported by the tab or
+download that first needs them. ``--app`` also times the first run of the
+app script in a fresh process, which is what a new worker pays::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --app --budget-ms 1500
+
+The exit status is 1 when a budget is exceeded or a deferred library was
+imported at startup.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO, 'DairySelectionTool.py')
+
+# In import order, so third-party costs are not charged to the app modules
+STARTUP_MODULES = [
+    'numpy', 'pandas', 'streamlit',
+    'ahp_engine', 'ahp_stream', 'sensitivity', 'group_ahp', 'translations',
+    'exports', 'history', 'diagnostics', 'results', 'upload_cache', 'ingest', 'charts',
+]
+# Loaded only when a chart is drawn, a styled table is shown or a file is exported
+DEFERRED = [
+    'plotly.graph_objs._figure', 'plotly.express', 'matplotlib', 'jinja2',
+    'openpyxl', 'reportlab', 'http.server',
+]
+IMPORT_BUDGET_MS = 1500
+APP_BUDGET_MS = 4000
+
+def _run(code, env=None):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPO, capture_output=True,
+                          text=True, env=dict(os.environ, **(env or {})))
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return proc
+
+def _top_level_times(stderr):
+    """``{module: cumulative ms}`` of the modules imported directly by the probe."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.count('|') != 2:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith('  ') or not cumulative.strip().isdigit():
+            continue  # nested import, or the header line
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+def import_report(modules=STARTUP_MODULES, deferred=DEFERRED):
+    """Import ``modules`` in a fresh interpreter; per-module and wall ms plus the deferred modules loaded."""
+    code = ('import json, sys, time\nstart = time.perf_counter()\n'
+            + ''.join(f'import {m}\n' for m in modules)
+            + 'wall = time.perf_counter() - start\n'
+            + f'print(json.dumps({{"wall": wall, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))\n')
+    proc = _run(code)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    times = _top_level_times(proc.stderr)
+    return {
+        'modules': {m: times.get(m, 0.0) for m in modules},
+        'wall_ms': result['wall'] * 1000,
+        'deferred_loaded': result['loaded'],
+    }
+
+def app_report(path=APP_PATH, deferred=DEFERRED):
+    """Time the first run of the app script (imports included) in a fresh interpreter."""
+    code = ('import json, sys, time\nstart = time.perf_counter()\n'
+            'from streamlit.testing.v1 import AppTest\n'
+            f'at = AppTest.from_file({path!r}, default_timeout=120)\n'
+            'at.run()\n'
+            'wall = time.perf_counter() - start\n'
+            f'print(json.dumps({{"wall": wall, "exception": [str(e.value) for e in at.exception], '
+            f'"loaded": [m for m in {deferred!r} if m in sys.modules]}}))\n')
+    result = json.loads(_run(code, env={'DAIRY_METRICS_PORT': '', 'PYTHONPATH': REPO}).stdout.strip().splitlines()[-1])
+    return {'wall_ms': result['wall'] * 1000, 'exception': result['exception'], 'deferred_loaded': result['loaded']}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold-start import timing and budget check.')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help=f'import budget for the startup modules (default {IMPORT_BUDGET_MS})')
+    parser.add_argument('--app', action='store_true', help='also time the first run of the app script')
+    parser.add_argument('--app-budget-ms', type=float, default=APP_BUDGET_MS)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = {'imports': import_report()}
+    if args.app:
+        report['app'] = app_report()
+
+    failures = []
+    imports = report['imports']
+    if imports['wall_ms'] > args.budget_ms:
+        failures.append(f"imports took {imports['wall_ms']:.0f} ms, budget {args.budget_ms:.0f} ms")
+    if imports['deferred_loaded']:
+        failures.append(f"loaded at import: {', '.join(imports['deferred_loaded'])}")
+    if args.app:
+        app = report['app']
+        if app['exception']:
+            failures.append(f"app raised: {app['exception'][0]}")
+        if app['wall_ms'] > args.app_budget_ms:
+            failures.append(f"first app run took {app['wall_ms']:.0f} ms, budget {args.app_budget_ms:.0f} ms")
+        if app['deferred_loaded']:
+            failures.append(f"loaded by the first app run: {', '.join(app['deferred_loaded'])}")
+    report['failures'] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        for module, ms in imports['modules'].items():
+            print(f'{module:<16} {ms:8.1f} ms')
+        print(f"{'total (wall)':<16} {imports['wall_ms']:8.1f} ms   budget {args.budget_ms:.0f} ms")
+        if args.app:
+            print(f"{'first app run':<16} {report['app']['wall_ms']:8.1f} ms   budget {args.app_budget_ms:.0f} ms")
+        print('\n'.join(f'FAIL: {f}' for f in failures) or 'OK: within budget, chart/styling/export libraries deferred')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Small thread-safe LRU cache bounded by entry count, total size and age.
+
+Instances are module-level and therefore shared by every Streamlit session
+served by the same process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """LRU cache; entries older than ``ttl`` seconds (None: no limit) are dropped on access.
+
+    Hits, misses, LRU evictions and expirations are counted for ``stats``.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=None, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._clock = clock
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _drop(self, key):
+        self.nbytes -= self._items.pop(key)[1]
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[2] is not None and item[2] <= self._clock():
+                self._drop(key)
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size=0):
+        """Store ``value`` with an estimated ``size`` in bytes, evicting LRU entries."""
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = (value, size, None if self.ttl is None else self._clock() + self.ttl)
+            self.nbytes += size
+            if self._over_limit():
+                self._purge_expired()
+            while self._over_limit():
+                self.nbytes -= self._items.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def get_or_put(self, key, compute, sizeof=None):
+        """The cached value of ``key``, or ``compute()`` stored with ``sizeof(value)`` bytes."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value, sizeof(value) if sizeof else 0)
+        return value
+
+    def _over_limit(self):
+        return len(self._items) > self.max_entries or (
+            self.max_bytes is not None and self.nbytes > self.max_bytes)
+
+    def _purge_expired(self):
+        now = self._clock()
+        for key in [k for k, item in self._items.items() if item[2] is not None and item[2] <= now]:
+            self._drop(key)
+            self.expirations += 1
+
+    def stats(self):
+        """Entry count, bytes held and the hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items), 'bytes': self.nbytes,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'expirations': self.expirations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
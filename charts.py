@@ -0,0 +1,246 @@
+"""Plotly figures for the Charts tab.
+
+Builders take the results frame and the UI language and return figures, so
+they can be timed or rendered outside Streamlit. For large producer sets
+the per-producer charts are limited to the top N plus one "others"
+aggregate, and distributions are binned before they are sent to the
+browser, which keeps the figure payload bounded by N rather than by the
+number of producers.
+
+Plotly is imported by the builders rather than at module level, so importing
+this module (the app does at startup) costs nothing until a chart is drawn.
+"""
+import numpy as np
+import pandas as pd
+
+from translations import translate
+
+# Above this many producers the Charts tab switches to the large-data mode
+CHART_FULL_MAX = 30
+CHART_TOP_N = 20
+SCATTER_MAX_POINTS = 5_000
+HISTOGRAM_BINS = 40
+RADAR_MAX_PRODUCERS = 8
+RADAR_CHOICES = 200
+
+SCORE_COLUMNS = ['Economic Score', 'Social Score', 'Production Score']
+CHART_COLORS = ['#2980b9', '#27ae60', '#f39c12']
+PALETTE = ['#2980b9', '#27ae60', '#f39c12', '#e74c3c',
+           '#9b59b6', '#1abc9c', '#e67e22', '#34495e']
+# ColorBrewer 'Blues', the stops of matplotlib's colormap of the same name
+BLUES = ['#f7fbff', '#deebf7', '#c6dbef', '#9ecae1', '#6baed6', '#4292c6', '#2171b5', '#08519c', '#08306b']
+
+def top_with_others(df, top_n, lang='PT'):
+    """The best ``top_n`` rows plus one row averaging everyone else."""
+    if top_n is None or len(df) <= top_n:
+        return df
+    top = df.nlargest(top_n, 'Total Score')
+    rest = df.drop(top.index)
+    others = rest[SCORE_COLUMNS + ['Total Score']].mean().to_frame().T
+    others.insert(0, 'Producer', translate('others', lang).format(n=len(rest)))
+    return pd.concat([top, others], ignore_index=True)
+
+def bar_figure(df, lang='PT', top_n=None):
+    import plotly.graph_objects as go
+
+    data = top_with_others(df, top_n, lang).sort_values('Total Score')
+    # graph_objects rather than plotly.express: same figure, a fraction of the build time
+    fig_bar = go.Figure(go.Bar(
+        x=data['Total Score'], y=data['Producer'], orientation='h',
+        marker=dict(color=data['Total Score'], colorscale='Blues'),
+        text=data['Total Score'],
+        hovertemplate='Producer=%{y}<br>Total Score=%{x}<extra></extra>',
+    ))
+    fig_bar.update_traces(texttemplate='%{text:.4f}', textposition='outside')
+    fig_bar.update_layout(
+        plot_bgcolor='white', paper_bgcolor='white',
+        title=dict(text=translate('total_score', lang),
+                   font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
+        height=max(320, len(data) * 55 + 80),
+        margin=dict(l=10, r=80, t=50, b=20),
+        font=dict(family='Inter'),
+        xaxis=dict(title='Total Score'),
+        yaxis=dict(title='Producer', tickfont=dict(size=11)),
+    )
+    return fig_bar
+
+def stacked_figure(df, lang='PT', top_n=None):
+    import plotly.graph_objects as go
+
+    data = top_with_others(df, top_n, lang)
+    fig_stack = go.Figure()
+    cats = [
+        (translate('economic', lang), 'Economic Score'),
+        (translate('social', lang), 'Social Score'),
+        (translate('production', lang), 'Production Score'),
+    ]
+    for (cat_label, col_name), color in zip(cats, CHART_COLORS):
+        fig_stack.add_trace(go.Bar(
+            name=cat_label, x=data['Producer'],
+            y=data[col_name], marker_color=color,
+            hovertemplate='<b>%{x}</b><br>' + cat_label + ': %{y:.4f}<extra></extra>'
+        ))
+    fig_stack.update_layout(
+        barmode='stack',
+        title=dict(text='Score Breakdown por Categoria / by Category',
+                   font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
+        plot_bgcolor='white', paper_bgcolor='white',
+        height=max(320, len(data) * 55 + 100) if top_n is None else 480,
+        margin=dict(l=10, r=10, t=50, b=60),
+        font=dict(family='Inter'),
+        legend=dict(orientation='h', yanchor='top', y=-0.15,
+                    xanchor='center', x=0.5, font=dict(size=11)),
+        xaxis=dict(tickfont=dict(size=11)),
+    )
+    return fig_stack
+
+def radar_figure(df, lang='PT'):
+    import plotly.graph_objects as go
+
+    categories = [translate('economic', lang), translate('social', lang), translate('production', lang)]
+    max_val = df[SCORE_COLUMNS].max().max()
+
+    fig_radar = go.Figure()
+    for idx, (name, *vals) in enumerate(df[['Producer'] + SCORE_COLUMNS].itertuples(index=False)):
+        fig_radar.add_trace(go.Scatterpolar(
+            r=vals + [vals[0]],
+            theta=categories + [categories[0]],
+            fill='toself',
+            name=name,
+            line=dict(color=PALETTE[idx % len(PALETTE)], width=2),
+            fillcolor=PALETTE[idx % len(PALETTE)],
+            opacity=0.25,
+            hovertemplate='<b>%{fullData.name}</b><br>%{theta}: %{r:.4f}<extra></extra>'
+        ))
+
+    fig_radar.update_layout(
+        polar=dict(
+            bgcolor='rgba(240,247,255,0.5)',
+            radialaxis=dict(
+                visible=True,
+                range=[0, max_val * 1.15],
+                tickformat='.3f',
+                tickfont=dict(size=9, color='#666'),
+                gridcolor='#d0e4f7',
+                linecolor='#d0e4f7',
+                nticks=5,
+            ),
+            angularaxis=dict(
+                tickfont=dict(size=13, color='#1a5276', family='Inter'),
+                linecolor='#d0e4f7',
+                gridcolor='#d0e4f7',
+            )
+        ),
+        title=dict(
+            text='Radar — Score por Categoria / Category Score Radar',
+            font=dict(size=14, color='#1a5276'),
+            x=0, xanchor='left'
+        ),
+        paper_bgcolor='white',
+        height=420,
+        font=dict(family='Inter'),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom', y=-0.15,
+            xanchor='center', x=0.5,
+            font=dict(size=10)
+        ),
+        margin=dict(t=60, b=60, l=60, r=60)
+    )
+    return fig_radar
+
+def histogram_figure(df, lang='PT', bins=HISTOGRAM_BINS):
+    """Total-score distribution, binned with NumPy so only ``bins`` bars are sent."""
+    import plotly.graph_objects as go
+
+    counts, edges = np.histogram(df['Total Score'].to_numpy(dtype=float), bins=bins)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+        marker_color='#2980b9',
+        customdata=np.stack([edges[:-1], edges[1:]], axis=1),
+        hovertemplate='%{customdata[0]:.4f} – %{customdata[1]:.4f}<br>%{y}<extra></extra>',
+    ))
+    fig.update_layout(
+        title=dict(text=translate('score_distribution', lang),
+                   font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
+        plot_bgcolor='white', paper_bgcolor='white',
+        height=320, bargap=0.02,
+        margin=dict(l=10, r=10, t=50, b=40),
+        font=dict(family='Inter'),
+        xaxis=dict(title=translate('total_score', lang)),
+    )
+    return fig
+
+def scatter_figure(df, lang='PT', max_points=SCATTER_MAX_POINTS, seed=0):
+    """WebGL scatter of economic vs. total score.
+
+    Keeps the top ``CHART_TOP_N`` producers and a uniform sample of the rest,
+    so at most ``max_points`` markers are drawn.
+    """
+    import plotly.graph_objects as go
+
+    data = df
+    if len(df) > max_points:
+        top = df.nlargest(CHART_TOP_N, 'Total Score')
+        rest = df.drop(top.index).sample(max_points - len(top), random_state=seed)
+        data = pd.concat([top, rest])
+    fig = go.Figure(go.Scattergl(
+        x=data['Economic Score'], y=data['Total Score'], mode='markers',
+        text=data['Producer'],
+        marker=dict(size=5, color=data['Social Score'] + data['Production Score'],
+                    colorscale='Blues', opacity=0.7, showscale=False),
+        hovertemplate='<b>%{text}</b><br>' + translate('economic', lang) + ': %{x:.4f}<br>'
+                      + translate('total_score', lang) + ': %{y:.4f}<extra></extra>',
+    ))
+    fig.update_layout(
+        title=dict(text=translate('scatter_title', lang).format(shown=len(data), total=len(df)),
+                   font=dict(size=14, color='#1a5276'), x=0, xanchor='left'),
+        plot_bgcolor='white', paper_bgcolor='white',
+        height=380,
+        margin=dict(l=10, r=10, t=50, b=40),
+        font=dict(family='Inter'),
+        xaxis=dict(title=translate('economic', lang)),
+        yaxis=dict(title=translate('total_score', lang)),
+    )
+    return fig
+
+def donut_figure(model, lang='PT'):
+    """Category weight donut for a ``WeightModel``."""
+    import plotly.graph_objects as go
+
+    fig_donut = go.Figure(go.Pie(
+        labels=model.category_labels(lang),
+        values=model.category.tolist(),
+        hole=0.55,
+        marker_colors=CHART_COLORS,
+    ))
+    fig_donut.update_layout(
+        title='Peso por Categoria / Category Weights',
+        paper_bgcolor='white',
+        height=320,
+        font=dict(family='Inter'),
+        showlegend=True
+    )
+    return fig_donut
+
+def gradient_styles(df, colors=BLUES, axis=0):
+    """Cell CSS shading ``df`` through ``colors``, for ``Styler.apply(axis=None)``.
+
+    Matches ``Styler.background_gradient(cmap='Blues')`` (values scaled per
+    column for ``axis=0``, per row for 1, over the table for None, and
+    light text on dark cells) without importing matplotlib.
+    """
+    values = df.to_numpy(dtype=float)
+    lo = np.nanmin(values, axis=axis, keepdims=axis is not None)
+    span = np.nanmax(values, axis=axis, keepdims=axis is not None) - lo
+    t = np.divide(values - lo, span, out=np.zeros_like(values), where=span > 0)
+    stops = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in colors], dtype=float)
+    grid = np.linspace(0, 1, len(colors))
+    rgb = np.stack([np.interp(t, grid, stops[:, k]) for k in range(3)], axis=-1)
+    linear = np.where(rgb / 255 <= 0.03928, rgb / 255 / 12.92, ((rgb / 255 + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ [0.2126, 0.7152, 0.0722]
+    rgb = rgb.round().astype(int)
+    css = [[f'background-color: #{r:02x}{g:02x}{b:02x}; color: {"#f1f1f1" if lum < 0.408 else "#000000"}'
+            for (r, g, b), lum in zip(row_rgb, row_lum)]
+           for row_rgb, row_lum in zip(rgb, luminance)]
+    return pd.DataFrame(css, index=df.index, columns=df.columns)
@@ -0,0 +1,228 @@
+"""Per-stage timings of the app's reruns.
+
+A ``Recorder`` per session keeps the stage timings (CSV parsing, scoring,
+ranking HTML, figures, exports, ...) of its recent reruns for the
+diagnostics panel. Every timing also goes to the process-wide ``METRICS``,
+which renders as Prometheus text (``prometheus_text``, or over HTTP with
+``start_metrics_server``), and, when ``DAIRY_DIAGNOSTICS_LOG`` names a file,
+to one JSON line per stage in that file. Recording a stage costs two
+``perf_counter`` calls and a lock, so it is always on; the panel only
+decides whether the timings are shown.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+# JSON-lines file every stage timing is appended to; empty disables it
+LOG_PATH = os.environ.get('DAIRY_DIAGNOSTICS_LOG', '')
+# Port of the Prometheus /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.environ.get('DAIRY_METRICS_PORT', '0') or 0)
+METRICS_HOST = os.environ.get('DAIRY_METRICS_HOST', '127.0.0.1')
+# Show the diagnostics panel by default
+PANEL_DEFAULT = os.environ.get('DAIRY_DIAGNOSTICS', '') not in ('', '0')
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_RUNS = 20
+
+class StageMetrics:
+    """Process-wide duration histogram and payload total per stage, and rerun counts per scope."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._reruns = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, nbytes=None):
+        with self._lock:
+            s = self._stages.get(stage)
+            if s is None:
+                s = self._stages[stage] = {'buckets': [0] * (len(self.buckets) + 1), 'count': 0,
+                                           'sum': 0.0, 'bytes': 0}
+            s['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            s['count'] += 1
+            s['sum'] += seconds
+            if nbytes:
+                s['bytes'] += int(nbytes)
+
+    def rerun(self, scope):
+        with self._lock:
+            self._reruns[scope] = self._reruns.get(scope, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+            self._reruns.clear()
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stages = {k: dict(v, buckets=list(v['buckets'])) for k, v in sorted(self._stages.items())}
+            reruns = dict(sorted(self._reruns.items()))
+        lines = ['# HELP dairy_stage_duration_seconds Time spent in each app stage.',
+                 '# TYPE dairy_stage_duration_seconds histogram']
+        for stage, s in stages.items():
+            cumulative = 0
+            for le, n in zip(self.buckets + (float('inf'),), s['buckets']):
+                cumulative += n
+                le = '+Inf' if le == float('inf') else f'{le:g}'
+                lines.append(f'dairy_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'dairy_stage_duration_seconds_sum{{stage="{stage}"}} {s["sum"]!r}')
+            lines.append(f'dairy_stage_duration_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += ['# HELP dairy_stage_payload_bytes_total Bytes produced by each stage (HTML, figure JSON, files).',
+                  '# TYPE dairy_stage_payload_bytes_total counter']
+        lines += [f'dairy_stage_payload_bytes_total{{stage="{stage}"}} {s["bytes"]}'
+                  for stage, s in stages.items() if s['bytes']]
+        lines += ['# HELP dairy_reruns_total Script and fragment reruns by scope.',
+                  '# TYPE dairy_reruns_total counter']
+        lines += [f'dairy_reruns_total{{scope="{scope}"}} {n}' for scope, n in reruns.items()]
+        return '\n'.join(lines) + '\n'
+
+METRICS = StageMetrics()
+
+_log_lock = threading.Lock()
+_log_files = {}
+
+def write_jsonl(path, record):
+    """Append ``record`` as one JSON line to ``path`` (kept open, line-buffered)."""
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with _log_lock:
+        f = _log_files.get(path)
+        if f is None:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = _log_files[path] = open(path, 'a', encoding='utf-8', buffering=1)
+        f.write(line)
+
+class Stage:
+    """A running stage; set ``nbytes`` inside the block to record its payload size."""
+    __slots__ = ('name', 'nbytes', 'seconds')
+
+    def __init__(self, name, nbytes=None):
+        self.name = name
+        self.nbytes = nbytes
+        self.seconds = None
+
+class Recorder:
+    """Stage timings of one session's last ``max_runs`` reruns.
+
+    ``begin``/``end`` bracket a full script run; ``fragment`` brackets a
+    fragment body, which becomes a run of its own when the fragment reruns
+    alone. ``begin`` replaces a run left open by an aborted one. Stages
+    recorded outside any run (widget callbacks run before the script) are
+    attached to the next run.
+    """
+
+    def __init__(self, session=None, max_runs=MAX_RUNS, metrics=None, log_path=None):
+        self.session = session or uuid.uuid4().hex[:12]
+        self.metrics = METRICS if metrics is None else metrics
+        self.log_path = LOG_PATH if log_path is None else log_path
+        self._runs = deque(maxlen=max_runs)
+        self._pending = []
+        self._open = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def begin(self, scope='app'):
+        with self._lock:
+            self._count += 1
+            run = {'run': self._count, 'scope': scope, 'started': time.time(), 'stages': self._pending}
+            self._pending = []
+            self._runs.append(run)
+            self._open = run
+        self.metrics.rerun(scope)
+
+    def end(self, scope='app'):
+        with self._lock:
+            if self._open is not None and self._open['scope'] == scope:
+                self._open = None
+
+    @contextmanager
+    def fragment(self, key, alone=None):
+        """Bracket a fragment body; ``alone`` says whether the fragment reruns by itself.
+
+        By default it is taken to when no full run is open. A full run that
+        aborted before ``end`` (``st.rerun``, an exception) leaves its run
+        open, so callers that know pass ``alone`` to keep a fragment-only
+        rerun from being attributed to that stale run.
+        """
+        if alone is None:
+            alone = self._open is None
+        if not alone:  # part of a full run
+            yield
+            return
+        self.begin(key)
+        try:
+            yield
+        finally:
+            self.end(key)
+
+    @contextmanager
+    def stage(self, name, nbytes=None):
+        stage = Stage(name, nbytes)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self.record(stage.name, stage.seconds, stage.nbytes)
+
+    def record(self, name, seconds, nbytes=None):
+        entry = {'stage': name, 'seconds': seconds, 'bytes': None if nbytes is None else int(nbytes)}
+        with self._lock:
+            run = self._open
+            (self._pending if run is None else run['stages']).append(entry)
+        self.metrics.observe(name, seconds, nbytes)
+        if self.log_path:
+            write_jsonl(self.log_path, {
+                'ts': round(time.time(), 3), 'session': self.session,
+                'run': None if run is None else run['run'], 'scope': None if run is None else run['scope'],
+                **entry,
+            })
+
+    def runs(self):
+        """Recorded runs, newest first, as ``{'run', 'scope', 'started', 'stages'}`` dicts."""
+        with self._lock:
+            return [dict(run, stages=list(run['stages'])) for run in reversed(self._runs)]
+
+    def rows(self):
+        """One dict per recorded stage, newest run first."""
+        return [{'run': run['run'], 'scope': run['scope'], **stage}
+                for run in self.runs() for stage in run['stages']]
+
+    def to_jsonl(self):
+        return ''.join(json.dumps(dict(row, session=self.session), separators=(',', ':')) + '\n'
+                       for row in self.rows()).encode('utf-8')
+
+def start_metrics_server(port=None, host=None, metrics=None):
+    """Serve ``/metrics`` from a daemon thread; returns the server (``server_address`` has the port)."""
+    # http.server pulls in the email package; only pay for it when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    metrics = METRICS if metrics is None else metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((METRICS_HOST if host is None else host,
+                                  METRICS_PORT if port is None else port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='dairy-metrics', daemon=True).start()
+    return server
@@ -0,0 +1,118 @@
+"""Group AHP: combine the pairwise judgments of several evaluators.
+
+All per-expert work is vectorized over the expert axis: the stack of
+matrices goes through one batched ``np.linalg.eig`` call, and aggregation
+and outlier detection are array expressions over the same stack.
+"""
+from fractions import Fraction
+
+import numpy as np
+
+from ahp_engine import ahp_analysis
+from random_index import random_index
+
+def batched_principal_eigen(matrices):
+    """Principal eigenvalue and normalized eigenvector of each matrix in a k x n x n stack."""
+    matrices = np.asarray(matrices, dtype=float)
+    eigenvalues, eigenvectors = np.linalg.eig(matrices)
+    experts = np.arange(matrices.shape[0])
+    i = eigenvalues.real.argmax(axis=1)
+    vectors = np.abs(eigenvectors.real[experts, :, i])
+    return eigenvalues.real[experts, i], vectors / vectors.sum(axis=1, keepdims=True)
+
+def _robust_z(x):
+    med = np.median(x)
+    mad = np.median(np.abs(x - med))
+    if mad == 0:
+        return np.zeros_like(x)
+    return 0.6745 * (x - med) / mad
+
+def group_consensus(matrices, expert_weights=None, outlier_z=3.5, cr_threshold=0.1):
+    """Consistency of every expert and their aggregated consensus.
+
+    ``matrices`` is a k x n x n stack of reciprocal comparison matrices and
+    ``expert_weights`` optional importance weights per expert. Returns a dict
+    with per-expert ``lambda_max``, ``CR`` (0 when n <= 2), ``weights``
+    (k x n) and ``distance`` (RMS log-distance to the consensus matrix),
+    boolean ``inconsistent`` (CR above ``cr_threshold``) and ``outlier``
+    (robust z-score of ``distance`` above ``outlier_z``) flags, and the consensus:
+    ``matrix`` (geometric mean of judgments, AIJ), ``weights_aij`` (its
+    priority vector), ``weights_aip`` (geometric mean of the experts'
+    priorities) and ``consistency`` of the consensus matrix.
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    if matrices.ndim != 3 or matrices.shape[1] != matrices.shape[2]:
+        raise ValueError(f"expected a k x n x n stack of matrices, got shape {matrices.shape}")
+    if (matrices <= 0).any():
+        raise ValueError("comparison matrices must be strictly positive")
+    k, n, _ = matrices.shape
+    if expert_weights is None:
+        ew = np.full(k, 1.0 / k)
+    else:
+        ew = np.asarray(expert_weights, dtype=float)
+        ew = ew / ew.sum()
+
+    lambda_max, weights = batched_principal_eigen(matrices)
+    ri = random_index(n)
+    ci = (lambda_max - n) / (n - 1) if n > 1 else np.zeros(k)
+    cr = ci / ri if ri else np.zeros(k)
+
+    log_m = np.log(matrices)
+    log_g = np.tensordot(ew, log_m, axes=1)
+    consensus = np.exp(log_g)
+    distance = np.sqrt(((log_m - log_g) ** 2).mean(axis=(1, 2)))
+
+    aip = np.exp(ew @ np.log(weights))
+    consistency = ahp_analysis(consensus)
+    return {
+        'n_experts': k,
+        'lambda_max': lambda_max,
+        'CR': cr,
+        'weights': weights,
+        'distance': distance,
+        'inconsistent': cr > cr_threshold,
+        'outlier': _robust_z(distance) > outlier_z,
+        'matrix': consensus,
+        'weights_aij': consistency['weights'],
+        'weights_aip': aip / aip.sum(),
+        'consistency': consistency,
+    }
+
+def read_expert_matrix(source):
+    """Read one expert's n x n matrix from a CSV, with or without a label row/column.
+
+    Cells may be decimals or Saaty fractions such as ``1/3``. The first row
+    (column) is taken as labels when one of its cells is text that is
+    neither.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(source, header=None, dtype=str)
+    if df.iloc[0].map(_is_label).any():
+        df = df.iloc[1:]
+    if df.iloc[:, 0].map(_is_label).any():
+        df = df.iloc[:, 1:]
+    matrix = df.map(_to_number).to_numpy(dtype=float)
+    if matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f"expert matrix must be square, got {matrix.shape}")
+    return matrix
+
+def _to_number(text):
+    """Float value of a decimal or fraction cell; NaN for an empty one."""
+    if not isinstance(text, str):
+        return float('nan')
+    try:
+        return float(Fraction(''.join(text.split())))
+    except ZeroDivisionError:
+        raise ValueError(f"zero denominator in {text!r}") from None
+
+def _is_label(text):
+    if not isinstance(text, str):
+        return False
+    try:
+        Fraction(''.join(text.split()))
+    except ZeroDivisionError:  # a fraction, if not a valid one
+        return False
+    except ValueError:
+        return True
+    return False
@@ -0,0 +1,222 @@
+"""Persistent evaluation history in a local SQLite file.
+
+Every saved run records the ranking, the input scores, the weights, the
+comparison matrix and its consistency. Weight sets and matrices are stored
+once per content hash and shared by the runs that used them, and the
+per-producer rows of a run go in with one ``executemany`` inside a single
+transaction. Indexes on producer, run date and weight hash keep the history
+queries to index lookups however many runs are stored.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import ALL_SUBCRITERIA, CATEGORIES, COMPARISON_MATRIX, ahp_analysis, score_layout, weight_model
+
+# An empty DAIRY_HISTORY_DB disables the history in the app
+HISTORY_PATH = os.environ.get(
+    'DAIRY_HISTORY_DB',
+    os.path.join(os.path.expanduser('~'), '.local', 'share', 'dairy_selection_tool', 'history.sqlite3'),
+)
+
+SCORE_COLUMNS = [f'{cat} Score' for cat in CATEGORIES] + ['Total Score']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weight_sets (
+    hash TEXT PRIMARY KEY,
+    weights TEXT NOT NULL,          -- raw weights, JSON keyed by sub-criterion
+    normalized TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matrices (
+    hash TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    data BLOB NOT NULL              -- float64, row-major
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,       -- ISO 8601, UTC
+    label TEXT,
+    layout TEXT NOT NULL,           -- 'subcriteria' or 'categories'
+    n_producers INTEGER NOT NULL,
+    weights_hash TEXT NOT NULL REFERENCES weight_sets(hash),
+    matrix_hash TEXT NOT NULL REFERENCES matrices(hash),
+    lambda_max REAL,
+    ci REAL,
+    cr REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ranking INTEGER NOT NULL,
+    producer TEXT NOT NULL,
+    created_at TEXT NOT NULL,       -- copy of runs.created_at for the producer index
+    economic REAL,
+    social REAL,
+    production REAL,
+    total REAL,
+    inputs BLOB NOT NULL,           -- float64 input scores in the run's layout order
+    PRIMARY KEY (run_id, ranking)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs(created_at);
+CREATE INDEX IF NOT EXISTS runs_weights ON runs(weights_hash, created_at);
+-- Covers producer_history: one range scan per producer and period, already in date order
+CREATE INDEX IF NOT EXISTS results_producer
+    ON results(producer, created_at, run_id, total, economic, social, production);
+"""
+
+RUN_COLUMNS = ('id AS run_id, created_at, label, layout, n_producers, '
+               'weights_hash, matrix_hash, lambda_max, ci AS CI, cr AS CR')
+RESULT_COLUMNS = ('producer AS Producer, ranking AS Ranking, economic AS "Economic Score", '
+                  'social AS "Social Score", production AS "Production Score", total AS "Total Score"')
+
+def _timestamp(value):
+    """ISO 8601 UTC text for a datetime, date or ISO string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"expected a datetime, date or ISO string, got {type(value).__name__}")
+
+def matrix_digest(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    return hashlib.blake2b(matrix.tobytes(), digest_size=16, person=str(matrix.shape[0]).encode()).hexdigest()
+
+class HistoryStore:
+    """Run history in the SQLite file at ``path`` (``':memory:'`` for a throwaway store).
+
+    One connection is shared behind a lock, so a single store can serve
+    every Streamlit session of the process.
+    """
+
+    def __init__(self, path=None):
+        self.path = HISTORY_PATH if path is None else path
+        if self.path != ':memory:' and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def save_run(self, ranked, weights, matrix=None, label=None, created_at=None):
+        """Store a ``calculate_scores`` result and return the new run id.
+
+        ``matrix`` is the comparison matrix behind the weights (default
+        ``COMPARISON_MATRIX``); its consistency is computed and stored with
+        the run. ``created_at`` defaults to now.
+        """
+        layout = score_layout(ranked.columns)
+        if layout is None:
+            raise KeyError(f"expected columns {CATEGORIES} or the {len(ALL_SUBCRITERIA)} sub-criteria")
+        cols = ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES
+        model = weight_model(weights)
+        matrix = np.ascontiguousarray(COMPARISON_MATRIX if matrix is None else matrix, dtype=float)
+        cons = ahp_analysis(matrix)
+        m_hash = matrix_digest(matrix)
+        created_at = _timestamp(datetime.now(timezone.utc) if created_at is None else created_at)
+
+        inputs = np.ascontiguousarray(ranked[cols].to_numpy(dtype=float))
+        scores = ranked[SCORE_COLUMNS].to_numpy(dtype=float)
+        names = ranked['Producer'].astype(str).tolist()
+        ranking = ranked['Ranking'].astype(int).tolist()
+        blobs = [row.tobytes() for row in inputs]
+
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO weight_sets VALUES (?, ?, ?)',
+                               (model.digest, json.dumps(model.raw), json.dumps(model.normalized)))
+            self._conn.execute('INSERT OR IGNORE INTO matrices VALUES (?, ?, ?)',
+                               (m_hash, matrix.shape[0], matrix.tobytes()))
+            run_id = self._conn.execute(
+                'INSERT INTO runs (created_at, label, layout, n_producers, weights_hash, matrix_hash, '
+                'lambda_max, ci, cr) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (created_at, label, layout, len(ranked), model.digest, m_hash,
+                 cons['lambda_max'], cons['CI'], cons['CR'])).lastrowid
+            self._conn.executemany(
+                'INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                zip([run_id] * len(names), ranking, names, [created_at] * len(names), *scores.T.tolist(), blobs))
+        return run_id
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    @staticmethod
+    def _date_filter(column, since, until):
+        where, params = [], []
+        if since is not None:
+            where.append(f'{column} >= ?')
+            params.append(_timestamp(since))
+        if until is not None:
+            where.append(f'{column} < ?')
+            params.append(_timestamp(until))
+        return where, params
+
+    def runs(self, since=None, until=None, weights=None, limit=None):
+        """Stored runs, newest first.
+
+        ``since``/``until`` bound ``created_at`` (``until`` exclusive) and
+        ``weights`` (a dict, ``WeightModel`` or weight hash) keeps only runs
+        scored with that weight set.
+        """
+        where, params = self._date_filter('created_at', since, until)
+        if weights is not None:
+            where.append('weights_hash = ?')
+            params.append(weights if isinstance(weights, str) else weight_model(weights).digest)
+        sql = f'SELECT {RUN_COLUMNS} FROM runs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return self._query(sql, params)
+
+    def producer_history(self, producer, since=None, until=None):
+        """Rank and scores of ``producer`` in every stored run, oldest first."""
+        where, params = self._date_filter('results.created_at', since, until)
+        sql = (f'SELECT results.run_id, results.created_at, {RESULT_COLUMNS}, runs.n_producers, runs.weights_hash '
+               'FROM results JOIN runs ON runs.id = results.run_id WHERE results.producer = ?')
+        if where:
+            sql += ' AND ' + ' AND '.join(where)
+        sql += ' ORDER BY results.created_at, results.run_id'
+        return self._query(sql, [str(producer)] + params)
+
+    def load_run(self, run_id):
+        """A stored run as a ranking frame in the ``calculate_scores`` layout."""
+        with self._lock:
+            layout = self._conn.execute('SELECT layout FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if layout is None:
+                raise KeyError(f"no run {run_id}")
+            rows = self._conn.execute(
+                'SELECT producer, ranking, economic, social, production, total, inputs '
+                'FROM results WHERE run_id = ? ORDER BY ranking', (run_id,)).fetchall()
+        cols = ALL_SUBCRITERIA if layout[0] == 'subcriteria' else CATEGORIES
+        inputs = np.frombuffer(b''.join(r[6] for r in rows), dtype=float).reshape(len(rows), len(cols))
+        df = pd.DataFrame(inputs, columns=cols)
+        df.insert(0, 'Producer', [r[0] for r in rows])
+        for j, col in enumerate(SCORE_COLUMNS):
+            df[col] = [r[2 + j] for r in rows]
+        df['Ranking'] = [r[1] for r in rows]
+        return df
+
+    def weights(self, weights_hash):
+        """Raw ``{sub-criterion: weight}`` dict of a stored weight set."""
+        with self._lock:
+            row = self._conn.execute('SELECT weights FROM weight_sets WHERE hash = ?', (weights_hash,)).fetchone()
+        if row is None:
+            raise KeyError(f"no weight set {weights_hash}")
+        return json.loads(row[0])
@@ -0,0 +1,338 @@
+"""Typed reading and validation of producer score files.
+
+``read_producers`` reads a CSV in either score layout (``Producer`` plus the
+three categories, or plus the 14 sub-criteria) with explicit dtypes, using
+pyarrow's multithreaded parser for large files when it is installed. A file
+whose score columns all parse as numbers is read straight into float64; one
+with malformed cells is re-read with the parser's own inference, and only the
+columns that came back as text are converted, so the bad cells can be
+reported instead of failing the whole upload.
+
+``validate`` checks the frame with whole-array masks: malformed and missing
+scores, scores outside the file's scale, missing and duplicate producer
+names. Scores may be on a 0-1 scale (the example file) or 0-10 (manual
+entry), detected as 0-10 when most scores exceed 1; 0-10 files are divided
+by 10.
+Rows with a problem are left out of the returned frame and listed, one line
+per problem and cell, in the error report.
+
+Excel workbooks go through the same validation. ``.xlsx`` files are streamed
+with openpyxl's read-only mode, so large sheets are never held as a cell
+tree, and ``.xls`` files are read with xlrd when it is installed. The first
+sheet with a header row (a ``Producer`` cell plus a score layout) within its
+first ``HEADER_SCAN_ROWS`` rows is used, so title rows above the table are
+skipped.
+"""
+import importlib.util
+import itertools
+import operator
+import os
+import warnings
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import ALL_SUBCRITERIA, CATEGORIES, score_layout
+
+SCALES = (1, 10)
+# Files at least this large use the pyarrow engine when it is installed
+ARROW_MIN_BYTES = 16 * 2**20
+# Problems beyond this many are counted but not listed
+MAX_REPORTED_ERRORS = 10_000
+PROBLEMS = ('malformed', 'missing', 'out_of_range', 'missing_producer', 'duplicate_producer')
+ERROR_COLUMNS = ['line', 'producer', 'column', 'value', 'problem']
+# Rows searched for the header in each Excel sheet
+HEADER_SCAN_ROWS = 20
+# Excel rows converted to arrays at a time
+EXCEL_CHUNK_ROWS = 20_000
+
+class IngestError(ValueError):
+    """The file cannot be read as a producer table (no Producer column or score columns)."""
+
+def arrow_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+def xlrd_available():
+    return importlib.util.find_spec('xlrd') is not None
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+def _read_bytes(source):
+    if hasattr(source, 'getbuffer'):
+        return bytes(source.getbuffer())
+    with open(source, 'rb') as f:
+        return f.read()
+
+def detect_format(source):
+    """``'xlsx'``, ``'xls'`` or ``'csv'``, from the file's first bytes."""
+    if hasattr(source, 'getbuffer'):
+        head = bytes(source.getbuffer()[:8])
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            head = f.read(8)
+    else:
+        head = b''
+    if head.startswith(b'PK\x03\x04'):  # a zip container: Office Open XML
+        return 'xlsx'
+    if head.startswith(b'\xd0\xcf\x11\xe0'):  # an OLE2 compound file: legacy Excel
+        return 'xls'
+    return 'csv'
+
+def _size(source):
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return 0
+
+def choose_engine(source, engine=None):
+    """``engine`` if given, else ``'pyarrow'`` for files of ``ARROW_MIN_BYTES`` or more when available."""
+    if engine is not None:
+        return engine
+    return 'pyarrow' if _size(source) >= ARROW_MIN_BYTES and arrow_available() else 'c'
+
+def score_columns(columns):
+    """Layout and score columns of a header; raises ``IngestError`` when it has neither layout."""
+    layout = score_layout(columns)
+    if 'Producer' not in columns or layout is None:
+        raise IngestError(f"expected a Producer column plus {CATEGORIES} or the {len(ALL_SUBCRITERIA)} sub-criteria")
+    return layout, ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES
+
+def read_csv(source, engine=None):
+    """Read a producer CSV with explicit dtypes; returns ``(frame, layout)``.
+
+    When some score cell is not a number its column is returned as text, for
+    ``validate`` to convert and report. Files that are not valid UTF-8 are
+    read as Latin-1, the usual encoding of spreadsheet exports on Windows.
+    """
+    try:
+        return _read_csv(source, engine, 'utf-8')
+    except UnicodeDecodeError:
+        return _read_csv(source, engine, 'latin-1')  # every byte decodes
+
+def _read_csv(source, engine, encoding):
+    _rewind(source)
+    layout, cols = score_columns(pd.read_csv(source, nrows=0, encoding=encoding).columns)
+    engine = choose_engine(source, engine)
+    _rewind(source)
+    try:
+        df = pd.read_csv(source, dtype={'Producer': str, **{c: np.float64 for c in cols}},
+                         engine=engine, encoding=encoding)
+    except (UnicodeDecodeError, pd.errors.ParserError):  # not about the numbers; no point re-reading
+        raise
+    except ValueError:  # a malformed number; pyarrow's ArrowInvalid is a ValueError too
+        _rewind(source)
+        # Columns inferred chunk by chunk may mix floats and text; _to_float handles both
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+            df = pd.read_csv(source, dtype={'Producer': str}, engine=engine, encoding=encoding)
+    return df, layout
+
+def _sheet_frame(rows):
+    """Frame of the table in a sheet's ``rows`` and the sheet row number of each frame row.
+
+    Returns None when none of the first ``HEADER_SCAN_ROWS`` rows is a
+    header. Rows are converted ``EXCEL_CHUNK_ROWS`` at a time, so only one
+    chunk is ever held as Python cell values. Fully empty rows are dropped;
+    empty cells become NaN.
+    """
+    rows = iter(rows)
+    for header_line, row in enumerate(itertools.islice(rows, HEADER_SCAN_ROWS), start=1):
+        names = ['' if c is None else str(c).strip() for c in row]
+        if 'Producer' in names and score_layout(names) is not None:
+            break
+    else:
+        return None
+    keep = [j for j, name in enumerate(names) if name]
+    columns = [names[j] for j in keep]
+    get, width = operator.itemgetter(*keep), keep[-1] + 1
+    frames, lines, start = [], [], header_line + 1
+    while True:
+        # The one per-row step: pick the header's cells out of each streamed row
+        data = [get(r) if len(r) >= width else get(tuple(r) + (None,) * (width - len(r)))
+                for r in itertools.islice(rows, EXCEL_CHUNK_ROWS)]
+        if not data:
+            break
+        cells = np.array(data, dtype=object).reshape(len(data), len(keep))
+        empty = pd.isna(cells) | (cells == '')
+        cells[empty] = np.nan
+        filled = ~empty.all(axis=1)
+        df = pd.DataFrame(cells[filled], columns=columns)
+        producer = df['Producer'].astype(str)  # names typed as numbers in the sheet stay '17', not 17.0
+        df = df.infer_objects()
+        df['Producer'] = producer
+        frames.append(df)
+        lines.append(start + np.flatnonzero(filled))
+        start += len(data)
+    if not frames:
+        return pd.DataFrame(columns=columns), np.empty(0, dtype=np.int64)
+    return pd.concat(frames, ignore_index=True), np.concatenate(lines)
+
+def _sheet_error():
+    return IngestError(f"no sheet has a Producer column plus {CATEGORIES} or the {len(ALL_SUBCRITERIA)} "
+                       f"sub-criteria in its first {HEADER_SCAN_ROWS} rows")
+
+def read_xlsx(source, sheet=None):
+    """Read the producer table of an .xlsx workbook, streaming it in read-only mode.
+
+    Returns ``(frame, layout, lines, sheet)``; ``sheet`` None picks the first
+    sheet with a header.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    _rewind(source)
+    try:
+        wb = load_workbook(source, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as exc:
+        raise IngestError(f"not a readable .xlsx workbook: {exc}") from exc
+    try:
+        for name in wb.sheetnames if sheet is None else [sheet]:
+            found = _sheet_frame(wb[name].iter_rows(values_only=True))
+            if found is not None:
+                df, lines = found
+                return df, score_layout(df.columns), lines, name
+    finally:
+        wb.close()
+    raise _sheet_error()
+
+def read_xls(source, sheet=None):
+    """Read the producer table of a legacy .xls workbook with xlrd; returns like ``read_xlsx``."""
+    import xlrd
+
+    try:
+        book = xlrd.open_workbook(file_contents=_read_bytes(source), on_demand=True)
+    except xlrd.XLRDError as exc:
+        raise IngestError(f"not a readable .xls workbook: {exc}") from exc
+    try:
+        for name in book.sheet_names() if sheet is None else [sheet]:
+            sh = book.sheet_by_name(name)
+            found = _sheet_frame(sh.row_values(r) for r in range(sh.nrows))
+            if found is not None:
+                df, lines = found
+                return df, score_layout(df.columns), lines, name
+    finally:
+        book.release_resources()
+    raise _sheet_error()
+
+def detect_scale(values):
+    """10 when most valid scores exceed 1, else 1.
+
+    A majority rather than the largest value, so a few mistyped scores in a
+    0-1 file are reported as out of range instead of rescaling every row.
+    """
+    finite = values[np.isfinite(values)]
+    return 10 if finite.size and np.count_nonzero(finite > 1) * 2 > finite.size else 1
+
+def _to_float(column):
+    """``(values, malformed)`` of a score column; text cells that are not numbers become NaN."""
+    if pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype):
+        return column.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(column), dtype=bool)
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return values, column.notna().to_numpy(dtype=bool) & np.isnan(values)
+
+def validate(df, cols, scale=None, lines=None):
+    """Check ``df``'s producers and score columns ``cols``.
+
+    Returns ``(frame, report)``: the valid rows with the scores as float64 on
+    a 0-1 scale, and a dict with the detected ``scale``, the number of
+    ``rows`` and ``invalid_rows``, ``counts`` per problem and the ``errors``
+    frame (``ERROR_COLUMNS``). ``line`` is the file line of the row, taken
+    from ``lines`` when given, else counted with the header as line 1.
+    """
+    values, bad, report = check_scores(df, cols, scale, lines)
+    frame = df.loc[~bad].reset_index(drop=True) if report['invalid_rows'] else df
+    if report['scale'] != 1 or not all(pd.api.types.is_float_dtype(dtype) for dtype in df[cols].dtypes):
+        if frame is df:  # never rescale the caller's frame in place
+            frame = df.copy()
+        frame[cols] = values[~bad] / report['scale']
+    return frame, report
+
+def check_scores(df, cols, scale=None, lines=None):
+    """The checks of ``validate`` without building the frame.
+
+    Returns ``(values, bad, report)``: the scores as a float64 array on the
+    file's own scale, the mask of rows with a problem and the ``validate``
+    report. ``score_csv_stream`` checks each chunk with it.
+    """
+    raw = df[cols]
+    numeric = all(pd.api.types.is_float_dtype(dtype) for dtype in raw.dtypes)
+    if numeric:
+        values = raw.to_numpy(dtype=np.float64)
+        malformed = np.zeros(values.shape, dtype=bool)
+    else:
+        values, malformed = (np.column_stack(parts) for parts in zip(*(_to_float(raw[c]) for c in cols)))
+    missing = np.isnan(values) & ~malformed
+    if scale is None:
+        scale = detect_scale(values)
+    elif scale not in SCALES:
+        raise ValueError(f"scale must be one of {SCALES}, got {scale!r}")
+    with np.errstate(invalid='ignore'):
+        out_of_range = ~np.isnan(values) & ((values < 0) | (values > scale))
+
+    names = df['Producer']
+    no_name = names.str.strip().fillna('').eq('').to_numpy(dtype=bool)
+    duplicate = names.duplicated(keep='first').to_numpy() & ~no_name
+
+    cell_masks = {'malformed': malformed, 'missing': missing, 'out_of_range': out_of_range}
+    row_masks = {'missing_producer': no_name, 'duplicate_producer': duplicate}
+    bad = no_name | duplicate | malformed.any(axis=1) | missing.any(axis=1) | out_of_range.any(axis=1)
+
+    counts = {p: int(m.sum()) for p, m in {**cell_masks, **row_masks}.items()}
+    report = {'scale': scale, 'rows': len(df), 'invalid_rows': int(bad.sum()), 'counts': counts,
+              'errors': _error_report(df, raw, cols, cell_masks, row_masks, lines)}
+    return values, bad, report
+
+def _error_report(df, raw, cols, cell_masks, row_masks, lines=None, limit=MAX_REPORTED_ERRORS):
+    """One row per problem, in file order; ``column`` index -1 stands for Producer."""
+    rows, col_idx, problems = [], [], []
+    for problem, mask in cell_masks.items():
+        r, c = np.nonzero(mask)
+        rows.append(r)
+        col_idx.append(c)
+        problems.append(np.full(len(r), problem, dtype=object))
+    for problem, mask in row_masks.items():
+        r = np.flatnonzero(mask)
+        rows.append(r)
+        col_idx.append(np.full(len(r), -1))
+        problems.append(np.full(len(r), problem, dtype=object))
+    rows, col_idx, problems = np.concatenate(rows), np.concatenate(col_idx), np.concatenate(problems)
+    order = np.argsort(rows, kind='stable')[:limit]
+    rows, col_idx, problems = rows[order], col_idx[order], problems[order]
+
+    # Only the reported rows are converted to objects
+    names = df['Producer'].iloc[rows].to_numpy(dtype=object)
+    cells = raw.iloc[rows].to_numpy(dtype=object)
+    on_score = np.flatnonzero(col_idx >= 0)
+    value = names.copy()
+    value[on_score] = cells[on_score, col_idx[on_score]]
+    column = np.asarray(['Producer'] + list(cols), dtype=object)[col_idx + 1]
+    return pd.DataFrame({'line': rows + 2 if lines is None else lines[rows], 'producer': names, 'column': column,
+                         'value': value, 'problem': problems}, columns=ERROR_COLUMNS)
+
+def read_producers(source, engine=None, scale=None, sheet=None):
+    """Read and validate a producer CSV or Excel workbook (path or file object).
+
+    Returns a dict with the valid rows as ``frame``, the ``layout``, the
+    file ``format``, the ``sheet`` read (None for CSV), the ``engine`` used
+    and the ``validate`` report (``scale``, ``rows``, ``invalid_rows``,
+    ``counts``, ``errors``). Raises ``IngestError`` when no Producer column
+    and score layout is found.
+    """
+    fmt = detect_format(source)
+    if fmt == 'csv':
+        df, layout = read_csv(source, engine)
+        lines, engine = None, choose_engine(source, engine)
+    elif fmt == 'xlsx':
+        df, layout, lines, sheet = read_xlsx(source, sheet)
+        engine = 'openpyxl'
+    else:
+        if not xlrd_available():
+            raise IngestError("reading .xls workbooks needs the optional xlrd package")
+        df, layout, lines, sheet = read_xls(source, sheet)
+        engine = 'xlrd'
+    frame, report = validate(df, ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES, scale, lines)
+    return {'frame': frame, 'layout': layout, 'format': fmt, 'sheet': sheet, 'engine': engine, **report}
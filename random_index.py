@@ -0,0 +1,115 @@
+"""Random Index (RI) for AHP consistency ratios of any matrix size.
+
+RI(n) is the mean consistency index of random reciprocal n x n matrices with
+judgments drawn from the Saaty 1/9..9 scale. Sizes up to 30 ship in
+``RI_TABLE``; anything larger is estimated by Monte Carlo over batches of
+matrices (one stacked ``eigvals`` call per batch), spread over a process
+pool and cached to disk so each size is only simulated once per machine.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAATY_SCALE = np.array([1/9, 1/8, 1/7, 1/6, 1/5, 1/4, 1/3, 1/2, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+# 1-14 are the values the tool has always used; 15-30 were generated with
+# simulate_random_index(n, samples=100_000, seed=2024). The simulated values
+# run slightly below the legacy ones (simulated RI(14) is about 1.569), so
+# RI(15) < RI(14) here is expected.
+RI_TABLE = {
+    1: 0.0, 2: 0.0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41,
+    9: 1.45, 10: 1.49, 11: 1.51, 12: 1.54, 13: 1.56, 14: 1.59,
+    15: 1.5837, 16: 1.5956, 17: 1.6056, 18: 1.6147, 19: 1.6226, 20: 1.6293,
+    21: 1.6357, 22: 1.6416, 23: 1.6465, 24: 1.6514, 25: 1.6555, 26: 1.6593,
+    27: 1.6631, 28: 1.6664, 29: 1.6696, 30: 1.6725,
+}
+
+CACHE_PATH = os.environ.get(
+    'DAIRY_RI_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'dairy_selection_tool', 'random_index.json'),
+)
+
+_memory_cache = {}
+
+def random_reciprocal_matrices(n, size, rng):
+    """``size`` random reciprocal n x n matrices stacked into one array."""
+    iu, ju = np.triu_indices(n, 1)
+    upper = rng.choice(SAATY_SCALE, size=(size, len(iu)))
+    mats = np.ones((size, n, n))
+    mats[:, iu, ju] = upper
+    mats[:, ju, iu] = 1.0 / upper
+    return mats
+
+def _ci_sum(n, size, seed):
+    rng = np.random.default_rng(seed)
+    lambda_max = np.linalg.eigvals(random_reciprocal_matrices(n, size, rng)).real.max(axis=1)
+    return float(((lambda_max - n) / (n - 1)).sum())
+
+def simulate_random_index(n, samples=20_000, batch_size=1_000, seed=None, workers=None):
+    """Monte Carlo estimate of RI(n).
+
+    ``samples`` matrices are split into batches of ``batch_size``; each
+    batch gets an independent child seed so the result only depends on
+    ``seed``, not on ``workers``. ``workers=1`` runs in-process.
+    """
+    if n < 3:
+        return 0.0
+    sizes = [batch_size] * (samples // batch_size)
+    if samples % batch_size:
+        sizes.append(samples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers == 1 or len(sizes) == 1:
+        total = sum(_ci_sum(n, size, s) for size, s in zip(sizes, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            total = sum(pool.map(_ci_sum, [n] * len(sizes), sizes, seeds))
+    return total / samples
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH, encoding='utf-8') as f:
+            return {int(k): v for k, v in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(values):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp = CACHE_PATH + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({str(k): v for k, v in sorted(values.items())}, f, indent=1)
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass  # a read-only home only costs a re-simulation next time
+
+def random_index(n, samples=20_000, seed=0):
+    """RI for an n x n comparison matrix.
+
+    Looks in ``RI_TABLE``, then the in-process and on-disk caches, and only
+    simulates when none of them has ``n``.
+    """
+    if n in RI_TABLE:
+        return RI_TABLE[n]
+    if n not in _memory_cache:
+        disk = _load_cache()
+        if n not in disk:
+            disk[n] = simulate_random_index(n, samples=samples, seed=seed)
+            _save_cache(disk)
+        _memory_cache.update(disk)
+    return _memory_cache[n]
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Simulate AHP Random Index values.')
+    parser.add_argument('sizes', type=int, nargs='+', help='matrix sizes n')
+    parser.add_argument('--samples', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    for n in args.sizes:
+        ri = simulate_random_index(n, samples=args.samples, seed=args.seed, workers=args.workers)
+        print(f'{n}: {ri:.4f}')
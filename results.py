@@ -0,0 +1,306 @@
+"""Compact per-session storage of scored rankings.
+
+A ``calculate_scores`` frame costs a few hundred bytes per producer: float64
+inputs and scores, an object ``Producer`` column and a ``Ranking`` column.
+``CompactResults`` keeps the same ranking as
+
+* the input scores as one read-only float32 array in a canonical row order
+  (producer name order), shared through ``share`` with every other session
+  or weight state holding the same data,
+* producer names as categorical codes over an interned, shared category
+  array,
+* per session only the rank permutation (int32) and the four float32 score
+  columns; ``Ranking`` is implied by the row order.
+
+``to_frame`` rebuilds the frame for rendering, with ``Producer`` as a
+categorical column. Results idle for ``IDLE_SECONDS`` are spilled to disk by
+``REGISTRY.evict_idle``, which ``REGISTRY.start_sweeper`` runs from a
+background thread every ``EVICT_INTERVAL`` seconds, and are reloaded
+transparently on next access.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import ALL_SUBCRITERIA, CATEGORIES, resort_order, score_layout, score_projection
+
+SCORE_COLUMNS = [f'{cat} Score' for cat in CATEGORIES] + ['Total Score']
+# Results untouched for this long are spilled to disk by REGISTRY.evict_idle
+IDLE_SECONDS = float(os.environ.get('DAIRY_RESULTS_IDLE_SECONDS', 15 * 60))
+# How often the background sweep looks for idle results
+EVICT_INTERVAL = float(os.environ.get('DAIRY_RESULTS_EVICT_INTERVAL', 60))
+# Spill directory; by default a private temporary directory per process
+SPILL_DIR = os.environ.get('DAIRY_RESULTS_SPILL_DIR', '')
+
+# ─── SHARED READ-ONLY ARRAYS ──────────────────────────────────────────────────
+_shared = weakref.WeakValueDictionary()
+_shared_lock = threading.Lock()
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+def share(array):
+    """``array`` made read-only, or an identical array already held elsewhere in the process."""
+    if array.dtype == object:
+        # The name lengths make the joined text unambiguous: ['a\x1fb'] is not ['a', 'b']
+        names = array.tolist()
+        lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+        key = ('names', array.shape,
+               _digest(lengths.tobytes(), '\x1f'.join(names).encode('utf-8', 'surrogatepass')))
+    else:
+        array = np.ascontiguousarray(array)
+        key = (array.dtype.str, array.shape, _digest(array.tobytes()))
+    with _shared_lock:
+        existing = _shared.get(key)
+        if existing is not None:
+            return existing
+        if array.dtype == object:
+            array = np.array([sys.intern(s) for s in array.tolist()], dtype=object)
+        array.flags.writeable = False
+        _shared[key] = array
+    return array
+
+def _names_nbytes(names):
+    return names.nbytes + sum(sys.getsizeof(s) for s in names.tolist())
+
+def _widen(values):
+    """float32 ``values`` as float64 rounded to the 7 significant digits float32 holds (0.62, not 0.6200000048)."""
+    x = values.astype(np.float64)
+    mag = np.floor(np.log10(np.abs(x), out=np.zeros_like(x), where=x != 0))
+    scale = 10.0 ** (6 - mag)
+    return np.round(x * scale) / scale
+
+def _min_int(n):
+    return np.int8 if n < 2**7 else np.int16 if n < 2**15 else np.int32
+
+# ─── COMPACT RESULTS ──────────────────────────────────────────────────────────
+class CompactResults:
+    """A ranking in compact form; build with ``from_frame``."""
+
+    def __init__(self, data, columns, full_bytes=None):
+        self.columns = list(columns)
+        self.full_bytes = full_bytes
+        self._data = data
+        self._path = None
+        self._finalizer = None
+        self._lock = threading.RLock()
+        self.last_access = time.monotonic()
+        self.evictions = 0
+        REGISTRY.add(self)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Compact a ``calculate_scores`` (or stream top-k) result."""
+        layout = score_layout(df.columns)
+        cols = ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES if layout == 'categories' else []
+        n = len(df)
+        codes, categories = pd.factorize(df['Producer'].astype(str), sort=True)
+        categories = np.asarray(categories, dtype=object)
+        canon = np.argsort(codes, kind='stable')
+        inv = np.empty(n, dtype=np.int32)
+        inv[canon] = np.arange(n, dtype=np.int32)
+        ranking = df['Ranking'].to_numpy() if 'Ranking' in df.columns else None
+        if ranking is not None and np.array_equal(ranking, np.arange(1, n + 1)):
+            ranking = None
+        extra = [c for c in df.columns if c not in ['Producer', 'Ranking'] + cols + SCORE_COLUMNS]
+        data = {
+            'layout': layout,
+            'categories': share(categories),
+            'codes': share(codes[canon].astype(_min_int(len(categories)))),
+            'inputs': share(df[cols].to_numpy(dtype=np.float32)[canon]) if cols else None,
+            'inv': inv,
+            'scores': df[SCORE_COLUMNS].to_numpy(dtype=np.float32),
+            'ranking': None if ranking is None else ranking.astype(np.int32),
+            'extra': df[extra].reset_index(drop=True) if extra else None,
+        }
+        return cls(data, df.columns, int(df.memory_usage(index=False, deep=True).sum()))
+
+    def __len__(self):
+        return len(self._arrays()['inv'])
+
+    @property
+    def layout(self):
+        return self._arrays()['layout']
+
+    @property
+    def evicted(self):
+        return self._data is None
+
+    def _arrays(self):
+        with self._lock:
+            if self._data is None:
+                self._load()
+            self.last_access = time.monotonic()
+            return self._data
+
+    def inputs(self):
+        """Input scores in rank order (float32), or None for a ranking without inputs."""
+        d = self._arrays()
+        return None if d['inputs'] is None else d['inputs'][d['inv']]
+
+    def to_frame(self, widen=False):
+        """The ranking as a ``calculate_scores``-style frame (float32 scores, categorical names).
+
+        ``widen`` returns float64 scores rounded to float32 precision instead,
+        for exports, where the float32 rounding noise would otherwise be written
+        out digit for digit.
+        """
+        d = self._arrays()
+        cols = ALL_SUBCRITERIA if d['layout'] == 'subcriteria' else CATEGORIES if d['layout'] == 'categories' else []
+        cast = _widen if widen else (lambda values: values)
+        data = {'Producer': pd.Categorical.from_codes(d['codes'][d['inv']], pd.Index(d['categories']))}
+        if cols:
+            data.update(zip(cols, cast(d['inputs'][d['inv']]).T))
+        data.update(zip(SCORE_COLUMNS, cast(d['scores']).T))
+        n = len(d['inv'])
+        data['Ranking'] = np.arange(1, n + 1) if d['ranking'] is None else d['ranking']
+        if d['extra'] is not None:
+            data.update(d['extra'].items())
+        return pd.DataFrame(data, columns=self.columns, copy=False)
+
+    def rescore(self, weights):
+        """The same producers re-ranked for ``weights``; the shared inputs are reused, not copied.
+
+        Scores are recomputed from the inputs rather than shifted, so repeated
+        weight changes do not accumulate float32 rounding; ``resort_order``
+        still only re-sorts the rows whose rank changed.
+        """
+        d = self._arrays()
+        if d['inputs'] is None:
+            raise ValueError('a ranking without input scores cannot be rescored')
+        scores = d['inputs'][d['inv']] @ score_projection(d['layout'], weights)
+        order = resort_order(scores[:, -1])
+        data = dict(d, inv=d['inv'][order], scores=scores[order].astype(np.float32), ranking=None,
+                    extra=None if d['extra'] is None else d['extra'].iloc[order].reset_index(drop=True))
+        return CompactResults(data, self.columns, self.full_bytes)
+
+    # ── Memory and eviction ──────────────────────────────────────────────────
+    def memory(self):
+        """Bytes held by this session alone, by arrays shared with others, and as a full frame."""
+        with self._lock:
+            d = self._data
+            if d is None:
+                return {'session_bytes': 0, 'shared_bytes': 0, 'frame_bytes': self.full_bytes, 'evicted': True}
+        own = d['inv'].nbytes + d['scores'].nbytes + (0 if d['ranking'] is None else d['ranking'].nbytes)
+        if d['extra'] is not None:
+            own += int(d['extra'].memory_usage(index=False, deep=True).sum())
+        shared = d['codes'].nbytes + _names_nbytes(d['categories'])
+        if d['inputs'] is not None:
+            shared += d['inputs'].nbytes
+        return {'session_bytes': own, 'shared_bytes': shared, 'frame_bytes': self.full_bytes, 'evicted': False}
+
+    def evict(self, directory=None):
+        """Spill the arrays to disk and drop them from memory; returns the bytes released."""
+        with self._lock:
+            if self._data is None:
+                return 0
+            released = self.memory()['session_bytes']
+            path = os.path.join(directory or spill_dir(), f'{uuid.uuid4().hex}.pkl')
+            with open(path, 'wb') as f:
+                pickle.dump(self._data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._data, self._path = None, path
+            self._finalizer = weakref.finalize(self, _remove, path)
+            self.evictions += 1
+            return released
+
+    def _load(self):
+        with open(self._path, 'rb') as f:
+            data = pickle.load(f)
+        for key in ('categories', 'codes', 'inputs'):
+            if data[key] is not None:
+                data[key] = share(data[key])
+        self._finalizer()  # removes the file
+        self._data, self._path, self._finalizer = data, None, None
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+_spill_dir = None
+
+def spill_dir():
+    """Directory evicted results are written to (created on first use, private to the user)."""
+    global _spill_dir
+    if _spill_dir is None:
+        if SPILL_DIR:
+            os.makedirs(SPILL_DIR, mode=0o700, exist_ok=True)
+            _spill_dir = SPILL_DIR
+        else:
+            _spill_dir = tempfile.mkdtemp(prefix='dairy_results_')
+    return _spill_dir
+
+class ResultsRegistry:
+    """Every live ``CompactResults`` of the process, for idle eviction and memory totals."""
+
+    def __init__(self):
+        self._items = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, results):
+        with self._lock:
+            self._items.add(results)
+
+    def _all(self):
+        with self._lock:
+            return list(self._items)
+
+    def evict_idle(self, idle_seconds=IDLE_SECONDS, keep=()):
+        """Spill results not accessed for ``idle_seconds``, except those in ``keep``; returns bytes released."""
+        now = time.monotonic()
+        keep = {id(r) for r in keep if r is not None}
+        return sum(r.evict() for r in self._all()
+                   if id(r) not in keep and not r.evicted and now - r.last_access > idle_seconds)
+
+    def start_sweeper(self, interval=EVICT_INTERVAL, idle_seconds=IDLE_SECONDS):
+        """Run ``evict_idle`` every ``interval`` seconds from a daemon thread; returns an event that stops it.
+
+        Spilling pickles to disk, so it is kept off the script runs of the
+        sessions that happen to be active.
+        """
+        stop = threading.Event()
+
+        def sweep():
+            while not stop.wait(interval):
+                try:
+                    self.evict_idle(idle_seconds)
+                except OSError:
+                    pass  # e.g. a full disk; the results stay in memory until the next sweep
+
+        threading.Thread(target=sweep, name='dairy-results-sweeper', daemon=True).start()
+        return stop
+
+    def stats(self):
+        items = self._all()
+        mems = [r.memory() for r in items]
+        shared, seen = 0, set()
+        for r in items:
+            d = r._data
+            if d is None:
+                continue
+            for key in ('categories', 'codes', 'inputs'):
+                if d[key] is not None and id(d[key]) not in seen:
+                    seen.add(id(d[key]))
+                    shared += _names_nbytes(d[key]) if key == 'categories' else d[key].nbytes
+        return {
+            'results': len(items),
+            'evicted': sum(m['evicted'] for m in mems),
+            'session_bytes': sum(m['session_bytes'] for m in mems),
+            'shared_bytes': shared,
+            'frame_bytes': sum(m['frame_bytes'] or 0 for m in mems),
+        }
+
+REGISTRY = ResultsRegistry()
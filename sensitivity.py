@@ -0,0 +1,128 @@
+"""Monte Carlo weight-sensitivity analysis for AHP rankings.
+
+Weight vectors are drawn from a Dirichlet distribution centred on the current
+weights, every producer is scored for every draw with one matrix product per
+chunk, and the resulting ranks are accumulated into a producers x ranks
+histogram. Large runs spread their chunks over a process pool that is
+created once per process and reused; small runs stay in-process, where the
+pool's start-up and transfers would cost more than they save.
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ahp_engine import ALL_SUBCRITERIA, CATEGORIES, WeightModel, weights_vector, category_weights
+
+# The rank histogram is producers x producers, so keep it to a few hundred MB
+MAX_PRODUCERS = 5_000
+# Runs below this many producer-draws (about a second of work) are not parallelized
+PARALLEL_MIN_DRAWS = 10_000_000
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+def _executor(workers):
+    """The module's process pool, replaced only when a different ``workers`` is asked for."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        return _pool
+
+def _shutdown():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+
+atexit.register(_shutdown)
+
+def base_weight_vector(weights, n_criteria):
+    """Normalized weights matching a score matrix with ``n_criteria`` columns.
+
+    ``weights`` may be a ``{sub-criterion: weight}`` dict or a
+    ``WeightModel`` (collapsed to category weights for a 3-column matrix),
+    or an already aligned array.
+    """
+    if isinstance(weights, (dict, WeightModel)):
+        if n_criteria == len(ALL_SUBCRITERIA):
+            return weights_vector(weights)
+        if n_criteria == len(CATEGORIES):
+            return category_weights(weights)
+        raise ValueError(f"expected {len(ALL_SUBCRITERIA)} or {len(CATEGORIES)} score columns, got {n_criteria}")
+    w = np.asarray(weights, dtype=float)
+    return w / w.sum()
+
+def _rank_histogram(values, alpha, sizes, seeds):
+    """Producers x ranks int32 counts over the chunks of ``sizes`` draws, one seed per chunk."""
+    n = values.shape[0]
+    hist = np.zeros((n, n), dtype=np.int32)
+    for draws, seed in zip(sizes, seeds):
+        rng = np.random.default_rng(seed)
+        totals = rng.dirichlet(alpha, size=draws) @ values.T          # draws x producers
+        order = np.argsort(-totals, axis=1, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(n), axis=1)
+        hist += np.bincount((np.arange(n) * n + ranks).ravel(), minlength=n * n).reshape(n, n)
+    return hist
+
+def weight_sensitivity(values, weights, draws=10_000, concentration=200.0, top_n=3,
+                       interval=0.9, seed=None, chunk_size=2_000, workers=None):
+    """Rank stability of every producer under perturbed weights.
+
+    ``values`` is a producers x 14 (or x 3 category) score matrix and
+    ``concentration`` the Dirichlet precision: larger values keep the draws
+    closer to ``weights``. Returns a dict with per-producer arrays
+    ``base_rank``, ``mean_rank``, ``modal_rank``, ``rank_low``/``rank_high``
+    (the central ``interval`` of the rank distribution) and ``p_top`` (share
+    of draws ranking in the top ``top_n``), plus the raw ``histogram`` where
+    ``histogram[i, r]`` (int32) counts draws that put producer ``i`` at rank
+    ``r + 1``.
+
+    With ``workers`` other than 1 and at least ``PARALLEL_MIN_DRAWS``
+    producer-draws, the chunks are dealt out to ``workers`` processes
+    (default: CPU count) of the shared pool, each returning one histogram.
+    """
+    values = np.ascontiguousarray(values, dtype=float)
+    n = values.shape[0]
+    if n > MAX_PRODUCERS:
+        raise ValueError(f"sensitivity analysis supports at most {MAX_PRODUCERS} producers, got {n}")
+    w = base_weight_vector(weights, values.shape[1])
+    alpha = np.maximum(concentration * w, 1e-6)
+
+    sizes = [chunk_size] * (draws // chunk_size)
+    if draws % chunk_size:
+        sizes.append(draws % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+    tasks = min(workers, len(sizes))
+    if tasks == 1 or n * draws < PARALLEL_MIN_DRAWS:
+        hist = _rank_histogram(values, alpha, sizes, seeds)
+    else:
+        hist = np.zeros((n, n), dtype=np.int32)
+        for part in _executor(workers).map(_rank_histogram, [values] * tasks, [alpha] * tasks,
+                                           [sizes[i::tasks] for i in range(tasks)],
+                                           [seeds[i::tasks] for i in range(tasks)]):
+            hist += part
+
+    base_order = np.argsort(-(values @ w), kind='stable')
+    base_rank = np.empty(n, dtype=int)
+    base_rank[base_order] = np.arange(1, n + 1)
+
+    cdf = np.cumsum(hist, axis=1) / draws
+    tail = (1 - interval) / 2
+    return {
+        'draws': draws,
+        'base_rank': base_rank,
+        'mean_rank': hist @ np.arange(1, n + 1) / draws,
+        'modal_rank': hist.argmax(axis=1) + 1,
+        'rank_low': (cdf < tail).sum(axis=1) + 1,
+        'rank_high': np.minimum((cdf < 1 - tail).sum(axis=1) + 1, n),
+        'p_top': hist[:, :top_n].sum(axis=1) / draws,
+        'histogram': hist,
+    }
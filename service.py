@@ -0,0 +1,438 @@
+"""Local HTTP scoring service built on asyncio and the standard library.
+
+Endpoints (JSON in, JSON out):
+
+``POST /score``
+    ``{"producers": [{"Producer": ..., <score columns>}], "weights": {...},
+    "top_k": n, "tiebreak": "Economic"}`` -> the ranking. Producers use either
+    the 14 sub-criteria or the Economic/Social/Production columns; ``weights``
+    defaults to ``DEFAULT_WEIGHTS``.
+``POST /consistency``
+    ``{"matrix": [[...]]}`` -> lambda_max, CI, RI, CR and the priority vector.
+    Sizes beyond ``random_index.RI_TABLE`` are analysed in a worker thread,
+    since their RI is simulated on first use.
+``POST /normalize``
+    ``{"weights": {...}}`` -> normalized weights and category totals.
+``GET /health``
+    request and batch counters.
+
+Score requests arriving within ``window`` seconds of each other are
+coalesced: their producers are stacked per layout and weight set and scored
+with one matrix product, and only the per-request ranking is done
+separately. Connections are HTTP/1.1 keep-alive. ``loadtest`` drives the
+service over keep-alive connections and reports latency percentiles::
+
+    python service.py serve --port 8600
+    python service.py loadtest --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import numpy as np
+
+from ahp_engine import (ALL_SUBCRITERIA, CATEGORIES, DEFAULT_WEIGHTS, TIEBREAKS, ahp_analysis, rank_order,
+                        score_projection, tiebreak_key, weight_model)
+from random_index import RI_TABLE
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+BATCH_WINDOW = 0.002
+BATCH_MAX_ROWS = 65_536
+MAX_BODY_BYTES = 16 * 2**20
+KEEP_ALIVE_TIMEOUT = 15.0
+MAX_MATRIX_SIZE = 64
+
+class RequestError(ValueError):
+    """Invalid request; reported to the client with ``status``."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+# ─── REQUEST PARSING ──────────────────────────────────────────────────────────
+def parse_weights(raw):
+    """``WeightModel`` of a request's weights; missing sub-criteria use the defaults."""
+    if raw is None:
+        return weight_model(DEFAULT_WEIGHTS)
+    if not isinstance(raw, dict):
+        raise RequestError("'weights' must be an object keyed by sub-criterion")
+    unknown = set(raw) - set(ALL_SUBCRITERIA)
+    if unknown:
+        raise RequestError(f"unknown sub-criteria in 'weights': {sorted(unknown)}")
+    try:
+        values = {k: float(v) for k, v in raw.items()}
+    except (TypeError, ValueError):
+        raise RequestError("'weights' values must be numbers") from None
+    if any(not np.isfinite(v) or v < 0 for v in values.values()):
+        raise RequestError("'weights' values must be finite and non-negative")
+    model = weight_model(values)
+    if not sum(model.raw.values()) > 0:
+        raise RequestError("'weights' must not all be zero")
+    return model
+
+def parse_producers(producers):
+    """``(layout, names, values)`` of a ``/score`` request's producer records."""
+    if not isinstance(producers, list) or not producers:
+        raise RequestError("'producers' must be a non-empty list of objects")
+    if not all(isinstance(p, dict) for p in producers):
+        raise RequestError("'producers' must be a non-empty list of objects")
+    first = producers[0]
+    layout, cols = ('subcriteria', ALL_SUBCRITERIA) if ALL_SUBCRITERIA[0] in first else ('categories', CATEGORIES)
+    try:
+        names = [str(p['Producer']) for p in producers]
+        values = np.array([[p[c] for c in cols] for p in producers], dtype=float)
+    except KeyError as exc:
+        raise RequestError(f"producer is missing {exc.args[0]!r}; expected 'Producer' plus "
+                           f"{CATEGORIES} or the {len(ALL_SUBCRITERIA)} sub-criteria") from None
+    except (TypeError, ValueError):
+        raise RequestError('producer scores must be numbers') from None
+    if not np.isfinite(values).all():
+        raise RequestError('producer scores must be finite')
+    return layout, names, values
+
+def parse_matrix(raw):
+    try:
+        matrix = np.array(raw, dtype=float)
+    except (TypeError, ValueError):
+        raise RequestError("'matrix' must be a square list of lists of numbers") from None
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1] or not 0 < len(matrix) <= MAX_MATRIX_SIZE:
+        raise RequestError(f"'matrix' must be square with 1 to {MAX_MATRIX_SIZE} rows")
+    if not (np.isfinite(matrix).all() and (matrix > 0).all()):
+        raise RequestError("'matrix' entries must be positive numbers")
+    return matrix
+
+# ─── MICRO-BATCHING ───────────────────────────────────────────────────────────
+class ScoreBatcher:
+    """Coalesces concurrent score requests into one product per weight set.
+
+    The first request of a batch starts a ``window`` second timer; every
+    request arriving before it fires (or before ``max_rows`` producers are
+    queued) is scored together when it does.
+    """
+
+    def __init__(self, window=BATCH_WINDOW, max_rows=BATCH_MAX_ROWS):
+        self.window = window
+        self.max_rows = max_rows
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+
+    async def score(self, layout, names, values, model, top_k=None, tiebreak=None):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((layout, names, values, model, top_k, tiebreak, future))
+        self._pending_rows += len(values)
+        if self._pending_rows >= self.max_rows:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return
+        self.batches += 1
+        self.requests += len(pending)
+        groups = {}
+        for job in pending:
+            groups.setdefault((job[0], job[3].digest), []).append(job)
+        for jobs in groups.values():
+            values = np.concatenate([job[2] for job in jobs]) if len(jobs) > 1 else jobs[0][2]
+            self.rows += len(values)
+            out = values @ score_projection(jobs[0][0], jobs[0][3])
+            start = 0
+            for _, names, job_values, _, top_k, tiebreak, future in jobs:
+                block = out[start:start + len(job_values)]
+                start += len(job_values)
+                if future.done():  # client went away
+                    continue
+                try:
+                    future.set_result(ranking_payload(names, block, top_k, tiebreak))
+                except Exception as exc:
+                    future.set_exception(exc)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_requests': self.requests / self.batches if self.batches else 0.0,
+        }
+
+def ranking_payload(names, scores, top_k=None, tiebreak=None):
+    """Response body for one request's block of ``[subtotals..., total]`` rows."""
+    subtotals, totals = scores[:, :-1], scores[:, -1]
+    order = rank_order(totals, k=top_k, tiebreak=tiebreak_key(tiebreak, names, subtotals))
+    ranked = scores[order].tolist()
+    return {
+        'n_producers': len(names),
+        'ranking': [
+            {'Producer': names[i], 'Economic Score': row[0], 'Social Score': row[1],
+             'Production Score': row[2], 'Total Score': row[3], 'Ranking': r}
+            for r, (i, row) in enumerate(zip(order.tolist(), ranked), start=1)
+        ],
+    }
+
+# ─── HANDLERS ─────────────────────────────────────────────────────────────────
+async def handle_score(service, body):
+    layout, names, values = parse_producers(body.get('producers'))
+    model = parse_weights(body.get('weights'))
+    top_k = body.get('top_k')
+    if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+        raise RequestError("'top_k' must be a positive integer")
+    tiebreak = body.get('tiebreak')
+    if tiebreak is not None and tiebreak not in TIEBREAKS:
+        raise RequestError(f"'tiebreak' must be one of {TIEBREAKS}")
+    result = await service.batcher.score(layout, names, values, model, top_k, tiebreak)
+    result['layout'] = layout
+    result['weights_digest'] = model.digest
+    return result
+
+async def handle_consistency(service, body):
+    matrix = parse_matrix(body.get('matrix'))
+    if len(matrix) in RI_TABLE:
+        result = ahp_analysis(matrix)
+    else:  # the RI may have to be simulated first; keep that off the event loop
+        result = await asyncio.get_running_loop().run_in_executor(None, ahp_analysis, matrix)
+    return {
+        'n': result['n'], 'lambda_max': result['lambda_max'], 'CI': result['CI'],
+        'RI': result['RI'], 'CR': result['CR'], 'consistent': result['CR'] < 0.1,
+        'weights': result['weights'].tolist(),
+    }
+
+async def handle_normalize(service, body):
+    model = parse_weights(body.get('weights', {}))
+    return {'normalized': model.normalized, 'categories': model.category_totals, 'digest': model.digest}
+
+async def handle_health(service, body):
+    return {'status': 'ok', **service.batcher.stats()}
+
+ROUTES = {
+    ('POST', '/score'): handle_score,
+    ('POST', '/consistency'): handle_consistency,
+    ('POST', '/normalize'): handle_normalize,
+    ('GET', '/health'): handle_health,
+}
+
+# ─── HTTP ─────────────────────────────────────────────────────────────────────
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    status = HTTPStatus(status)
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+async def read_request(reader, timeout=None):
+    """``(method, path, version, headers, body)`` of the next request, or ``None`` at EOF."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise RequestError('request header too large', HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE) from None
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise RequestError('malformed request line') from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        raise RequestError('chunked request bodies are not supported', HTTPStatus.LENGTH_REQUIRED)
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError('invalid Content-Length') from None
+    if length > MAX_BODY_BYTES:
+        raise RequestError(f'request body over {MAX_BODY_BYTES} bytes', HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b''
+    return method, target.split('?', 1)[0], version, headers, body
+
+class ScoringService:
+    def __init__(self, window=BATCH_WINDOW, max_rows=BATCH_MAX_ROWS, keep_alive_timeout=KEEP_ALIVE_TIMEOUT):
+        self.batcher = ScoreBatcher(window, max_rows)
+        self.keep_alive_timeout = keep_alive_timeout
+
+    async def dispatch(self, method, path, body):
+        handler = ROUTES.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in ROUTES):
+                raise RequestError(f'{method} not allowed on {path}', HTTPStatus.METHOD_NOT_ALLOWED)
+            raise RequestError(f'no endpoint {path}', HTTPStatus.NOT_FOUND)
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise RequestError('body is not valid JSON') from None
+        if not isinstance(payload, dict):
+            raise RequestError('body must be a JSON object')
+        return await handler(self, payload)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await read_request(reader, self.keep_alive_timeout)
+                    if request is None:
+                        break
+                    method, path, version, headers, body = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                    response = http_response(HTTPStatus.OK, await self.dispatch(method, path, body), keep_alive)
+                except RequestError as exc:
+                    response = http_response(exc.status, {'error': str(exc)}, keep_alive)
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as exc:  # keep serving other requests
+                    response = http_response(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                             {'error': f'{type(exc).__name__}: {exc}'}, keep_alive)
+                writer.write(response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        return await asyncio.start_server(self.handle_connection, host, port, limit=64 * 2**10)
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, window=BATCH_WINDOW, max_rows=BATCH_MAX_ROWS):
+    server = await ScoringService(window, max_rows).start(host, port)
+    print(f'Scoring service on http://{host}:{port} (batch window {window * 1000:g} ms)')
+    async with server:
+        await server.serve_forever()
+
+# ─── LOAD TEST ────────────────────────────────────────────────────────────────
+async def _request(reader, writer, method, path, body=b''):
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    return status, await reader.readexactly(length)
+
+def score_request_body(n_producers, seed=0, layout='subcriteria'):
+    rng = np.random.default_rng(seed)
+    cols = ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES
+    values = rng.random((n_producers, len(cols))).round(4).tolist()
+    producers = [{'Producer': f'P{seed}-{i}', **dict(zip(cols, row))} for i, row in enumerate(values)]
+    return json.dumps({'producers': producers}).encode('utf-8')
+
+def percentiles(latencies, points=(50, 90, 95, 99)):
+    """Latency percentiles in milliseconds, plus the mean and maximum."""
+    ms = np.asarray(latencies, dtype=float) * 1000
+    if not len(ms):
+        return {}
+    out = {f'p{p}': float(np.percentile(ms, p)) for p in points}
+    out.update(mean=float(ms.mean()), max=float(ms.max()))
+    return out
+
+async def load_test(host, port, concurrency=32, requests=2000, producers=10, path='/score'):
+    """Send ``requests`` requests over ``concurrency`` keep-alive connections; returns a report dict."""
+    bodies = [score_request_body(producers, seed) for seed in range(min(concurrency, 64))]
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def client(i):
+        nonlocal remaining, errors
+        reader, writer = await asyncio.open_connection(host, port)
+        body = bodies[i % len(bodies)]
+        try:
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, 'POST', path, body)
+                latencies.append(time.perf_counter() - start)
+                errors += status != HTTPStatus.OK
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, health = await _request(reader, writer, 'GET', '/health')
+    writer.close()
+    await writer.wait_closed()
+    return {
+        'requests': len(latencies), 'errors': errors, 'concurrency': concurrency,
+        'producers_per_request': producers, 'seconds': elapsed,
+        'requests_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': percentiles(latencies), 'server': json.loads(health),
+    }
+
+async def local_load_test(concurrency, requests, producers, window=BATCH_WINDOW, max_rows=BATCH_MAX_ROWS):
+    """``load_test`` against a service started in this process on a free port."""
+    server = await ScoringService(window, max_rows).start(DEFAULT_HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await load_test(DEFAULT_HOST, port, concurrency, requests, producers)
+
+def format_report(report):
+    lat = report['latency_ms']
+    server = report['server']
+    return '\n'.join([
+        f"{report['requests']:,} requests ({report['errors']} errors) over {report['concurrency']} connections, "
+        f"{report['producers_per_request']} producers each, in {report['seconds']:.2f} s "
+        f"= {report['requests_per_s']:,.0f} req/s",
+        'latency ms: ' + '  '.join(f'{k} {v:.2f}' for k, v in lat.items()),
+        f"server: {server.get('batches', 0):,} batches, "
+        f"{server.get('mean_batch_requests', 0):.1f} requests per batch",
+    ])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='AHP scoring HTTP service.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'loadtest'):
+        p = sub.add_parser(name)
+        p.add_argument('--host', default=DEFAULT_HOST)
+        p.add_argument('--port', type=int, default=None,
+                       help=f'serve: listen port (default {DEFAULT_PORT}); '
+                            'loadtest: target port (default: start a local service)')
+        p.add_argument('--window-ms', type=float, default=BATCH_WINDOW * 1000, help='micro-batch window')
+        p.add_argument('--max-batch-rows', type=int, default=BATCH_MAX_ROWS)
+    lt = sub.choices['loadtest']
+    lt.add_argument('--concurrency', type=int, default=32)
+    lt.add_argument('--requests', type=int, default=2000)
+    lt.add_argument('--producers', type=int, default=10, help='producers per score request')
+    lt.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+    window = args.window_ms / 1000
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port or DEFAULT_PORT, window, args.max_batch_rows))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.port is None:
+        report = asyncio.run(local_load_test(args.concurrency, args.requests, args.producers,
+                                             window, args.max_batch_rows))
+    else:
+        report = asyncio.run(load_test(args.host, args.port, args.concurrency, args.requests, args.producers))
+    print(json.dumps(report, indent=1) if args.json else format_report(report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep the app's run history out of the user's home directory while testing
+os.environ.setdefault('DAIRY_HISTORY_DB', os.path.join(tempfile.mkdtemp(prefix='dairy_tests_'), 'history.sqlite3'))
@@ -0,0 +1,75 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import (ALL_SUBCRITERIA, CATEGORIES, COMPARISON_MATRIX, DEFAULT_WEIGHTS, ahp_analysis,
+                        calculate_scores, rank_order, resort_order, score_frame)
+
+def producers(n, layout='subcriteria', seed=0):
+    rng = np.random.default_rng(seed)
+    cols = ALL_SUBCRITERIA if layout == 'subcriteria' else CATEGORIES
+    df = pd.DataFrame(rng.integers(0, 11, size=(n, len(cols))) / 10, columns=cols)
+    df.insert(0, 'Producer', [f'P{i:04d}' for i in range(n)])
+    return df
+
+def test_engine_is_headless():
+    code = "import sys, ahp_engine; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+def test_calculate_scores():
+    for layout in ('subcriteria', 'categories'):
+        df = producers(50, layout)
+        ranked = calculate_scores(df, DEFAULT_WEIGHTS)
+        subtotals, totals = score_frame(df, DEFAULT_WEIGHTS)
+        np.testing.assert_allclose(ranked['Total Score'], np.sort(totals)[::-1])
+        np.testing.assert_allclose(ranked[[f'{c} Score' for c in CATEGORIES]].sum(axis=1), ranked['Total Score'])
+        assert ranked['Ranking'].tolist() == list(range(1, 51))
+        assert sorted(ranked['Producer']) == sorted(df['Producer'])
+
+def test_rank_order_top_k_matches_full_sort():
+    totals = np.random.default_rng(3).integers(0, 20, size=500).astype(float)
+    full = rank_order(totals)
+    np.testing.assert_array_equal(full, np.argsort(-totals, kind='stable'))
+    for k in (0, 1, 7, 500, 600):
+        np.testing.assert_array_equal(rank_order(totals, k=k), full[:k])
+
+def test_rank_order_tiebreak():
+    totals = np.array([1.0, 2.0, 2.0, 1.0])
+    np.testing.assert_array_equal(rank_order(totals, tiebreak=np.array([0, 5, 3, 0])), [2, 1, 0, 3])
+
+def test_rank_order_puts_nan_last():
+    totals = np.array([np.nan, 1.0, 2.0, np.nan, 0.5])
+    np.testing.assert_array_equal(rank_order(totals), [2, 1, 4, 0, 3])
+    np.testing.assert_array_equal(rank_order(totals, k=1), [2])
+    np.testing.assert_array_equal(rank_order(totals, k=4), [2, 1, 4, 0])
+    np.testing.assert_array_equal(rank_order([np.nan, 1, 2], k=1), [2])
+    np.testing.assert_array_equal(rank_order(totals, tiebreak=np.zeros(5)), [2, 1, 4, 0, 3])
+
+def test_top_k_matches_full_ranking():
+    df = producers(300)
+    full = calculate_scores(df, DEFAULT_WEIGHTS)
+    top = calculate_scores(df, DEFAULT_WEIGHTS, top_k=25)
+    pd.testing.assert_frame_equal(top, full.head(25))
+
+def test_default_weights_are_the_matrix_priorities():
+    result = ahp_analysis(COMPARISON_MATRIX)
+    assert np.isclose(sum(DEFAULT_WEIGHTS.values()), 1.0)
+    np.testing.assert_allclose(list(DEFAULT_WEIGHTS.values()), result['weights'])
+    assert result['CR'] < 0.1
+
+def test_power_iteration_matches_eig():
+    power, eig = ahp_analysis(COMPARISON_MATRIX, 'power'), ahp_analysis(COMPARISON_MATRIX, 'eig')
+    assert np.isclose(power['lambda_max'], eig['lambda_max'])
+    np.testing.assert_allclose(power['weights'], eig['weights'], atol=1e-9)
+
+def shifted_weights(seed=1):
+    rng = np.random.default_rng(seed)
+    return {k: v * rng.uniform(0.5, 1.5) for k, v in DEFAULT_WEIGHTS.items()}
+
+def test_resort_order_is_a_stable_sort():
+    rng = np.random.default_rng(5)
+    totals = np.sort(rng.integers(0, 50, size=1_000))[::-1].astype(float)
+    totals[400:420] = rng.integers(0, 50, size=20)
+    np.testing.assert_array_equal(resort_order(totals), np.argsort(-totals, kind='stable'))
@@ -0,0 +1,47 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ahp_engine import CATEGORIES, DEFAULT_WEIGHTS, calculate_scores
+from ahp_stream import score_csv_stream
+from ingest import IngestError
+from tests.test_ahp_engine import producers
+
+HEADER = 'Producer,' + ','.join(CATEGORIES) + '\n'
+
+def stream(text, encoding='utf-8', **kwargs):
+    return score_csv_stream(io.BytesIO((HEADER + text).encode(encoding)), DEFAULT_WEIGHTS, **kwargs)
+
+def test_matches_in_memory_ranking(tmp_path):
+    for layout in ('subcriteria', 'categories'):
+        df = producers(1_000, layout)
+        source = io.BytesIO(df.to_csv(index=False).encode())
+        spill = tmp_path / f'{layout}.csv'
+        result = score_csv_stream(source, DEFAULT_WEIGHTS, top_k=20, chunksize=128, spill_path=str(spill))
+        full = calculate_scores(df, DEFAULT_WEIGHTS)
+        assert result['rows'] == 1_000 and result['invalid_rows'] == 0
+        assert result['top']['Producer'].tolist() == full['Producer'].head(20).tolist()
+        ranking = pd.read_csv(spill)
+        assert ranking['Producer'].tolist() == full['Producer'].tolist()
+        np.testing.assert_allclose(ranking['Total Score'], full['Total Score'])
+
+def test_bad_rows_are_reported_not_ranked():
+    result = stream('A,0.9,0.9,0.9\nB,0.5,,0.5\nC,0.8,0.8,0.8\nD,0.1,x,0.1\n', top_k=2, chunksize=2)
+    assert result['top']['Producer'].tolist() == ['A', 'C']
+    assert result['rows'] == 4 and result['invalid_rows'] == 2
+    assert result['counts']['missing'] == 1 and result['counts']['malformed'] == 1
+    assert result['errors']['line'].tolist() == [3, 5]
+
+def test_ten_point_scale():
+    result = stream('A,9,9,9\nB,5,5,5\n', chunksize=1)
+    assert result['scale'] == 10
+    np.testing.assert_allclose(result['top']['Total Score'], [0.9, 0.5])
+
+def test_latin1_file():
+    assert stream('José,0.5,0.5,0.5\n', encoding='latin-1')['top']['Producer'].tolist() == ['José']
+
+def test_missing_columns():
+    with pytest.raises(IngestError):
+        score_csv_stream(io.BytesIO(b'Name,Economic\nA,1\n'), DEFAULT_WEIGHTS)
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from ahp_engine import CATEGORIES
+from sensitivity import MAX_PRODUCERS
+from translations import translate
+
+APP = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'DairySelectionTool.py')
+
+def app_with_upload(name, data, mime='text/csv'):
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.file_uploader[0].set_value((name, data, mime))
+    return at.run()
+
+def click(at, key):
+    return next(b for b in at.button if b.label == translate(key)).click().run()
+
+def details_tab(at):
+    at.session_state['results_tab'] = translate('details_tab')
+    return at.run()
+
+def producer_csv(n):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(0, 11, size=(n, len(CATEGORIES))) / 10, columns=CATEGORIES)
+    df.insert(0, 'Producer', [f'P{i:05d}' for i in range(n)])
+    return df.to_csv(index=False).encode()
+
+def test_sensitivity_is_skipped_for_large_rankings():
+    at = details_tab(click(app_with_upload('big.csv', producer_csv(MAX_PRODUCERS + 1)), 'calc_button'))
+    assert not at.exception
+    message = translate('sensitivity_too_many').format(max=MAX_PRODUCERS, n=MAX_PRODUCERS + 1)
+    assert message in [info.value for info in at.info]
+    assert translate('sensitivity_run') not in [b.label for b in at.button]
+
+def test_sensitivity_runs():
+    at = details_tab(click(app_with_upload('small.csv', producer_csv(20)), 'calc_button'))
+    at = click(at, 'sensitivity_run')
+    assert not at.exception
+    assert len(at.session_state.sensitivity) == 20
+
+def test_upload_errors_have_their_own_messages():
+    at = app_with_upload('ragged.csv', b'Producer,Economic,Social,Production\nA,1,1,1\nB,1,1,1,1,1\n')
+    assert [e.value for e in at.error] == [translate('ingest_parse')]
+    at = app_with_upload('empty.csv', b'')
+    assert [e.value for e in at.error] == [translate('ingest_parse')]
+    at = app_with_upload('columns.csv', b'Name,Score\nA,1\n')
+    assert [e.value for e in at.error] == [translate('ingest_columns')]
+
+def test_latin1_upload():
+    data = 'Producer,Economic,Social,Production\nJosé,0.5,0.7,0.3\n'.encode('latin-1')
+    at = click(app_with_upload('latin1.csv', data), 'calc_button')
+    assert not at.exception and not at.error
+    assert at.session_state.results.to_frame()['Producer'].tolist() == ['José']
@@ -0,0 +1,50 @@
+import json
+
+import pandas as pd
+import pytest
+
+from batch import main
+from tests.test_ahp_engine import producers
+
+def test_no_matching_files(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), '-o', str(tmp_path / 'out')])
+    assert 'no CSV or Excel files matched' in capsys.readouterr().err
+
+def test_batch_writes_regions_global_and_summary(tmp_path):
+    inputs = tmp_path / 'in'
+    inputs.mkdir()
+    producers(30, seed=1).to_csv(inputs / 'north.csv', index=False)
+    producers(20, seed=2).to_excel(inputs / 'south.xlsx', index=False)
+    out, summary_path = tmp_path / 'out', tmp_path / 'summary.json'
+    assert main([str(inputs), '-o', str(out), '--workers', '2', '--summary-json', str(summary_path)]) == 0
+
+    assert sorted(p.name for p in out.iterdir()) == [
+        'global_ranking.csv', 'global_ranking.xlsx', 'north_ranking.csv', 'north_ranking.xlsx',
+        'south_ranking.csv', 'south_ranking.xlsx']
+    merged = pd.read_csv(out / 'global_ranking.csv')
+    assert len(merged) == 50
+    assert merged['Ranking'].tolist() == list(range(1, 51))
+    assert merged['Total Score'].is_monotonic_decreasing
+    assert merged.groupby('Region').size().to_dict() == {'north': 30, 'south': 20}
+
+    summary = json.loads(summary_path.read_text(encoding='utf-8'))
+    assert (summary['inputs'], summary['rows'], summary['global_rows'], summary['workers']) == (2, 50, 50, 2)
+    assert {r['region']: r['rows'] for r in summary['regions']} == {'north': 30, 'south': 20}
+    assert all(len(r['files']) == 2 for r in summary['regions'])
+
+@pytest.mark.parametrize('names, message', [
+    (['a/north.csv', 'b/north.csv'], 'both give region'),
+    (['north.csv', 'North.xlsx'], 'both give region'),
+    (['global.csv'], 'reserved for the global ranking'),
+])
+def test_region_name_collisions(tmp_path, capsys, names, message):
+    for name in names:
+        path = tmp_path / 'in' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df = producers(5)
+        df.to_csv(path, index=False) if name.endswith('.csv') else df.to_excel(path, index=False)
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'in' / '**' / '*.*'), '-o', str(tmp_path / 'out')])
+    assert message in capsys.readouterr().err
+    assert not (tmp_path / 'out').exists()
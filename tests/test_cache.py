@@ -0,0 +1,80 @@
+import io
+
+from ahp_engine import DEFAULT_WEIGHTS, calculate_scores
+from cache import LRUCache
+from tests.test_ahp_engine import producers, shifted_weights
+from upload_cache import UPLOAD_CACHE, cached_ranking, parsed_upload, upload_digest
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_order():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # b is now least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 9.9
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a', 'gone') == 'gone'
+    assert len(cache) == 0 and cache.stats()['expirations'] == 1
+
+def test_expired_entries_go_before_live_ones():
+    clock = Clock()
+    cache = LRUCache(max_entries=2, ttl=10, clock=clock)
+    cache.put('old', 1)
+    clock.now = 5
+    cache.put('live', 2)
+    clock.now = 12
+    cache.put('new', 3)
+    assert cache.stats()['expirations'] == 1 and cache.stats()['evictions'] == 0
+    assert cache.get('live') == 2 and cache.get('new') == 3
+
+def test_byte_budget():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    for key, size in [('a', 40), ('b', 40), ('c', 40)]:
+        cache.put(key, key, size)
+    assert cache.get('a') is None and cache.nbytes == 80
+    cache.put('b', 'b', 10)  # replacing an entry releases its old size
+    assert cache.nbytes == 50
+    cache.put('huge', 'huge', 101)  # larger than the whole budget: not stored
+    assert cache.get('huge') is None and len(cache) == 2
+
+def test_counters():
+    cache = LRUCache()
+    calls = []
+    for _ in range(3):
+        cache.get_or_put('k', lambda: calls.append(1) or 'v', sizeof=len)
+    cache.get('missing')
+    stats = cache.stats()
+    assert calls == [1] and stats['entries'] == 1 and stats['bytes'] == 1
+    assert (stats['hits'], stats['misses']) == (2, 2) and stats['hit_rate'] == 0.5
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+def test_uploads_are_shared_by_content():
+    UPLOAD_CACHE.clear()
+    data = producers(30).to_csv(index=False).encode()
+    digest = upload_digest(io.BytesIO(data))
+    assert digest == upload_digest(data)
+    parses = []
+    first = parsed_upload(digest, lambda: parses.append(1) or {'frame': producers(30), 'errors': producers(0)})
+    assert parsed_upload(digest, lambda: 1 / 0) is first and parses == [1]
+
+    df = producers(30)
+    ranking = cached_ranking(digest, DEFAULT_WEIGHTS, lambda: calculate_scores(df, DEFAULT_WEIGHTS))
+    assert cached_ranking(digest, dict(DEFAULT_WEIGHTS), lambda: 1 / 0) is ranking
+    other = cached_ranking(digest, shifted_weights(), lambda: calculate_scores(df, shifted_weights()))
+    assert other is not ranking and UPLOAD_CACHE.stats()['entries'] == 3
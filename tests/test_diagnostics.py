@@ -0,0 +1,69 @@
+import json
+
+from diagnostics import Recorder, StageMetrics, write_jsonl
+
+def recorder(tmp_path=None):
+    log = '' if tmp_path is None else str(tmp_path / 'logs' / 'stages.jsonl')
+    return Recorder('s1', metrics=StageMetrics(buckets=(0.1, 1.0)), log_path=log)
+
+def test_runs_and_fragments():
+    rec = recorder()
+    rec.record('callback', 0.01)  # before any run: attached to the next one
+    rec.begin('app')
+    rec.record('parse', 0.2, 1000)
+    with rec.fragment('results'):  # inline in the full run
+        rec.record('chart', 0.3)
+    rec.end('app')
+    with rec.fragment('results'):  # rerun alone
+        rec.record('chart', 0.1)
+    runs = rec.runs()
+    assert [(r['run'], r['scope']) for r in runs] == [(2, 'results'), (1, 'app')]
+    assert [s['stage'] for s in runs[1]['stages']] == ['callback', 'parse', 'chart']
+    assert rec.rows()[0] == {'run': 2, 'scope': 'results', 'stage': 'chart', 'seconds': 0.1, 'bytes': None}
+
+def test_fragment_after_an_aborted_run():
+    rec = recorder()
+    rec.begin('app')
+    rec.record('parse', 0.2)  # no end('app'): the run was aborted by st.rerun()
+    with rec.fragment('results', alone=True):
+        rec.record('chart', 0.1)
+    rec.record('late', 0.1)
+    runs = rec.runs()
+    assert [(r['scope'], [s['stage'] for s in r['stages']]) for r in runs] == [
+        ('results', ['chart']), ('app', ['parse'])]
+    rec.begin('app')  # a new full run takes the pending stages
+    assert [s['stage'] for s in rec.runs()[0]['stages']] == ['late']
+
+def test_prometheus_text():
+    rec = recorder()
+    rec.begin('app')
+    rec.record('parse', 0.05, 2048)
+    rec.record('parse', 0.5)
+    rec.record('chart', 3.0)
+    text = rec.metrics.prometheus_text()
+    lines = set(text.splitlines())
+    assert '# TYPE dairy_stage_duration_seconds histogram' in lines
+    assert {'dairy_stage_duration_seconds_bucket{stage="parse",le="0.1"} 1',
+            'dairy_stage_duration_seconds_bucket{stage="parse",le="1"} 2',
+            'dairy_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 2',
+            'dairy_stage_duration_seconds_count{stage="parse"} 2',
+            'dairy_stage_duration_seconds_sum{stage="parse"} 0.55',
+            'dairy_stage_duration_seconds_bucket{stage="chart",le="1"} 0',
+            'dairy_stage_payload_bytes_total{stage="parse"} 2048',
+            'dairy_reruns_total{scope="app"} 1'} <= lines
+    assert not any(line.startswith('dairy_stage_payload_bytes_total{stage="chart"') for line in lines)
+    assert text.endswith('\n')
+
+def test_jsonl_sink(tmp_path):
+    rec = recorder(tmp_path)
+    rec.record('callback', 0.01)
+    rec.begin('app')
+    rec.record('parse', 0.2, 10)
+    lines = (tmp_path / 'logs' / 'stages.jsonl').read_text(encoding='utf-8').splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [(r['session'], r['run'], r['scope'], r['stage'], r['bytes']) for r in records] == [
+        ('s1', None, None, 'callback', None), ('s1', 1, 'app', 'parse', 10)]
+    write_jsonl(str(tmp_path / 'logs' / 'stages.jsonl'), {'extra': 1})
+    assert len((tmp_path / 'logs' / 'stages.jsonl').read_text(encoding='utf-8').splitlines()) == 3
+    exported = [json.loads(line) for line in rec.to_jsonl().decode().splitlines()]
+    assert [r['stage'] for r in exported] == ['callback', 'parse'] and exported[0]['session'] == 's1'
@@ -0,0 +1,93 @@
+import gzip
+import io
+import json
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import exports
+from ahp_engine import DEFAULT_WEIGHTS, calculate_scores
+from exports import EXPORT_CACHE, export_bytes, frame_digest
+from tests.test_ahp_engine import producers, shifted_weights
+
+@pytest.fixture
+def ranked():
+    return calculate_scores(producers(40), DEFAULT_WEIGHTS)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    EXPORT_CACHE.clear()
+    yield
+    EXPORT_CACHE.clear()
+
+def read_sheets(data):
+    book = load_workbook(io.BytesIO(data), read_only=True)
+    return {ws.title: list(ws.values) for ws in book.worksheets}
+
+def test_excel_round_trip(ranked):
+    sheets = read_sheets(export_bytes('xlsx', ranked, DEFAULT_WEIGHTS))
+    assert list(sheets['Ranking'][0]) == ranked.columns.tolist()
+    assert [row[0] for row in sheets['Ranking'][1:]] == ranked['Producer'].tolist()
+    assert len(sheets['Weights']) == 1 + len(DEFAULT_WEIGHTS)
+
+def test_csv_and_pdf(ranked):
+    csv = export_bytes('csv', ranked, DEFAULT_WEIGHTS)
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(csv)), ranked, check_dtype=False)
+    assert export_bytes('pdf', ranked, DEFAULT_WEIGHTS, 'EN').startswith(b'%PDF')
+
+def test_exports_are_memoized_by_content(ranked, monkeypatch):
+    calls = []
+    monkeypatch.setitem(exports.EXPORTERS, 'csv', lambda df, weights, lang: calls.append(1) or b'x' * len(df))
+    data = export_bytes('csv', ranked, DEFAULT_WEIGHTS)
+    assert export_bytes('csv', ranked.copy(), dict(DEFAULT_WEIGHTS)) is data and len(calls) == 1
+    export_bytes('csv', ranked, shifted_weights())
+    export_bytes('csv', ranked, DEFAULT_WEIGHTS, 'EN')
+    export_bytes('csv', ranked.head(10), DEFAULT_WEIGHTS)
+    assert len(calls) == 4
+
+def test_frame_digest(ranked):
+    assert frame_digest(ranked) == frame_digest(ranked.copy())
+    changed = ranked.copy()
+    changed.loc[0, 'Total Score'] += 1e-9
+    assert frame_digest(changed) != frame_digest(ranked)
+    assert frame_digest(ranked.astype({'Ranking': 'int32'})) != frame_digest(ranked)
+
+def test_cache_limits():
+    assert EXPORT_CACHE.max_entries == 32 and EXPORT_CACHE.max_bytes == 256 * 2**20
+    for i in range(40):
+        export_bytes('csv', calculate_scores(producers(3, seed=i), DEFAULT_WEIGHTS), DEFAULT_WEIGHTS)
+    assert len(EXPORT_CACHE) == 32 and EXPORT_CACHE.stats()['evictions'] == 8
+
+def test_large_excel_switches_to_streaming(ranked, monkeypatch):
+    monkeypatch.setattr(exports, 'LARGE_EXPORT_ROWS', 10)
+    monkeypatch.setattr(exports, 'to_excel', lambda df, weights: pytest.fail('used the in-memory writer'))
+    sheets = read_sheets(export_bytes('xlsx', ranked, DEFAULT_WEIGHTS))
+    assert list(sheets['Ranking'][0]) == ranked.columns.tolist()
+    assert [row[0] for row in sheets['Ranking'][1:]] == ranked['Producer'].tolist()
+    assert sheets['Weights'][0] == ('Criterion', 'Category', 'Weight')
+
+def test_streaming_excel_splits_sheets(ranked, monkeypatch):
+    monkeypatch.setattr(exports, 'EXCEL_MAX_ROWS', 16)
+    sheets = read_sheets(exports.to_excel_streaming(ranked, DEFAULT_WEIGHTS))
+    assert list(sheets) == ['Ranking', 'Ranking (2)', 'Ranking (3)', 'Weights']
+    rows = [row for name in ('Ranking', 'Ranking (2)', 'Ranking (3)') for row in sheets[name][1:]]
+    assert [row[0] for row in rows] == ranked['Producer'].tolist()
+
+def test_csv_gzip(ranked):
+    data = exports.to_csv_gzip(ranked, chunk_rows=7)
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(gzip.decompress(data))), ranked, check_dtype=False)
+
+def test_parquet_and_arrow_round_trip(ranked):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    weights = shifted_weights()
+    tables = [pq.read_table(io.BytesIO(export_bytes('parquet', ranked, weights))),
+              pa.ipc.open_file(io.BytesIO(export_bytes('arrow', ranked, weights))).read_all()]
+    for table in tables:
+        pd.testing.assert_frame_equal(table.to_pandas(), ranked)
+        metadata = table.schema.metadata
+        assert json.loads(metadata[b'dairy.weights']) == pytest.approx(weights)
+        normalized = json.loads(metadata[b'dairy.normalized_weights'])
+        assert sum(normalized.values()) == pytest.approx(1.0)
@@ -0,0 +1,71 @@
+import io
+
+import numpy as np
+import pytest
+
+from ahp_engine import ahp_analysis
+from group_ahp import group_consensus, read_expert_matrix
+
+def reciprocal(upper):
+    n = len(upper) + 1
+    m = np.ones((n, n))
+    for i, row in enumerate(upper):
+        for j, v in enumerate(row, start=i + 1):
+            m[i, j], m[j, i] = v, 1 / v
+    return m
+
+EXPERTS = np.stack([
+    reciprocal([[3, 5, 2], [2, 1 / 2], [1 / 3]]),
+    reciprocal([[2, 4, 3], [3, 1], [1 / 2]]),
+    reciprocal([[4, 6, 1], [1, 1 / 3], [1 / 4]]),
+])
+
+def test_aij_is_the_elementwise_geometric_mean():
+    result = group_consensus(EXPERTS)
+    np.testing.assert_allclose(result['matrix'], np.exp(np.log(EXPERTS).mean(axis=0)))
+    np.testing.assert_allclose(result['weights_aij'], ahp_analysis(result['matrix'], 'eig')['weights'], atol=1e-9)
+
+def test_aip_is_the_geometric_mean_of_priorities():
+    result = group_consensus(EXPERTS)
+    priorities = np.array([ahp_analysis(m, 'eig')['weights'] for m in EXPERTS])
+    np.testing.assert_allclose(result['weights'], priorities, atol=1e-9)
+    aip = np.exp(np.log(priorities).mean(axis=0))
+    np.testing.assert_allclose(result['weights_aip'], aip / aip.sum(), atol=1e-9)
+
+def test_expert_weights():
+    result = group_consensus(EXPERTS, expert_weights=[2, 1, 1])
+    log_g = np.tensordot([0.5, 0.25, 0.25], np.log(EXPERTS), axes=1)
+    np.testing.assert_allclose(result['matrix'], np.exp(log_g))
+
+def test_identical_experts_agree():
+    result = group_consensus(np.stack([EXPERTS[0]] * 4))
+    np.testing.assert_allclose(result['matrix'], EXPERTS[0])
+    np.testing.assert_allclose(result['weights_aij'], result['weights_aip'], atol=1e-9)
+    assert not result['outlier'].any()
+
+def test_inconsistent_means_cr_above_the_threshold():
+    cr = group_consensus(EXPERTS)['CR']
+    assert (cr > 0).all()
+    flags = group_consensus(EXPERTS, cr_threshold=cr[0])['inconsistent']
+    assert not flags[0]
+    np.testing.assert_array_equal(flags[1:], cr[1:] > cr[0])
+
+def test_one_and_two_criteria_are_consistent():
+    for matrices in (np.ones((2, 1, 1)), np.stack([reciprocal([[3]]), reciprocal([[1 / 2]])])):
+        with np.errstate(all='raise'):  # no 0 / 0 in the CI
+            result = group_consensus(matrices)
+        np.testing.assert_array_equal(result['CR'], 0)
+        assert not result['inconsistent'].any()
+        assert np.isclose(result['weights_aij'].sum(), 1)
+
+def test_read_expert_matrix_with_fractions():
+    text = 'x,A,B,C\nA,1,3,1/5\nB,1/3,1,0.5\nC,5, 2 ,1\n'
+    expected = [[1, 3, 0.2], [1 / 3, 1, 0.5], [5, 2, 1]]
+    np.testing.assert_allclose(read_expert_matrix(io.StringIO(text)), expected)
+    np.testing.assert_allclose(read_expert_matrix(io.StringIO('1,3,1/5\n1/3,1,1/2\n5,2,1\n')), expected)
+
+def test_read_expert_matrix_labels():
+    matrix = read_expert_matrix(io.StringIO(',A,B\nA,1,1/2\nB,2,1\n'))
+    np.testing.assert_allclose(matrix, [[1, 0.5], [2, 1]])
+    with pytest.raises(ValueError):
+        read_expert_matrix(io.StringIO('1,1/0\n1,1\n'))
@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ahp_engine import DEFAULT_WEIGHTS, calculate_scores
+from history import HistoryStore
+from tests.test_ahp_engine import producers, shifted_weights
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    yield store
+    store.close()
+
+def test_save_and_load_run(store):
+    for layout in ('subcriteria', 'categories'):
+        ranked = calculate_scores(producers(30, layout), DEFAULT_WEIGHTS)
+        run_id = store.save_run(ranked, DEFAULT_WEIGHTS, label=layout)
+        pd.testing.assert_frame_equal(store.load_run(run_id), ranked, check_dtype=False)
+    runs = store.runs()
+    assert runs['label'].tolist() == ['categories', 'subcriteria']
+    assert (runs['n_producers'] == 30).all() and (runs['CR'] < 0.1).all()
+    with pytest.raises(KeyError):
+        store.load_run(999)
+
+def test_producer_history(store):
+    df = producers(20)
+    for month, weights in [(1, DEFAULT_WEIGHTS), (2, shifted_weights()), (3, DEFAULT_WEIGHTS)]:
+        store.save_run(calculate_scores(df, weights), weights, created_at=datetime(2026, month, 1))
+    history = store.producer_history('P0003')
+    assert history['created_at'].tolist() == ['2026-01-01T00:00:00', '2026-02-01T00:00:00', '2026-03-01T00:00:00']
+    expected = calculate_scores(df, shifted_weights()).set_index('Producer').loc['P0003']
+    assert history.loc[1, 'Ranking'] == expected['Ranking']
+    assert np.isclose(history.loc[1, 'Total Score'], expected['Total Score'])
+    assert len(store.producer_history('P0003', since=datetime(2026, 2, 1), until=datetime(2026, 3, 1))) == 1
+    assert store.producer_history('nobody').empty
+
+def test_runs_by_weights(store):
+    df = producers(10)
+    ids = [store.save_run(calculate_scores(df, w), w, created_at=datetime(2026, 1, i + 1))
+           for i, w in enumerate([DEFAULT_WEIGHTS, shifted_weights(), DEFAULT_WEIGHTS])]
+    default = store.runs(weights=DEFAULT_WEIGHTS)
+    assert default['run_id'].tolist() == [ids[2], ids[0]]
+    shifted = store.runs(weights=shifted_weights())
+    assert shifted['run_id'].tolist() == [ids[1]]
+    assert store.weights(shifted.loc[0, 'weights_hash']) == pytest.approx(shifted_weights())
+    assert store.runs(limit=1)['run_id'].tolist() == [ids[2]]
+
+def test_reopening_is_idempotent(tmp_path):
+    path = str(tmp_path / 'nested' / 'history.sqlite3')
+    ranked = calculate_scores(producers(5), DEFAULT_WEIGHTS)
+    first = HistoryStore(path)
+    first.save_run(ranked, DEFAULT_WEIGHTS)
+    second = HistoryStore(path)  # schema and WAL setup again, on the same file and while it is open
+    second.save_run(ranked, DEFAULT_WEIGHTS)
+    assert len(first.runs()) == len(second.runs()) == 2
+    first.close()
+    second.close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('SELECT COUNT(*) FROM weight_sets').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 10
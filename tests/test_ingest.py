@@ -0,0 +1,70 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ahp_engine import CATEGORIES
+from ingest import ERROR_COLUMNS, IngestError, read_producers, validate
+
+HEADER = 'Producer,' + ','.join(CATEGORIES) + '\n'
+
+def read(text, **kwargs):
+    return read_producers(io.BytesIO((HEADER + text).encode()), **kwargs)
+
+def test_valid_file():
+    result = read('A,0.5,0.7,0.3\nB,1,0,0.25\n')
+    assert result['layout'] == 'categories' and result['scale'] == 1
+    assert result['rows'] == 2 and result['invalid_rows'] == 0
+    assert result['errors'].columns.tolist() == ERROR_COLUMNS and result['errors'].empty
+    np.testing.assert_allclose(result['frame'][CATEGORIES].to_numpy(), [[0.5, 0.7, 0.3], [1, 0, 0.25]])
+
+def test_problems_are_reported_per_cell():
+    result = read('A,0.5,x,0.3\nB,,0.2,0.1\n,0.1,0.2,0.3\nA,0.4,0.2,-0.1\nC,0.1,0.2,0.3\n')
+    assert result['frame']['Producer'].tolist() == ['C']
+    assert result['invalid_rows'] == 4
+    assert result['counts'] == {'malformed': 1, 'missing': 1, 'out_of_range': 1,
+                                'missing_producer': 1, 'duplicate_producer': 1}
+    errors = result['errors']
+    assert errors['line'].tolist() == [2, 3, 4, 5, 5]
+    assert errors.loc[0, ['column', 'value', 'problem']].tolist() == [CATEGORIES[1], 'x', 'malformed']
+
+def test_ten_point_scale():
+    result = read('A,5,7,3\nB,10,0,2.5\n')
+    assert result['scale'] == 10 and result['invalid_rows'] == 0
+    np.testing.assert_allclose(result['frame'][CATEGORIES].to_numpy(), [[0.5, 0.7, 0.3], [1, 0, 0.25]])
+
+def test_stray_large_value_in_a_unit_file():
+    result = read('A,0.5,0.7,0.3\nB,0.4,7,0.3\nC,0.1,0.2,0.3\n')
+    assert result['scale'] == 1
+    assert result['counts']['out_of_range'] == 1
+    assert result['errors'].loc[0, ['line', 'value', 'problem']].tolist() == [3, 7.0, 'out_of_range']
+    np.testing.assert_allclose(result['frame'][CATEGORIES].to_numpy(), [[0.5, 0.7, 0.3], [0.1, 0.2, 0.3]])
+
+def test_validate_leaves_the_input_frame_alone():
+    df = pd.DataFrame({'Producer': ['A', 'B'], **{c: [5.0, 10.0] for c in CATEGORIES}})
+    frame, report = validate(df, CATEGORIES)
+    assert report['scale'] == 10 and report['invalid_rows'] == 0
+    assert frame[CATEGORIES[0]].tolist() == [0.5, 1.0]
+    assert df[CATEGORIES[0]].tolist() == [5.0, 10.0]
+
+def test_explicit_scale_is_checked():
+    result = read('A,5,7,3\nB,0.5,0.2,0.1\n', scale=1)
+    assert result['counts']['out_of_range'] == 3
+    with pytest.raises(ValueError):
+        read('A,5,7,3\n', scale=5)
+
+def test_latin1_file():
+    for engine in ('c', 'pyarrow'):
+        result = read_producers(io.BytesIO((HEADER + 'José,0.5,0.7,0.3\nJoão,0.1,x,0.2\n').encode('latin-1')),
+                                engine=engine)
+        assert result['frame']['Producer'].tolist() == ['José']
+        assert result['errors']['producer'].tolist() == ['João']
+
+def test_ragged_rows():
+    with pytest.raises(pd.errors.ParserError):
+        read('A,0.5,0.7,0.3\nB,0.1,0.2,0.3,0.4,0.5\n')
+
+def test_missing_columns():
+    with pytest.raises(IngestError):
+        read_producers(io.BytesIO(b'Name,Economic\nA,1\n'))
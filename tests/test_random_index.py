@@ -0,0 +1,20 @@
+import numpy as np
+
+from random_index import RI_TABLE, random_index, simulate_random_index
+
+def test_table_covers_1_to_30():
+    assert sorted(RI_TABLE) == list(range(1, 31))
+    assert RI_TABLE[1] == RI_TABLE[2] == 0.0
+    assert RI_TABLE[3] == 0.58 and RI_TABLE[10] == 1.49
+
+def test_table_grows_with_n():
+    # Legacy (3-14) and simulated (15-30) values each grow; RI(15) < RI(14) is expected
+    for sizes in (range(3, 15), range(15, 31)):
+        assert all(np.diff([RI_TABLE[n] for n in sizes]) > 0)
+
+def test_random_index_uses_the_table():
+    for n in (3, 14, 15, 30):
+        assert random_index(n) == RI_TABLE[n]
+
+def test_simulation_is_close_to_the_table():
+    assert abs(simulate_random_index(15, samples=4_000, seed=0, workers=1) - RI_TABLE[15]) < 0.02
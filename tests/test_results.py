@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from ahp_engine import DEFAULT_WEIGHTS, calculate_scores
+from results import REGISTRY, CompactResults, share
+from tests.test_ahp_engine import producers, shifted_weights
+
+def test_round_trip():
+    for layout in ('subcriteria', 'categories'):
+        ranked = calculate_scores(producers(200, layout), DEFAULT_WEIGHTS)
+        frame = CompactResults.from_frame(ranked).to_frame(widen=True)
+        assert frame['Producer'].astype(str).tolist() == ranked['Producer'].tolist()
+        assert frame['Ranking'].tolist() == ranked['Ranking'].tolist()
+        numeric = ranked.columns.drop('Producer')
+        pd.testing.assert_frame_equal(frame[numeric], ranked[numeric], check_dtype=False, atol=1e-6)
+
+def test_top_k_keeps_its_global_ranking():
+    df = producers(100)
+    top = calculate_scores(df, DEFAULT_WEIGHTS, top_k=10)
+    top['Ranking'] = np.arange(11, 21)
+    assert CompactResults.from_frame(top).to_frame()['Ranking'].tolist() == list(range(11, 21))
+
+def test_rescore_matches_recalculation():
+    df = producers(300)
+    new = shifted_weights()
+    rescored = CompactResults.from_frame(calculate_scores(df, DEFAULT_WEIGHTS)).rescore(new).to_frame()
+    expected = calculate_scores(df, new)
+    totals = rescored['Total Score'].to_numpy()
+    assert np.all(np.diff(totals) <= 0)
+    np.testing.assert_allclose(totals, expected['Total Score'], atol=1e-6)
+
+def test_share_interns_equal_arrays_only():
+    names = share(np.array(['a', 'b'], dtype=object))
+    assert share(np.array(['a', 'b'], dtype=object)) is names
+    assert not names.flags.writeable
+    for other in (['a\x1fb'], ['a\x1f', 'b'], ['a', '\x1fb'], ['a', 'b', '']):
+        assert share(np.array(other, dtype=object)).tolist() == other
+    scores = share(np.arange(4, dtype=np.float32))
+    assert share(np.arange(4, dtype=np.float32)) is scores
+    assert share(np.arange(4, dtype=np.float32).reshape(2, 2)).shape == (2, 2)
+
+def test_evict_and_reload(tmp_path):
+    ranked = calculate_scores(producers(50), DEFAULT_WEIGHTS)
+    results = CompactResults.from_frame(ranked)
+    before = results.to_frame()
+    assert results.evict(str(tmp_path)) > 0
+    assert results.evicted and len(list(tmp_path.iterdir())) == 1
+    pd.testing.assert_frame_equal(results.to_frame(), before)
+    assert not results.evicted and not list(tmp_path.iterdir())
+
+def test_evict_idle_keeps_the_current_results():
+    ranked = calculate_scores(producers(20), DEFAULT_WEIGHTS)
+    current, idle = CompactResults.from_frame(ranked), CompactResults.from_frame(ranked)
+    REGISTRY.evict_idle(idle_seconds=-1, keep=[current])
+    assert idle.evicted and not current.evicted
+
+def test_sweeper_evicts_in_the_background():
+    results = CompactResults.from_frame(calculate_scores(producers(20), DEFAULT_WEIGHTS))
+    results.last_access -= 100
+    stop = REGISTRY.start_sweeper(interval=0.01, idle_seconds=50)
+    try:
+        deadline = time.monotonic() + 5
+        while not results.evicted and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+    assert results.evicted
@@ -0,0 +1,29 @@
+import numpy as np
+
+import sensitivity
+from ahp_engine import DEFAULT_WEIGHTS
+from sensitivity import weight_sensitivity
+
+def scores(n, seed=0):
+    return np.random.default_rng(seed).integers(0, 11, size=(n, 14)) / 10
+
+def test_histogram_counts_every_draw():
+    result = weight_sensitivity(scores(30), DEFAULT_WEIGHTS, draws=2_500, chunk_size=1_000, seed=1, workers=1)
+    hist = result['histogram']
+    assert hist.dtype == np.int32 and hist.shape == (30, 30)
+    assert (hist.sum(axis=0) == 2_500).all() and (hist.sum(axis=1) == 2_500).all()
+    assert ((result['rank_low'] <= result['mean_rank']) & (result['mean_rank'] <= result['rank_high'])).all()
+
+def test_pool_matches_sequential(monkeypatch):
+    monkeypatch.setattr(sensitivity, 'PARALLEL_MIN_DRAWS', 0)
+    values = scores(200)
+    kwargs = dict(draws=6_000, chunk_size=1_000, seed=2)
+    sequential = weight_sensitivity(values, DEFAULT_WEIGHTS, workers=1, **kwargs)
+    for _ in range(2):  # the second run reuses the pool
+        pooled = weight_sensitivity(values, DEFAULT_WEIGHTS, workers=2, **kwargs)
+        np.testing.assert_array_equal(pooled['histogram'], sequential['histogram'])
+    assert sensitivity._pool is not None and sensitivity._pool_workers == 2
+
+def test_small_runs_stay_in_process(monkeypatch):
+    monkeypatch.setattr(sensitivity, '_executor', lambda workers: 1 / 0)
+    weight_sensitivity(scores(50), DEFAULT_WEIGHTS, draws=4_000, chunk_size=1_000, workers=4)
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+import ahp_engine
+from ahp_engine import CATEGORIES, COMPARISON_MATRIX, DEFAULT_WEIGHTS, ahp_analysis, calculate_scores
+from service import DEFAULT_HOST, MAX_MATRIX_SIZE, ScoringService, _request, score_request_body
+
+def run(test, window=0.001):
+    """Run ``test(send)`` against a service on a free port; ``send`` opens one connection per request."""
+    async def main():
+        service = ScoringService(window=window)
+        server = await service.start(DEFAULT_HOST, 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def send(method, path, body=b''):
+            reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+            try:
+                status, payload = await _request(reader, writer, method, path, body)
+            finally:
+                writer.close()
+                await writer.wait_closed()
+            return status, json.loads(payload)
+
+        async with server:
+            return await test(send)
+    return asyncio.run(main())
+
+def test_concurrent_requests_share_one_batch():
+    bodies = [score_request_body(20, seed) for seed in range(6)]
+
+    async def test(send):
+        responses = await asyncio.gather(*(send('POST', '/score', body) for body in bodies))
+        return responses, (await send('GET', '/health'))[1]
+
+    responses, health = run(test, window=0.2)
+    assert health['requests'] == 6 and health['batches'] == 1 and health['rows'] == 120
+    for body, (status, payload) in zip(bodies, responses):
+        assert status == 200 and payload['layout'] == 'subcriteria'
+        expected = calculate_scores(pd.DataFrame(json.loads(body)['producers']), DEFAULT_WEIGHTS)
+        assert [r['Producer'] for r in payload['ranking']] == expected['Producer'].tolist()
+        np.testing.assert_allclose([r['Total Score'] for r in payload['ranking']], expected['Total Score'])
+
+def test_error_codes():
+    square = np.ones((MAX_MATRIX_SIZE + 1, MAX_MATRIX_SIZE + 1)).tolist()
+    requests = [
+        ('POST', '/score', b'{"producers": ['),
+        ('POST', '/score', b'[1, 2]'),
+        ('POST', '/score', json.dumps({'producers': [{'Producer': 'A', 'Economic': 1}]}).encode()),
+        ('POST', '/consistency', json.dumps({'matrix': [[1, 2, 3], [0.5, 1, 2]]}).encode()),
+        ('POST', '/consistency', json.dumps({'matrix': square}).encode()),
+        ('POST', '/consistency', json.dumps({'matrix': [[1, -2], [0.5, 1]]}).encode()),
+        ('GET', '/score', b''),
+        ('POST', '/missing', b'{}'),
+    ]
+
+    async def test(send):
+        return [await send(*request) for request in requests]
+
+    statuses = [status for status, _ in run(test)]
+    assert statuses == [400, 400, 400, 400, 400, 400, 405, 404]
+
+def test_consistency():
+    async def test(send):
+        return await send('POST', '/consistency', json.dumps({'matrix': COMPARISON_MATRIX.tolist()}).encode())
+
+    status, payload = run(test)
+    expected = ahp_analysis(COMPARISON_MATRIX)
+    assert status == 200 and payload['n'] == len(COMPARISON_MATRIX) and payload['consistent']
+    for key in ('lambda_max', 'CI', 'RI', 'CR'):
+        assert np.isclose(payload[key], expected[key])
+    np.testing.assert_allclose(payload['weights'], expected['weights'])
+
+def test_simulated_ri_does_not_block_the_loop(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_random_index(n):
+        calls.append(threading.current_thread() is threading.main_thread())
+        release.wait(5)
+        return 1.7
+
+    monkeypatch.setattr(ahp_engine, 'random_index', slow_random_index)
+    matrix = np.exp(np.random.default_rng(0).normal(size=(40, 40)) * 0.1)
+    matrix = np.sqrt(matrix / matrix.T)
+
+    async def test(send):
+        body = json.dumps({'matrix': matrix.tolist()}).encode()
+        consistency = asyncio.ensure_future(send('POST', '/consistency', body))
+        health = await asyncio.wait_for(send('GET', '/health'), 2)
+        release.set()
+        return health, await consistency
+
+    (health_status, _), (status, payload) = run(test)
+    assert health_status == 200 and status == 200
+    assert calls == [False] and payload['RI'] == 1.7
@@ -0,0 +1,266 @@
+"""UI strings for the Dairy Selection Tool in Portuguese and English.
+
+Kept free of Streamlit so the report exports and the command-line tools can
+share the same labels as the app.
+"""
+
+# ─── LANGUAGE ─────────────────────────────────────────────────────────────────
+LANG = {
+    'EN': {
+        'title': 'Dairy Producer Selection Tool',
+        'subtitle': 'AHP-based ranking system for milk producer evaluation',
+        'language': 'Language / Idioma',
+        'settings': '⚙️ Settings',
+        'weights_title': '📊 Criterion Weights',
+        'weights_info': 'Adjust the weights for each criterion. Values will be normalized to sum to 1.',
+        'reset_weights': '↺ Reset to Default',
+        'input_method': '📥 Data Input Method',
+        'upload_csv': '📂 Upload CSV / Excel',
+        'manual_entry': '✏️ Manual Entry',
+        'num_producers': 'Number of Producers',
+        'producer_name': 'Producer Name',
+        'grid_entry': 'Edit as a table',
+        'grid_help': 'One editable table for all producers (scores 0-10); the ranking is only recalculated when you press Calculate.',
+        'grid_missing': 'Every sub-criterion needs a score between 0 and 10.',
+        'calc_button': '🚀 Calculate Ranking',
+        'results_title': '🏆 Ranking Results',
+        'ranking_tab': '🏅 Ranking',
+        'charts_tab': '📊 Charts',
+        'details_tab': '🔍 Details',
+        'consistency_tab': '✅ Consistency',
+        'export_tab': '📤 Export',
+        'total_score': 'Total Score',
+        'economic': 'Economic',
+        'social': 'Social',
+        'production': 'Production',
+        'consistency_title': 'AHP Consistency Analysis',
+        'cr_ok': '✅ Consistency Ratio is acceptable (CR < 0.1)',
+        'cr_fail': '⚠️ Consistency Ratio is not acceptable (CR ≥ 0.1)',
+        'download_excel': '📥 Download Excel Report',
+        'download_csv': '📥 Download CSV',
+        'upload_hint': 'Upload a CSV or Excel file with columns: Producer, Economic, Social, Production (or Producer plus the 14 sub-criteria)',
+        'download_example': '⬇️ Download Example CSV',
+        'no_data': 'No data to display. Run a calculation first.',
+        'large_upload': 'Large file: it will be scored in chunks and only the top {k} producers are kept.',
+        'ingest_columns': 'The file must be a CSV or Excel workbook with a Producer column plus Economic, Social and Production, or the 14 sub-criteria.',
+        'ingest_parse': 'The file could not be read as a table: check that it is a comma-separated CSV (UTF-8 or Latin-1) and that every row has the same number of columns.',
+        'ingest_sheet': 'Read from sheet "{sheet}".',
+        'ingest_empty': 'No valid producer rows in the file.',
+        'ingest_scale': 'Scores are on a 0-10 scale and were divided by 10.',
+        'ingest_invalid': '{bad:,} of {rows:,} rows have problems and were left out.',
+        'ingest_report': 'Rows with problems',
+        'ingest_truncated': 'Showing the first {shown:,} of {total:,} problems.',
+        'ingest_download': 'Download problem report (CSV)',
+        'ingest_malformed': 'Not a number',
+        'ingest_missing': 'Missing score',
+        'ingest_out_of_range': 'Out of range',
+        'ingest_missing_producer': 'Missing producer name',
+        'ingest_duplicate_producer': 'Duplicate producer',
+        'stream_stats': '{rows:,} rows scored in {seconds:.1f}s ({rate:,.0f} rows/s, peak memory {mem:.0f} MiB)',
+        'producers': 'producers',
+        'top_producer': 'Top Producer',
+        'avg_score': 'Average Score',
+        'score_range': 'Score Range',
+        'economic_criteria': 'Economic Criteria',
+        'social_criteria': 'Social Criteria',
+        'production_criteria': 'Production Criteria',
+        'subcriteria_scores': 'Sub-criteria Scores',
+        'download_pdf': '📄 Download PDF Report',
+        'charts_large': 'Large ranking: per-producer charts show the top {n} plus an average of the others.',
+        'others': 'Others ({n})',
+        'score_distribution': 'Total Score Distribution',
+        'scatter_title': 'Economic vs. Total Score ({shown:,} of {total:,} producers)',
+        'radar_select': 'Producers on the radar chart',
+        'search_producer': '🔎 Search producer',
+        'page_size': 'Per page',
+        'page': 'Page',
+        'page_info': 'Showing {start}–{end} of {total} producers',
+        'download_csv_gz': '🗜️ Download CSV (gzip)',
+        'download_parquet': '🧱 Download Parquet',
+        'download_arrow': '🏹 Download Arrow IPC',
+        'tutorial_title': 'How to use this tool',
+        'tutorial_skip': 'Start now →',
+        'tut_step1_title': '1. Set Weights',
+        'tut_step1_desc': 'In the sidebar, adjust the importance of each criterion using sliders. Values are automatically normalized.',
+        'tut_step2_title': '2. Enter Producers',
+        'tut_step2_desc': 'Upload a CSV or enter data manually. Rate each producer 0–10 per sub-criterion.',
+        'tut_step3_title': '3. Calculate & Analyze',
+        'tut_step3_desc': 'Click "Calculate Ranking" to see AHP results with charts and consistency analysis.',
+        'tut_step4_title': '4. Export',
+        'tut_step4_desc': 'Download the ranking as Excel, CSV or PDF for sharing and documentation.',
+        'what_is_ahp': 'What is AHP?',
+        'ahp_explanation': 'The Analytic Hierarchy Process (AHP) is a structured decision-making technique that uses pairwise comparisons to rank alternatives based on multiple weighted criteria.',
+        'sensitivity_title': 'Weight Sensitivity (Monte Carlo)',
+        'sensitivity_info': 'Draws random weight vectors around the current weights and measures how stable each ranking position is.',
+        'sensitivity_draws': 'Number of draws',
+        'sensitivity_spread': 'Weight spread',
+        'sensitivity_run': '🎲 Run Sensitivity Analysis',
+        'sensitivity_unavailable': 'Sensitivity analysis needs the producer scores; it is not available for chunked uploads.',
+        'sensitivity_too_many': 'Sensitivity analysis supports at most {max:,} producers; this ranking has {n:,}.',
+        'history_title': 'Ranking History',
+        'history_info': 'Every calculated ranking is saved locally; pick a producer to see how its rank changed across runs.',
+        'history_producer': 'Producer',
+        'history_months': 'Months',
+        'history_empty': 'No saved runs for this producer in the period.',
+        'history_saved': 'Run #{id} saved to the history.',
+        'history_error': 'The ranking could not be saved to the history.',
+        'diag_toggle': 'Diagnostics',
+        'diag_help': 'Show how long each stage of the recent reruns took',
+        'diag_title': 'Diagnostics',
+        'diag_info': "Stage timings and payload sizes of this session's recent reruns, newest first. "
+                     'Figure payloads are measured only while this panel is on.',
+        'diag_empty': 'No timings recorded yet.',
+        'diag_last_run': 'Last run',
+        'diag_total': 'Recorded time',
+        'diag_payload': 'Payload',
+        'diag_refresh': 'Refresh',
+        'diag_download': 'Download timings (JSON lines)',
+        'diag_mem_session': 'Ranking memory',
+        'diag_mem_shared': 'Shared inputs',
+        'diag_mem_frame': 'As a full table',
+        'diag_mem_all': 'All sessions',
+        'diag_mem_info': '{results} rankings held by this server process, {evicted} of them on disk. '
+                         'Rankings left idle for {minutes:.0f} min are moved to disk and reloaded when used.',
+        'diag_cache_info': 'Upload cache (shared by all sessions): {entries} entries, {mib:.1f} MiB, '
+                           '{hits} hits, {misses} misses ({rate:.0%} hit rate), {evictions} evicted, '
+                           '{expirations} expired.',
+        'group_title': 'Group AHP',
+        'group_info': 'Upload one 14×14 comparison matrix (CSV) per evaluator to derive consensus weights.',
+        'group_upload': 'Evaluator matrices',
+        'group_method': 'Aggregation',
+        'group_exclude': 'Exclude outlier evaluators',
+        'group_apply': '✔ Use consensus weights',
+        'group_size_error': 'Each matrix must be {n}×{n}, one row/column per sub-criterion.',
+        'group_summary': '{k} evaluators · consensus CR {cr:.4f} · {out} outlier(s) · {inc} inconsistent',
+    },
+    'PT': {
+        'title': 'Ferramenta de Seleção de Produtores',
+        'subtitle': 'Sistema de ranking baseado em AHP para avaliação de produtores de leite',
+        'language': 'Language / Idioma',
+        'settings': '⚙️ Configurações',
+        'weights_title': '📊 Pesos dos Critérios',
+        'weights_info': 'Ajuste os pesos de cada critério. Os valores serão normalizados para somar 1.',
+        'reset_weights': '↺ Restaurar Padrão',
+        'input_method': '📥 Método de Entrada de Dados',
+        'upload_csv': '📂 Enviar CSV / Excel',
+        'manual_entry': '✏️ Entrada Manual',
+        'num_producers': 'Número de Produtores',
+        'producer_name': 'Nome do Produtor',
+        'grid_entry': 'Editar como tabela',
+        'grid_help': 'Uma tabela editável com todos os produtores (notas 0-10); o ranking só é recalculado ao clicar em Calcular.',
+        'grid_missing': 'Todos os subcritérios precisam de uma nota entre 0 e 10.',
+        'calc_button': '🚀 Calcular Ranking',
+        'results_title': '🏆 Resultados do Ranking',
+        'ranking_tab': '🏅 Ranking',
+        'charts_tab': '📊 Gráficos',
+        'details_tab': '🔍 Detalhes',
+        'consistency_tab': '✅ Consistência',
+        'export_tab': '📤 Exportar',
+        'total_score': 'Pontuação Total',
+        'economic': 'Econômico',
+        'social': 'Social',
+        'production': 'Produção',
+        'consistency_title': 'Análise de Consistência AHP',
+        'cr_ok': '✅ Razão de Consistência aceitável (RC < 0,1)',
+        'cr_fail': '⚠️ Razão de Consistência não aceitável (RC ≥ 0,1)',
+        'download_excel': '📥 Baixar Relatório Excel',
+        'download_csv': '📥 Baixar CSV',
+        'upload_hint': 'Envie um CSV ou Excel com as colunas: Producer, Economic, Social, Production (ou Producer e os 14 subcritérios)',
+        'download_example': '⬇️ Baixar CSV de Exemplo',
+        'no_data': 'Sem dados para exibir. Execute um cálculo primeiro.',
+        'large_upload': 'Arquivo grande: será pontuado em blocos e apenas os {k} melhores produtores serão mantidos.',
+        'ingest_columns': 'O arquivo deve ser um CSV ou Excel com a coluna Producer e Economic, Social e Production, ou os 14 subcritérios.',
+        'ingest_parse': 'Não foi possível ler o arquivo como tabela: verifique se é um CSV separado por vírgulas (UTF-8 ou Latin-1) e se todas as linhas têm o mesmo número de colunas.',
+        'ingest_sheet': 'Lido da planilha "{sheet}".',
+        'ingest_empty': 'Nenhuma linha de produtor válida no arquivo.',
+        'ingest_scale': 'As notas estão na escala de 0 a 10 e foram divididas por 10.',
+        'ingest_invalid': '{bad:,} de {rows:,} linhas têm problemas e foram deixadas de fora.',
+        'ingest_report': 'Linhas com problemas',
+        'ingest_truncated': 'Mostrando os primeiros {shown:,} de {total:,} problemas.',
+        'ingest_download': 'Baixar relatório de problemas (CSV)',
+        'ingest_malformed': 'Não é um número',
+        'ingest_missing': 'Nota ausente',
+        'ingest_out_of_range': 'Fora da escala',
+        'ingest_missing_producer': 'Nome do produtor ausente',
+        'ingest_duplicate_producer': 'Produtor duplicado',
+        'stream_stats': '{rows:,} linhas pontuadas em {seconds:.1f}s ({rate:,.0f} linhas/s, pico de memória {mem:.0f} MiB)',
+        'producers': 'produtores',
+        'top_producer': 'Melhor Produtor',
+        'avg_score': 'Pontuação Média',
+        'score_range': 'Amplitude',
+        'economic_criteria': 'Critérios Econômicos',
+        'social_criteria': 'Critérios Sociais',
+        'production_criteria': 'Critérios de Produção',
+        'subcriteria_scores': 'Pontuações por Subcritério',
+        'download_pdf': '📄 Baixar Relatório PDF',
+        'charts_large': 'Ranking grande: os gráficos por produtor mostram os {n} melhores e a média dos demais.',
+        'others': 'Demais ({n})',
+        'score_distribution': 'Distribuição da Pontuação Total',
+        'scatter_title': 'Econômico vs. Pontuação Total ({shown:,} de {total:,} produtores)',
+        'radar_select': 'Produtores no gráfico radar',
+        'search_producer': '🔎 Buscar produtor',
+        'page_size': 'Por página',
+        'page': 'Página',
+        'page_info': 'Exibindo {start}–{end} de {total} produtores',
+        'download_csv_gz': '🗜️ Baixar CSV (gzip)',
+        'download_parquet': '🧱 Baixar Parquet',
+        'download_arrow': '🏹 Baixar Arrow IPC',
+        'tutorial_title': 'Como usar esta ferramenta',
+        'tutorial_skip': 'Começar agora →',
+        'tut_step1_title': '1. Defina os Pesos',
+        'tut_step1_desc': 'Na barra lateral, ajuste a importância de cada critério com os sliders. Os valores são normalizados automaticamente.',
+        'tut_step2_title': '2. Insira os Produtores',
+        'tut_step2_desc': 'Escolha entre enviar um CSV ou inserir manualmente. Avalie cada produtor de 0 a 10 por subcritério.',
+        'tut_step3_title': '3. Calcule e Analise',
+        'tut_step3_desc': 'Clique em "Calcular Ranking" para ver os resultados AHP com gráficos e análise de consistência.',
+        'tut_step4_title': '4. Exporte',
+        'tut_step4_desc': 'Baixe o ranking em Excel, CSV ou PDF para documentação e compartilhamento.',
+        'what_is_ahp': 'O que é AHP?',
+        'ahp_explanation': 'O Processo de Análise Hierárquica (AHP) é uma técnica estruturada de tomada de decisão que usa comparações par-a-par para classificar alternativas com base em múltiplos critérios ponderados.',
+        'sensitivity_title': 'Sensibilidade dos Pesos (Monte Carlo)',
+        'sensitivity_info': 'Sorteia vetores de pesos aleatórios em torno dos pesos atuais e mede a estabilidade de cada posição do ranking.',
+        'sensitivity_draws': 'Número de sorteios',
+        'sensitivity_spread': 'Dispersão dos pesos',
+        'sensitivity_run': '🎲 Executar Análise de Sensibilidade',
+        'sensitivity_unavailable': 'A análise de sensibilidade precisa das notas dos produtores; não está disponível para uploads em blocos.',
+        'sensitivity_too_many': 'A análise de sensibilidade suporta no máximo {max:,} produtores; este ranking tem {n:,}.',
+        'history_title': 'Histórico do Ranking',
+        'history_info': 'Cada ranking calculado é salvo localmente; escolha um produtor para ver como sua posição mudou entre as execuções.',
+        'history_producer': 'Produtor',
+        'history_months': 'Meses',
+        'history_empty': 'Nenhuma execução salva para este produtor no período.',
+        'history_saved': 'Execução #{id} salva no histórico.',
+        'history_error': 'Não foi possível salvar o ranking no histórico.',
+        'diag_toggle': 'Diagnóstico',
+        'diag_help': 'Mostra quanto tempo levou cada etapa das execuções recentes',
+        'diag_title': 'Diagnóstico',
+        'diag_info': 'Tempo e tamanho dos dados de cada etapa das execuções recentes desta sessão, '
+                     'das mais novas para as mais antigas. O tamanho dos gráficos só é medido com este painel ativo.',
+        'diag_empty': 'Nenhum tempo registrado ainda.',
+        'diag_last_run': 'Última execução',
+        'diag_total': 'Tempo registrado',
+        'diag_payload': 'Dados',
+        'diag_refresh': 'Atualizar',
+        'diag_download': 'Baixar tempos (JSON lines)',
+        'diag_mem_session': 'Memória do ranking',
+        'diag_mem_shared': 'Entradas compartilhadas',
+        'diag_mem_frame': 'Como tabela completa',
+        'diag_mem_all': 'Todas as sessões',
+        'diag_mem_info': '{results} rankings mantidos por este processo do servidor, {evicted} deles em disco. '
+                         'Rankings parados por {minutes:.0f} min vão para o disco e são recarregados ao usar.',
+        'diag_cache_info': 'Cache de arquivos (compartilhado entre sessões): {entries} entradas, {mib:.1f} MiB, '
+                           '{hits} acertos, {misses} falhas ({rate:.0%} de acerto), {evictions} removidas, '
+                           '{expirations} expiradas.',
+        'group_title': 'AHP em Grupo',
+        'group_info': 'Envie uma matriz de comparação 14×14 (CSV) por avaliador para obter pesos de consenso.',
+        'group_upload': 'Matrizes dos avaliadores',
+        'group_method': 'Agregação',
+        'group_exclude': 'Excluir avaliadores discrepantes',
+        'group_apply': '✔ Usar pesos de consenso',
+        'group_size_error': 'Cada matriz deve ser {n}×{n}, uma linha/coluna por subcritério.',
+        'group_summary': '{k} avaliadores · RC do consenso {cr:.4f} · {out} discrepante(s) · {inc} inconsistente(s)',
+    }
+}
+
+def translate(key, lang='PT'):
+    return LANG[lang][key]
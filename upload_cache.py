@@ -0,0 +1,57 @@
+"""Cross-session cache of parsed uploads and the rankings scored from them.
+
+Entries are keyed by content: ``upload_digest`` of the uploaded bytes, plus
+the weight model digest for rankings. A file uploaded again, by the same or
+another session, is neither re-parsed nor re-scored while its entry lives,
+and every session gets the same ``ingest.read_producers`` result and the same
+``CompactResults`` object instead of copies of its own. Entries expire after
+``UPLOAD_CACHE_TTL`` seconds and the least recently used ones are evicted
+beyond ``UPLOAD_CACHE_ENTRIES`` entries or ``UPLOAD_CACHE_MB`` MiB.
+
+Cached frames are shared, so callers must not modify them in place.
+"""
+import hashlib
+import os
+
+from ahp_engine import weight_model
+from cache import LRUCache
+from results import CompactResults
+
+UPLOAD_CACHE_TTL = float(os.environ.get('DAIRY_UPLOAD_CACHE_TTL', 60 * 60))
+UPLOAD_CACHE_ENTRIES = int(os.environ.get('DAIRY_UPLOAD_CACHE_ENTRIES', 64))
+UPLOAD_CACHE_MB = float(os.environ.get('DAIRY_UPLOAD_CACHE_MB', 512))
+
+UPLOAD_CACHE = LRUCache(max_entries=UPLOAD_CACHE_ENTRIES, max_bytes=int(UPLOAD_CACHE_MB * 2**20),
+                        ttl=UPLOAD_CACHE_TTL)
+
+def upload_digest(source):
+    """Content hash of an upload: bytes, or a ``BytesIO``-like file (hashed without copying)."""
+    data = source.getbuffer() if hasattr(source, 'getbuffer') else source
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+def _results_bytes(results):
+    mem = results.memory()
+    return mem['session_bytes'] + mem['shared_bytes']
+
+def _upload_bytes(upload):
+    return _frame_bytes(upload['frame']) + _frame_bytes(upload['errors'])
+
+def parsed_upload(digest, parse):
+    """The ``read_producers`` result ``parse()`` returns for the upload with ``digest``, parsed once per content."""
+    return UPLOAD_CACHE.get_or_put(('parsed', digest), parse, _upload_bytes)
+
+def cached_ranking(digest, weights, score):
+    """``CompactResults`` of the frame ``score()`` returns for ``digest`` and ``weights``, scored once."""
+    return UPLOAD_CACHE.get_or_put(('ranking', digest, weight_model(weights).digest),
+                                   lambda: CompactResults.from_frame(score()), _results_bytes)
+
+def cached_stream(digest, weights, top_k, score):
+    """``score_csv_stream``-style result of ``score()`` with ``top`` compacted, scored once per content."""
+    def run():
+        stream = score()
+        return dict(stream, top=CompactResults.from_frame(stream['top']))
+    return UPLOAD_CACHE.get_or_put(('stream', digest, weight_model(weights).digest, top_k), run,
+                                   lambda stream: _results_bytes(stream['top']))